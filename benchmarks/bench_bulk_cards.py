@@ -0,0 +1,76 @@
+"""
+Benchmark building and encoding Cards grids
+
+Compares building Image/Markdown/Card models and encoding the grid with
+bulk_cards(), which writes the JSON from columns directly, at 10, 100
+and 1,000 cards.
+
+Run with:
+    python -m benchmarks.bench_bulk_cards
+"""
+
+import time
+
+import bubbletea_chat as bt
+from bubbletea_chat.encoders import get_encoder
+
+DURATION = 1.0
+SIZES = (10, 100, 1000)
+
+
+def columns(size):
+    return {
+        "image_urls": [f"https://example.com/{i}.png" for i in range(size)],
+        "texts": [f"Item {i}" for i in range(size)],
+        "markdowns": [f"**${i}.99**" for i in range(size)],
+        "card_values": [f"item-{i}" for i in range(size)],
+    }
+
+
+def with_models(dumps, data):
+    cards = bt.Cards(
+        [
+            bt.Card(
+                image=bt.Image(url),
+                text=text,
+                markdown=bt.Markdown(markdown),
+                card_value=value,
+            )
+            for url, text, markdown, value in zip(
+                data["image_urls"], data["texts"], data["markdowns"], data["card_values"]
+            )
+        ]
+    )
+    return dumps(cards)
+
+
+def with_bulk(dumps, data):
+    return bt.bulk_cards(**data)[0].json[0]
+
+
+def grids_per_second(build, dumps, data) -> float:
+    count = 0
+    deadline = time.perf_counter() + DURATION
+    while time.perf_counter() < deadline:
+        build(dumps, data)
+        count += 1
+    return count / DURATION
+
+
+def main():
+    dumps = get_encoder("pydantic").dumps
+    for size in SIZES:
+        data = columns(size)
+        identical = with_models(dumps, data) == with_bulk(dumps, data)
+        models = grids_per_second(with_models, dumps, data)
+        bulk = grids_per_second(with_bulk, dumps, data)
+        print(f"\nCards({size})")
+        print(f"  {'models':<8} {models:10,.0f} grids/s  {models * size:12,.0f} cards/s")
+        print(
+            f"  {'bulk':<8} {bulk:10,.0f} grids/s  {bulk * size:12,.0f} cards/s"
+            f"  ({bulk / models:.1f}x, identical JSON: {identical})"
+        )
+
+
+if __name__ == "__main__":
+    main()
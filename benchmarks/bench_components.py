@@ -0,0 +1,71 @@
+"""
+Benchmark component construction throughput
+
+Measures components built per second with pydantic validation (the
+default) and with set_component_validation(False), and checks that both
+modes encode to the same bytes.
+
+Run with:
+    python -m benchmarks.bench_components
+"""
+
+import time
+
+import bubbletea_chat as bt
+from bubbletea_chat.encoders import get_encoder
+
+DURATION = 1.0
+
+
+def text():
+    return bt.Text("The quick brown fox jumps over the lazy dog")
+
+
+def pills():
+    return bt.Pills([bt.Pill(f"Option {i}", f"option-{i}") for i in range(5)])
+
+
+def cards():
+    return bt.Cards(
+        [
+            bt.Card(
+                image=bt.Image(f"https://example.com/{i}.png", alt=f"Item {i}"),
+                text=f"Item {i}",
+                markdown=bt.Markdown(f"**${i}.99**"),
+                card_value=f"item-{i}",
+            )
+            for i in range(50)
+        ]
+    )
+
+
+def built_per_second(build) -> float:
+    count = 0
+    deadline = time.perf_counter() + DURATION
+    while time.perf_counter() < deadline:
+        for _ in range(10):
+            build()
+        count += 10
+    return count / DURATION
+
+
+def main():
+    dumps = get_encoder("pydantic").dumps
+    for label, build in {"Text": text, "Pills(5)": pills, "Cards(50)": cards}.items():
+        bt.set_component_validation(True)
+        validated = built_per_second(build)
+        expected = dumps(build())
+        bt.set_component_validation(False)
+        trusted = built_per_second(build)
+        identical = dumps(build()) == expected
+        bt.set_component_validation(True)
+        print(f"\n{label}")
+        print(f"  {'validated':<10} {validated:12,.0f} /s")
+        print(
+            f"  {'trusted':<10} {trusted:12,.0f} /s  "
+            f"({trusted / validated:.1f}x, identical JSON: {identical})"
+        )
+
+
+if __name__ == "__main__":
+    main()
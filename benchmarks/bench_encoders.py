@@ -0,0 +1,65 @@
+"""
+Benchmark SSE frame encoding throughput
+
+Measures frames per second for typical Text and Cards payloads with the
+previous f-string approach and each available encoder backend.
+
+Run with:
+    python -m benchmarks.bench_encoders
+"""
+
+import time
+
+import bubbletea_chat as bt
+from bubbletea_chat.encoders import get_encoder
+
+DURATION = 1.0
+
+
+def legacy_frame(component) -> bytes:
+    """Frame building before encoders: str JSON, f-string, then encode"""
+    return f"data: {component.model_dump_json()}\n\n".encode("utf-8")
+
+
+def payloads():
+    text = bt.Text("The quick brown fox jumps over the lazy dog")
+    cards = bt.Cards(
+        [
+            bt.Card(
+                image=bt.Image(f"https://example.com/{i}.png", alt=f"Item {i}"),
+                text=f"Item {i}",
+                markdown=bt.Markdown(f"**${i}.99**"),
+                card_value=f"item-{i}",
+            )
+            for i in range(10)
+        ]
+    )
+    return {"Text": text, "Cards(10)": cards}
+
+
+def frames_per_second(frame, component) -> float:
+    count = 0
+    deadline = time.perf_counter() + DURATION
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            frame(component)
+        count += 100
+    return count / DURATION
+
+
+def main():
+    backends = {"legacy f-string": legacy_frame}
+    for name in ("pydantic", "orjson", "msgspec"):
+        try:
+            backends[name] = get_encoder(name).frame
+        except ImportError:
+            print(f"{name}: not installed, skipped")
+
+    for label, component in payloads().items():
+        print(f"\n{label}")
+        for name, frame in backends.items():
+            print(f"  {name:<16} {frames_per_second(frame, component):>12,.0f} frames/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Micro-benchmark for ChatbotFunction parameter injection
+
+Compares the per-call cost of the precomputed InjectionPlan against the
+previous behavior, which ran inspect.signature() on every request.
+
+Run with:
+    python -m benchmarks.bench_injection
+"""
+
+import asyncio
+import inspect
+import time
+from typing import Optional
+
+import bubbletea_chat as bt
+from bubbletea_chat.decorators import ChatbotFunction
+
+ITERATIONS = 50_000
+
+REQUEST = dict(
+    images=None,
+    user_email="someone@example.com",
+    user_uuid="user-1",
+    conversation_uuid="conversation-1",
+    chat_history=[{"role": "user", "content": "hello"}] * 10,
+    thread_id="thread-1",
+)
+
+
+def bot(
+    message: str,
+    user_uuid: str = None,
+    conversation_uuid: str = None,
+    chat_history: Optional[str] = None,
+):
+    return bt.Text(message)
+
+
+async def legacy_call(func, message, **request):
+    """Per-call signature inspection, as done before InjectionPlan"""
+    sig = inspect.signature(func)
+    params = list(sig.parameters.keys())
+    kwargs = {}
+    for name in ("images", "user_email", "user_uuid", "conversation_uuid", "thread_id"):
+        if name in params:
+            kwargs[name] = request[name]
+    if "chat_history" in params:
+        annotation = sig.parameters["chat_history"].annotation
+        chat_history = request["chat_history"]
+        if annotation is str or annotation == Optional[str]:
+            if isinstance(chat_history, list):
+                chat_history = str(chat_history)
+        kwargs["chat_history"] = chat_history
+    result = func(message, **kwargs)
+    if not isinstance(result, list):
+        result = [result]
+    return result
+
+
+async def run(label, call):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        await call()
+    elapsed = time.perf_counter() - start
+    per_call = elapsed / ITERATIONS * 1e6
+    print(f"{label:<12} {per_call:8.2f} µs/call")
+    return per_call
+
+
+async def main():
+    # Run on the event loop like legacy_call, so only injection is measured
+    chatbot = ChatbotFunction(bot, url_path="/bench", workers=0)
+    legacy = await run("legacy", lambda: legacy_call(bot, "hi", **REQUEST))
+    planned = await run("planned", lambda: chatbot("hi", **REQUEST))
+    print(f"saved        {legacy - planned:8.2f} µs/call ({legacy / planned:.1f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,52 @@
+"""
+Micro-benchmark for chat request parsing
+
+Compares eagerly validating a request with a long chat history and a
+few base64 images (ComponentChatRequest, as FastAPI did before) against
+LazyChatRequest for a bot that declares neither field.
+
+Run with:
+    python -m benchmarks.bench_request_parsing
+"""
+
+import json
+import time
+
+from bubbletea_chat.schemas import ComponentChatRequest, LazyChatRequest
+
+ITERATIONS = 2_000
+
+BODY = json.dumps(
+    {
+        "type": "user",
+        "message": "What did we talk about?",
+        "user_uuid": "user-1",
+        "conversation_uuid": "conversation-1",
+        "images": [{"base64": "A" * 200_000, "mime_type": "image/png"}] * 3,
+        "chat_history": [
+            {"role": "user" if i % 2 else "assistant", "content": "x" * 400, "id": i}
+            for i in range(300)
+        ],
+    }
+).encode()
+
+
+def run(label, parse):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        parse()
+    elapsed = time.perf_counter() - start
+    per_call = elapsed / ITERATIONS * 1e6
+    print(f"{label:<16} {per_call:10.1f} µs/request")
+    return per_call
+
+
+def main():
+    print(f"body size        {len(BODY) / 1024:10.1f} KiB")
+    eager = run("json + eager", lambda: ComponentChatRequest(**json.loads(BODY)))
+    lazy = run("lazy", lambda: LazyChatRequest.model_validate_json(BODY))
+    print(f"saved            {eager - lazy:10.1f} µs/request ({eager / lazy:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
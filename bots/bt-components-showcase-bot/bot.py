@@ -253,6 +253,32 @@ def show_component_menu():
     ]
 
 
+def back_navigation(show_all_option: bool = True):
+    """Pills leading back to the menu, shown under every example"""
+    pills = [Pill("🔙 Back to Menu", pill_value="show_menu")]
+    if show_all_option:
+        pills.append(Pill("🎯 Show All Components", pill_value="show_all"))
+    return [Text("\n"), Pills(pills=pills)]
+
+
+# Every response is static: build, validate and serialize each one once
+MENU = bt.frozen(show_component_menu())
+BACK = bt.frozen(back_navigation())
+EXAMPLES = {
+    "show_text": bt.frozen(show_text_component() + [BACK]),
+    "show_markdown": bt.frozen(show_markdown_component() + [BACK]),
+    "show_image": bt.frozen(show_image_component() + [BACK]),
+    "show_cards": bt.frozen(show_cards_component() + [BACK]),
+    "show_pills": bt.frozen(show_pills_component() + [BACK]),
+    "show_video": bt.frozen(show_video_component() + [BACK]),
+    "show_block": bt.frozen(show_block_component() + [BACK]),
+    "show_error": bt.frozen(show_error_component() + [BACK]),
+    "show_all": bt.frozen(
+        show_all_components() + back_navigation(show_all_option=False)
+    ),
+}
+
+
 @bt.chatbot("components-showcase")
 def components_showcase_bot(
     message: str, user_uuid: str = None, conversation_uuid: str = None
@@ -264,52 +290,14 @@ def components_showcase_bot(
 
     # Check if user wants to go back to menu first
     if text == "show_menu":
-        return show_component_menu()
+        return MENU
 
-    # Check if it's a pill click
+    # Check if it's a pill click; unknown ones only offer the way back
     if text.startswith("show_"):
-        components = []
-
-        if text == "show_text":
-            components = show_text_component()
-        elif text == "show_markdown":
-            components = show_markdown_component()
-        elif text == "show_image":
-            components = show_image_component()
-        elif text == "show_cards":
-            components = show_cards_component()
-        elif text == "show_pills":
-            components = show_pills_component()
-        elif text == "show_video":
-            components = show_video_component()
-        elif text == "show_block":
-            components = show_block_component()
-        elif text == "show_error":
-            components = show_error_component()
-        elif text == "show_all":
-            components = show_all_components()
-
-        # Add a way to go back to menu
-        if text != "show_all":
-            components.append(Text("\n"))
-            components.append(
-                Pills(
-                    pills=[
-                        Pill("🔙 Back to Menu", pill_value="show_menu"),
-                        Pill("🎯 Show All Components", pill_value="show_all"),
-                    ]
-                )
-            )
-        else:
-            components.append(Text("\n"))
-            components.append(
-                Pills(pills=[Pill("🔙 Back to Menu", pill_value="show_menu")])
-            )
-
-        return components
+        return EXAMPLES.get(text, BACK)
 
     # Default: show menu for any message (except pill clicks which are handled above)
-    return show_component_menu()
+    return MENU
 
 
 @components_showcase_bot.config
@@ -10,17 +10,24 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
-@bt.chatbot('claude-assistant')
-def claude_assistant(message: str):
-    # Get API key from environment variable
+@bt.resource
+def anthropic_client():
+    # One client for all requests, it keeps its connections open
     api_key = os.getenv('ANTHROPIC_API_KEY')
     if not api_key:
-        return bt.Text("Please set your ANTHROPIC_API_KEY environment variable")
-
-    # Initialize Anthropic client
+        yield None
+        return
     client = Anthropic(api_key=api_key)
+    yield client
+    client.close()
 
 
+@bt.chatbot('claude-assistant')
+def claude_assistant(message: str, anthropic_client=None):
+    client = anthropic_client
+    if client is None:
+        return bt.Text("Please set your ANTHROPIC_API_KEY environment variable")
+
     try:
         # Create message with Claude API
         response = client.messages.create(
@@ -6,21 +6,24 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-@bt.chatbot('gemini-assistant')
-def gemini_assistant(message: str,
-                     user_uuid: str = None,
-                     conversation_uuid: str = None):
-    # Configure Gemini API with your API key
-    # Make sure to set GOOGLE_API_KEY environment variable
+@bt.resource
+def gemini_model():
+    # Configured once at startup and shared by every request
     api_key = os.getenv('GEMINI_API_KEY')
     if not api_key:
-        return bt.Text("Please set your GEMINI_API_KEY environment variable")
-
+        return None
     genai.configure(api_key=api_key)
+    return genai.GenerativeModel('gemini-2.0-flash')
 
-    # Initialize the Gemini model
-    model = genai.GenerativeModel('gemini-2.0-flash')
 
+@bt.chatbot('gemini-assistant')
+def gemini_assistant(message: str,
+                     gemini_model=None,
+                     user_uuid: str = None,
+                     conversation_uuid: str = None):
+    model = gemini_model
+    if model is None:
+        return bt.Text("Please set your GEMINI_API_KEY environment variable")
 
     try:
         # Generate response from Gemini
@@ -7,6 +7,16 @@ from services.news_service import NewsService
 from core.scheduler import MorningBriefScheduler
 
 
+HELP = bt.frozen(
+    Markdown("**Commands:**\n"
+             "• `start` - Setup\n"
+             "• `update` - Change settings\n"
+             "• `preview` - Sample brief\n"
+             "• `morning` - Today's brief\n"
+             "• `generate` - Test brief\n"
+             "• `status` - Your settings"))
+
+
 class MorningBriefBot:
     """Main bot class that handles all user interactions"""
 
@@ -139,15 +149,7 @@ class MorningBriefBot:
                              identifier: str,
                              conversation_uuid: str = None) -> list:
         """Handle help command"""
-        return [
-            Markdown("**Commands:**\n"
-                     "• `start` - Setup\n"
-                     "• `update` - Change settings\n"
-                     "• `preview` - Sample brief\n"
-                     "• `morning` - Today's brief\n"
-                     "• `generate` - Test brief\n"
-                     "• `status` - Your settings")
-        ]
+        return [HELP]
 
     def _handle_update_command(self,
                                identifier: str,
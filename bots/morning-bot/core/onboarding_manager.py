@@ -1,8 +1,16 @@
 import re
 from typing import List, Optional
 from core.user_preferences import UserPreferencesManager, OnboardingState
+import bubbletea_chat as bt
 from bubbletea_chat.components import Pill, Pills, Text, Markdown
 
+# Pills shown once setup is done, serialized once
+ACTION_PILLS = bt.frozen(Pills(pills=[
+    Pill("Update", "action:update"),
+    Pill("Preview", "action:preview"),
+    Pill("Help", "action:help")
+]))
+
 
 class OnboardingManager:
     def __init__(self, preferences_manager: UserPreferencesManager):
@@ -14,6 +22,13 @@ class OnboardingManager:
             "science", "sports", "politics", "world", "finance"
         ]
 
+        # The topic picker never changes, serialize it once
+        self.topic_picker = bt.frozen([
+            Text("Pick news topics:"),
+            Pills(pills=[Pill(cat.title(), f"interest:{cat}") for cat in self.news_categories]),
+            Text("Click topics, then type 'done'")
+        ])
+
     def get_onboarding_message(self, user_uuid: str, user_input: Optional[str] = None) -> list:
         """Main onboarding flow handler"""
         current_state = self.preferences_manager.get_current_onboarding_state(user_uuid)
@@ -42,11 +57,7 @@ class OnboardingManager:
             return [Text("City, country? (e.g., 'Paris, France')")]
 
         elif state == OnboardingState.ASKING_INTERESTS:
-            return [
-                Text("Pick news topics:"),
-                Pills(pills=[Pill(cat.title(), f"interest:{cat}") for cat in self.news_categories]),
-                Text("Click topics, then type 'done'")
-            ]
+            return [self.topic_picker]
 
         elif state == OnboardingState.ASKING_WAKE_TIME:
             return [
@@ -63,11 +74,7 @@ class OnboardingManager:
                     f"📰 {', '.join(user_prefs.news_interests)}\n"
                     f"⏰ {user_prefs.wake_time}"
                 ),
-                Pills(pills=[
-                    Pill("Update", "action:update"),
-                    Pill("Preview", "action:preview"),
-                    Pill("Help", "action:help")
-                ])
+                ACTION_PILLS
             ]
 
     def _process_user_input(self, user_uuid: str, state: OnboardingState, user_input: str) -> list:
@@ -3,7 +3,7 @@ import time
 import os
 import json
 from datetime import datetime, time as datetime_time
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 from core.user_preferences import UserPreferencesManager, UserPreferences
 from services.weather_service import WeatherService
 from services.news_service import NewsService
@@ -127,12 +127,20 @@ class MorningBriefScheduler:
 
         # Check users
 
+        briefs = []
         for user_pref in users:
             if not self._already_sent_today(user_pref.user_uuid):
-                self._generate_and_send_brief(user_pref)
+                brief = self._generate_brief(user_pref)
+                if brief is not None:
+                    briefs.append(brief)
 
-    def _generate_and_send_brief(self, user_pref: UserPreferences):
-        """Generate and send brief for a user"""
+        # Everyone due at this time is notified in one concurrent batch
+        if briefs:
+            self.notification_service.send_morning_briefs(briefs)
+
+    def _generate_brief(self,
+                        user_pref: UserPreferences) -> Optional[Tuple[str, str]]:
+        """Generate and store brief for a user, return what to send"""
         brief = self.generate_morning_brief(user_pref)
         self._store_brief_for_user(user_pref.user_uuid, brief)
         self._mark_sent_today(user_pref.user_uuid)
@@ -141,8 +149,8 @@ class MorningBriefScheduler:
         # Send notification if conversation UUID is available
         if hasattr(user_pref,
                    'conversation_uuid') and user_pref.conversation_uuid:
-            self._send_notification(user_pref.conversation_uuid, brief,
-                                    user_pref.user_uuid)
+            return user_pref.conversation_uuid, brief
+        return None
 
     def _get_greeting(self) -> str:
         """Get time-appropriate greeting"""
@@ -208,11 +216,6 @@ class MorningBriefScheduler:
         today = datetime.now().strftime("%Y-%m-%d")
         self.sent_today[user_uuid] = today
 
-    def _send_notification(self, conversation_uuid: str, brief: str,
-                           user_uuid: str):
-        """Send notification to user"""
-        self.notification_service.send_morning_brief(conversation_uuid, brief)
-
     def _send_notification_and_get_result(self, conversation_uuid: str,
                                           brief: str, user_uuid: str) -> str:
         """Send notification and return result message"""
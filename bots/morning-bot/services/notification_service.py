@@ -1,9 +1,12 @@
-import requests
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 from config import BUBBLETEA_API_KEY, BUBBLETEA_API_URL, BUBBLETEA_BOT_NAME
 import bubbletea_chat as bt
 
 
+# Seconds a notification may take, including retries
+SEND_TIMEOUT = 60
+
+
 class NotificationService:
     """Service to send notifications via the BubbleTea API"""
 
@@ -12,6 +15,8 @@ class NotificationService:
         self.api_base_url = BUBBLETEA_API_URL
         self.api_key = BUBBLETEA_API_KEY
         self.bot_name = BUBBLETEA_BOT_NAME
+        # Pooled keep-alive client; it lives on the background job loop
+        self.client = bt.PushClient(api_key=self.api_key, base_url=self.api_base_url)
 
     def send_notification(
         self, conversation_uuid: str, message: str, is_user: bool = False
@@ -51,6 +56,41 @@ class NotificationService:
         result = self.send_notification(conversation_uuid, notification_message, is_user=False)
         return result is not None
 
+    def send_morning_briefs(self, briefs: List[Tuple[str, str]]) -> List[bool]:
+        """
+        Send many morning briefs at once
+
+        Args:
+            briefs: (conversation_uuid, brief_content) pairs
+
+        Returns:
+            Per brief, in order: True if sent successfully
+        """
+        if not briefs or not self._can_send_notification():
+            return [False] * len(briefs)
+
+        messages = [
+            (conversation_uuid, bt.Markdown(self._format_morning_brief(content)))
+            for conversation_uuid, content in briefs
+        ]
+        try:
+            # One job posts every brief concurrently over the pooled client
+            job = bt.background(self.client.send_many, messages)
+            results = job.result(SEND_TIMEOUT)
+        except Exception as e:
+            self._log_error("sending morning briefs", e)
+            return [False] * len(briefs)
+
+        sent = []
+        for (conversation_uuid, _), result in zip(briefs, results):
+            if isinstance(result, bt.PushError):
+                self._log_failure(result)
+                sent.append(False)
+            else:
+                self._log_success(conversation_uuid)
+                sent.append(True)
+        return sent
+
     def send_reminder(self, conversation_uuid: str, reminder_text: str) -> bool:
         """
         Send a reminder notification to a user
@@ -71,32 +111,15 @@ class NotificationService:
 
     def _send_api_request(self, conversation_uuid: str, message: str, is_user: bool) -> Optional[Dict[str, Any]]:
         """Send the actual API request"""
-        url = self._build_api_url(conversation_uuid)
-        headers = self._build_headers()
-        payload = self._build_payload(message, is_user)
-
-        response = requests.post(url, json=payload, headers=headers)
-
-        if response.status_code == 200:
-            self._log_success(conversation_uuid)
-            return response.json()
-        else:
-            self._log_failure(response)
+        # Sends run on the shared job loop, so the scheduler thread only waits
+        job = bt.background(self.client.send, conversation_uuid, bt.Markdown(message))
+        try:
+            result = job.result(SEND_TIMEOUT)
+        except bt.PushError as e:
+            self._log_failure(e)
             return None
-
-    def _build_api_url(self, conversation_uuid: str) -> str:
-        """Build the API URL for sending messages"""
-        return f"{self.api_base_url}/v1/developer/conversation/{conversation_uuid}/message"
-
-    def _build_headers(self) -> Dict[str, str]:
-        """Build request headers"""
-        return {"x-api-key": self.api_key, "Content-Type": "application/json", "accept": "application/json"}
-
-    def _build_payload(self, message: str, is_user: bool) -> Dict[str, Any]:
-        """Build request payload"""
-        message = bt.Markdown(message)
-        content = message.model_dump()
-        return {"sender": "agent", "content": content}
+        self._log_success(conversation_uuid)
+        return result if result is not None else {}
 
     def _format_morning_brief(self, brief_content: str) -> str:
         """Format morning brief with notification header"""
@@ -110,6 +133,6 @@ class NotificationService:
         """Log successful notification"""
         pass
 
-    def _log_failure(self, response):
+    def _log_failure(self, error):
         """Log failed notification"""
         pass
@@ -40,6 +40,41 @@ Please follow these rules:
   - "answer": string (must match one of the options)
 """
 
+# Static menus, serialized once and sent as cached bytes
+ERA_MENU = bt.frozen([
+    Text("🎬 What kind of movie era are you into?"),
+    Pills(pills=[
+        Pill("All", "era:All"),
+        Pill("Classics", "era:Classics"),
+        Pill("2000s", "era:2000s"),
+        Pill("2010s", "era:2010s"),
+        Pill("Recent", "era:Recent")
+    ])
+])
+
+DIFFICULTY_MENU = bt.frozen([
+    Text("🧠 Choose difficulty:"),
+    Pills(pills=[
+        Pill("All", "difficulty:All"),
+        Pill("Easy", "difficulty:Easy"),
+        Pill("Medium", "difficulty:Medium"),
+        Pill("Hard", "difficulty:Hard")
+    ])
+])
+
+GENRE_MENU = bt.frozen([
+    Text("🎭 Pick a genre:"),
+    Pills(pills=[
+        Pill("All", "genre:All"),
+        Pill("Action", "genre:Action"),
+        Pill("Comedy", "genre:Comedy"),
+        Pill("Drama", "genre:Drama"),
+        Pill("Sci-Fi", "genre:Sci-Fi"),
+        Pill("Horror", "genre:Horror"),
+        Pill("Romance", "genre:Romance")
+    ])
+])
+
 
 class GameState:
 
@@ -99,42 +134,18 @@ def movie_guessing_game(message: str,
     if state.stage == "start":
         state.reset()
         state.stage = "era"
-        return [
-            Text("🎬 What kind of movie era are you into?"),
-            Pills(pills=[
-                Pill("All", "era:All"),
-                Pill("Classics", "era:Classics"),
-                Pill("2000s", "era:2000s"),
-                Pill("2010s", "era:2010s"),
-                Pill("Recent", "era:Recent")
-            ])
-        ]
+        return ERA_MENU
 
     elif state.stage == "difficulty":
         return [
             Text(f"You picked era: {state.preferences['era']}"),
-            Text("🧠 Choose difficulty:"),
-            Pills(pills=[
-                Pill("All", "difficulty:All"),
-                Pill("Easy", "difficulty:Easy"),
-                Pill("Medium", "difficulty:Medium"),
-                Pill("Hard", "difficulty:Hard")
-            ])
+            DIFFICULTY_MENU
         ]
 
     elif state.stage == "genre":
         return [
             Text(f"Difficulty: {state.preferences['difficulty']}"),
-            Text("🎭 Pick a genre:"),
-            Pills(pills=[
-                Pill("All", "genre:All"),
-                Pill("Action", "genre:Action"),
-                Pill("Comedy", "genre:Comedy"),
-                Pill("Drama", "genre:Drama"),
-                Pill("Sci-Fi", "genre:Sci-Fi"),
-                Pill("Horror", "genre:Horror"),
-                Pill("Romance", "genre:Romance")
-            ])
+            GENRE_MENU
         ]
 
     elif state.stage == "generate":
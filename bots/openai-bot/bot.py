@@ -3,12 +3,9 @@ ChatGPT Assistant Bot - Threaded conversations with AI
 """
 import bubbletea_chat as bt
 from bubbletea_chat import LLM
-import asyncio
-import httpx
 from datetime import datetime
 from typing import List
 import time
-import os
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -84,36 +81,15 @@ async def process_message_async(message: str,
     if not response:
         response = "I'm sorry, I couldn't process your message. Please try again."
 
-    # Create the message component
-    result = bt.Markdown(response)
-    content = result.model_dump()
-
-    # API endpoint and headers
+    # Push the reply over the shared, pooled connection
     b = time.time()
-    url = f"https://backend.bubbletea.chat/v1/developer/conversation/{conversation_uuid}/message"
-    headers = {
-        "x-api-key": os.getenv("BUBBLETEA_API_KEY"),
-        "Content-Type": "application/json",
-        "accept": "application/json"
-    }
-
-    # Create payload matching the API format
-    payload = {
-        "sender": "agent",
-        "sender_account_id": user_uuid,
-        "content": content
-    }
-
-    async with httpx.AsyncClient() as client:
-        try:
-            response_api = await client.post(url,
-                                             json=payload,
-                                             headers=headers)
-
-            response_api.raise_for_status()
-            print("time taken: ", time.time() - b)
-        except Exception as e:
-            print(f"[{datetime.now()}] Error sending message to API: {e}")
+    try:
+        await bt.push_message(conversation_uuid,
+                              bt.Markdown(response),
+                              sender_account_id=user_uuid)
+        print("time taken: ", time.time() - b)
+    except bt.PushError as e:
+        print(f"[{datetime.now()}] Error sending message to API: {e}")
 
 
 @bt.chatbot('chatgpt-assistant')
@@ -133,11 +109,13 @@ def gpt_assistant(message: str,
         print(f"Created thread for conversation: {thread_id}")
 
     # Now pass the thread_id to async task
-    asyncio.create_task(
-        process_message_async(message=message,
-                              conversation_uuid=conversation_uuid,
-                              user_uuid=user_uuid,
-                              thread_id=thread_id))
+    # Replies of one conversation are sent in order
+    bt.background(process_message_async,
+                  message=message,
+                  conversation_uuid=conversation_uuid,
+                  user_uuid=user_uuid,
+                  thread_id=thread_id,
+                  _key=conversation_uuid)
 
     responses = [
         bt.Text(
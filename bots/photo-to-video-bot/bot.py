@@ -1,40 +1,51 @@
 import os
-import asyncio
-import threading
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 from dotenv import load_dotenv
 
-import httpx
 import bubbletea_chat as bt
 from services.video_generator import VideoGeneratorService
 
 load_dotenv()
 
 
-async def process_message_async(message: str, conversation_uuid: str, images: Optional[List[bt.ImageInput]] = None):
+@bt.resource
+def video_service():
+    """Video generator shared by all requests."""
+    try:
+        return VideoGeneratorService()
+    except Exception as e:
+        # Don't stop the server, requests report the problem as before
+        print(f"Video generator unavailable: {e}")
+        return None
+
+
+async def process_message_async(
+    video_service: VideoGeneratorService,
+    message: str,
+    conversation_uuid: str,
+    images: Optional[List[bt.ImageInput]] = None,
+    user_uuid: Optional[str] = None,
+):
     """Process video generation asynchronously."""
-    video_service = VideoGeneratorService()
+    if video_service is None:
+        # Raises the configuration error for this request
+        video_service = VideoGeneratorService()
 
     temp_video_url = await video_service.generate_video_async(
         text_prompt=message, image_url=images[0].url if images else None
     )
 
-    message = bt.Video(url=temp_video_url)
-    content = message.model_dump()
+    video = bt.Video(url=temp_video_url)
 
-    api_key = os.getenv("BUBBLETEA_API_KEY")
-    if not api_key:
-        return
-
-    url = f"https://backend.bubbletea.chat/v1/developer/conversation/{conversation_uuid}/message"
-    headers = {"x-api-key": api_key, "Content-Type": "application/json", "accept": "application/json"}
+    # Clients still connected over the WebSocket get it right away; the
+    # platform push below is what adds it to the conversation
+    await bt.push_local(conversation_uuid, video, user_uuid=user_uuid)
 
-    payload = {"sender": "agent", "content": content}
+    if not os.getenv("BUBBLETEA_API_KEY"):
+        return
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url, json=payload, headers=headers)
-        response.raise_for_status()
+    await bt.push_message(conversation_uuid, video)
 
 
 @bt.chatbot("video-bot")
@@ -45,6 +56,7 @@ def video_bot(
     user_uuid: Optional[str] = None,
     conversation_uuid: Optional[str] = None,
     chat_history: Optional[List[Dict[str, Any]]] = None,
+    video_service: VideoGeneratorService = None,
 ):
     """BubbleTea chatbot that generates videos from text prompts and images."""
 
@@ -88,17 +100,15 @@ def video_bot(
             bt.Text("Try uploading a photo and describing the video effect you'd like!"),
         ]
 
-    def run_async_task():
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            loop.run_until_complete(process_message_async(message, conversation_uuid, images))
-        finally:
-            loop.close()
-
-    thread = threading.Thread(target=run_async_task)
-    thread.daemon = True
-    thread.start()
+    bt.background(
+        process_message_async,
+        video_service,
+        message,
+        conversation_uuid,
+        images,
+        user_uuid,
+        _key=conversation_uuid,
+    )
 
     responses = [
         bt.Text("🎬 Great! I'm now creating your video..."),
@@ -150,4 +160,4 @@ Try commands like: `upload`, `create`, `preview`, `options`, `effects`, `downloa
 
 
 if __name__ == "__main__":
-    bt.run_server(video_bot, port=8080, host="0.0.0.0")
+    bt.run_server(video_bot, port=8080, host="0.0.0.0", websocket=True)
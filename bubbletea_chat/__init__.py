@@ -44,10 +44,20 @@ from .components import (
     Error,
     PaymentRequest,
     BaseComponent,
+    TextDelta,
+    MarkdownDelta,
+    BlockSnapshot,
+    set_component_validation,
 )
 
+# Frozen - Static components serialized once and sent as cached bytes
+from .frozen import Frozen, frozen
+
+# Bulk - Large Cards grids written straight to JSON
+from .bulk import bulk_cards, bulk_cards_from_rows
+
 # Decorators - Easy bot creation
-from .decorators import chatbot, config
+from .decorators import chatbot, config, invalidate_config
 
 # Server - Production-ready deployment
 from .server import run_server
@@ -55,6 +65,36 @@ from .server import run_server
 # Schemas - Type definitions
 from .schemas import ImageInput, BotConfig
 
+# Streaming - Stream processing options
+from .streaming import CoalesceConfig, stream_deltas
+
+# Admission - Per-bot concurrency limits
+from .admission import AdmissionConfig
+
+# Idempotency - Deduplication of retried requests
+from .idempotency import IdempotencyConfig
+
+# Cache - Response caching for @chatbot(cache=...)
+from .cache import CacheConfig, MemoryCache, SQLiteCache
+
+# Hooks - Request lifecycle callbacks and timings
+from .hooks import RequestContext, RequestHooks
+
+# Background - Deferred work such as replies pushed after the response
+from .jobs import JobQueueFull, SQLiteJobStore, background, configure_background
+
+# Resources - Clients opened at startup and injected by parameter name
+from .resources import resource
+
+# Push - Messages posted to conversations outside a request (needs httpx)
+from .push import PushClient, PushError, push_message
+
+# Blobs - Images uploaded once and referenced by SHA-256
+from .blobs import BlobConfig, BlobNotFound, load_blob
+
+# WebSocket - Persistent connections served with run_server(websocket=True)
+from .websocket import push_local
+
 # Public API
 __all__ = [
     # Components
@@ -71,11 +111,43 @@ __all__ = [
     "Error",
     "PaymentRequest",
     "BaseComponent",
+    "TextDelta",
+    "MarkdownDelta",
+    "BlockSnapshot",
+    "set_component_validation",
+    "frozen",
+    "Frozen",
+    "bulk_cards",
+    "bulk_cards_from_rows",
     "chatbot",
     "config",
+    "resource",
+    "invalidate_config",
     "run_server",
     "ImageInput",
     "BotConfig",
+    "CoalesceConfig",
+    "stream_deltas",
+    "AdmissionConfig",
+    "IdempotencyConfig",
+    "CacheConfig",
+    "MemoryCache",
+    "SQLiteCache",
+    "RequestHooks",
+    "RequestContext",
+    "background",
+    "configure_background",
+    "SQLiteJobStore",
+    "JobQueueFull",
+    "PushClient",
+    "PushError",
+    "push_message",
+    # Blobs
+    "BlobConfig",
+    "BlobNotFound",
+    "load_blob",
+    # WebSocket
+    "push_local",
     "LLM",
 ]
 
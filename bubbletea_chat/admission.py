@@ -0,0 +1,165 @@
+"""
+Admission control for BubbleTea chatbots
+
+Limits how many requests a bot handles at once. Requests beyond the
+limit wait in a bounded FIFO queue; when the queue is full or the wait
+exceeds the queue timeout the request is rejected immediately so the
+server sheds load instead of piling up coroutines and upstream calls.
+"""
+
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Union
+
+# Default seconds clients are asked to wait before retrying a rejected request
+DEFAULT_RETRY_AFTER = 1
+
+
+class AdmissionConfig:
+    """
+    Concurrency limit settings for a bot.
+
+    Attributes:
+        max_concurrency: Requests handled at the same time
+        max_queue: Requests allowed to wait for a free slot
+        queue_timeout: Seconds a request may wait before being rejected
+                       (None waits indefinitely)
+        retry_after: Seconds sent in the Retry-After header on rejection
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue: int = 0,
+        queue_timeout: Optional[float] = None,
+        retry_after: int = DEFAULT_RETRY_AFTER,
+    ):
+        """Initialize admission settings.
+
+        Args:
+            max_concurrency: Requests handled at the same time (>= 1)
+            max_queue: Requests allowed to wait for a free slot
+            queue_timeout: Seconds a request may wait before being rejected
+            retry_after: Seconds sent in the Retry-After header on rejection
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+
+    def __repr__(self) -> str:
+        return (
+            f"AdmissionConfig(max_concurrency={self.max_concurrency!r}, "
+            f"max_queue={self.max_queue!r}, queue_timeout={self.queue_timeout!r}, "
+            f"retry_after={self.retry_after!r})"
+        )
+
+
+def resolve_admission(
+    admission: Union[int, AdmissionConfig, None]
+) -> Optional[AdmissionConfig]:
+    """
+    Normalize an admission option to a config or None.
+
+    Args:
+        admission: Max concurrency as an int, an AdmissionConfig, or None
+
+    Returns:
+        AdmissionConfig when limiting is enabled, else None
+    """
+    if isinstance(admission, AdmissionConfig):
+        return admission
+    if admission:
+        return AdmissionConfig(max_concurrency=admission)
+    return None
+
+
+class AdmissionController:
+    """
+    Per-bot concurrency limiter with a bounded FIFO wait queue.
+
+    Only used from the event loop thread, so no locking is needed.
+
+    Attributes:
+        config: The admission settings
+        active: Requests currently holding a slot
+        rejected: Requests rejected because the queue was full
+        timed_out: Requests rejected after waiting queue_timeout
+    """
+
+    def __init__(self, config: AdmissionConfig):
+        self.config = config
+        self.active = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        """Requests waiting for a free slot"""
+        return len(self._waiters)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of the limiter state.
+
+        Returns:
+            Dictionary with limits, active, queued and rejection counts
+        """
+        return {
+            "max_concurrency": self.config.max_concurrency,
+            "max_queue": self.config.max_queue,
+            "active": self.active,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+    async def acquire(self) -> bool:
+        """
+        Wait for a free slot.
+
+        Returns:
+            True if a slot was acquired, False if the request was rejected
+        """
+        if self.active < self.config.max_concurrency and not self._waiters:
+            self.active += 1
+            return True
+
+        if len(self._waiters) >= self.config.max_queue:
+            self.rejected += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            if self.config.queue_timeout is None:
+                await waiter
+            else:
+                await asyncio.wait_for(waiter, self.config.queue_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # A slot was handed over just as we gave up, pass it on
+                self.release()
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                return False
+            raise
+        return True
+
+    def release(self):
+        """Release a slot, handing it to the oldest waiter if any"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # Slot moves to the waiter, active count is unchanged
+                waiter.set_result(None)
+                return
+        self.active -= 1
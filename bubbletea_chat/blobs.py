@@ -0,0 +1,482 @@
+"""
+Content-addressed blob store for uploaded images
+
+Images sent inline as base64 make every chat request carry megabytes of
+JSON, which is held in memory and parsed before the bot runs. With
+run_server(blobs=True) clients upload an image once:
+
+    POST /blobs              raw image bytes, Content-Type: image/png
+    -> {"sha256": "9f86d0...", "size": 48213, "mime_type": "image/png",
+        "deduplicated": false}
+
+and then reference it by hash in chat requests:
+
+    {"type": "user", "message": "What is this?",
+     "images": [{"blob": "9f86d0..."}]}
+
+HEAD /blobs/<sha256> tells a client whether an image is already stored,
+so re-sent images don't have to be uploaded again. The body is streamed
+to disk while it is hashed, never held in memory as a whole. Blobs live
+in a local directory, each under its SHA-256, and expire ttl seconds
+after they were last uploaded. Worker processes share the directory.
+"""
+
+import asyncio
+import base64
+import hashlib
+import os
+import re
+import tempfile
+import time
+from functools import partial
+from typing import Any, AsyncIterable, Callable, Dict, List, Optional, Sequence, Union
+
+# Default largest accepted blob, in bytes
+DEFAULT_BLOB_MAX_BYTES = 20 * 1024 * 1024
+
+# Default most bytes all stored blobs may take up together
+DEFAULT_BLOB_MAX_TOTAL_BYTES = 1024 * 1024 * 1024
+
+# Default seconds a blob is kept after its last upload
+DEFAULT_BLOB_TTL = 24 * 3600.0
+
+# Default URL path of the upload endpoint
+DEFAULT_BLOB_PATH = "/blobs"
+
+# Content type stored for uploads that don't send one
+DEFAULT_MIME_TYPE = "application/octet-stream"
+
+# Seconds between sweeps of expired blobs, at most
+_PURGE_INTERVAL = 60.0
+
+# Bytes of an upload buffered before they are written out
+_WRITE_BATCH = 1024 * 1024
+
+_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+
+# The store opened by the server, used to resolve ImageInput.blob
+_store: Optional["BlobStore"] = None
+
+
+class BlobTooLarge(Exception):
+    """An upload exceeded BlobConfig.max_bytes"""
+
+
+class BlobStoreFull(Exception):
+    """Storing an upload would exceed BlobConfig.max_total_bytes"""
+
+
+class BlobNotFound(KeyError):
+    """No unexpired blob has this hash"""
+
+
+class BlobConfig:
+    """
+    Settings for the blob store.
+
+    Attributes:
+        directory: Directory holding the blobs (a "bubbletea-blobs"
+                   directory in the system temp dir by default)
+        max_bytes: Largest accepted blob; bigger uploads get a 413
+        max_total_bytes: Most bytes all unexpired blobs may take up;
+                         uploads beyond it get a 507
+        ttl: Seconds a blob is kept after its last upload
+        path: URL path of the upload endpoint
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_bytes: int = DEFAULT_BLOB_MAX_BYTES,
+        max_total_bytes: int = DEFAULT_BLOB_MAX_TOTAL_BYTES,
+        ttl: float = DEFAULT_BLOB_TTL,
+        path: str = DEFAULT_BLOB_PATH,
+    ):
+        """Initialize blob store settings.
+
+        Args:
+            directory: Directory holding the blobs
+            max_bytes: Largest accepted blob in bytes
+            max_total_bytes: Most bytes all stored blobs may take up
+            ttl: Seconds a blob is kept after its last upload
+            path: URL path of the upload endpoint
+        """
+        self.directory = directory or os.path.join(
+            tempfile.gettempdir(), "bubbletea-blobs"
+        )
+        self.max_bytes = max_bytes
+        self.max_total_bytes = max_total_bytes
+        self.ttl = ttl
+        self.path = "/" + path.strip("/")
+
+    def __repr__(self) -> str:
+        return (
+            f"BlobConfig(directory={self.directory!r}, max_bytes={self.max_bytes!r}, "
+            f"max_total_bytes={self.max_total_bytes!r}, ttl={self.ttl!r}, "
+            f"path={self.path!r})"
+        )
+
+
+def resolve_blobs(blobs: Union[bool, BlobConfig, None]) -> Optional[BlobConfig]:
+    """
+    Normalize a blobs option to a config or None.
+
+    Args:
+        blobs: True for defaults, a BlobConfig, or False/None
+
+    Returns:
+        BlobConfig when uploads are enabled, else None
+    """
+    if blobs is True:
+        return BlobConfig()
+    if isinstance(blobs, BlobConfig):
+        return blobs
+    return None
+
+
+class BlobInfo:
+    """
+    A stored blob.
+
+    Attributes:
+        sha256: Hex SHA-256 of the content, its key in the store
+        size: Content length in bytes
+        mime_type: Content type given at upload
+        deduplicated: Whether the content was already stored
+    """
+
+    def __init__(
+        self, sha256: str, size: int, mime_type: str, deduplicated: bool = False
+    ):
+        self.sha256 = sha256
+        self.size = size
+        self.mime_type = mime_type
+        self.deduplicated = deduplicated
+
+    def __repr__(self) -> str:
+        return (
+            f"BlobInfo(sha256={self.sha256!r}, size={self.size!r}, "
+            f"mime_type={self.mime_type!r}, deduplicated={self.deduplicated!r})"
+        )
+
+
+class BlobStore:
+    """
+    Blobs stored on disk under their SHA-256.
+
+    Each blob is a file named after its hash, with its content type in a
+    ".type" file next to it. Expiry follows the file's modification
+    time, which every upload of the same content refreshes.
+    """
+
+    def __init__(self, config: Optional[BlobConfig] = None):
+        """Open the store, creating its directory if needed.
+
+        Args:
+            config: Store settings (defaults to BlobConfig())
+        """
+        self.config = config or BlobConfig()
+        os.makedirs(self.config.directory, exist_ok=True)
+        self._next_purge = 0.0
+
+    def path(self, sha256: str) -> str:
+        """
+        File holding a blob.
+
+        Raises:
+            ValueError: sha256 is not a lowercase hex SHA-256
+        """
+        if not isinstance(sha256, str) or not _SHA256.match(sha256):
+            raise ValueError(f"Not a SHA-256 hex digest: {sha256!r}")
+        return os.path.join(self.config.directory, sha256)
+
+    def _expired(self, path: str, now: float) -> bool:
+        try:
+            return os.stat(path).st_mtime + self.config.ttl < now
+        except FileNotFoundError:
+            return True
+
+    def exists(self, sha256: str) -> bool:
+        """Whether an unexpired blob has this hash"""
+        return not self._expired(self.path(sha256), time.time())
+
+    def info(self, sha256: str) -> BlobInfo:
+        """
+        Describe a stored blob.
+
+        Raises:
+            BlobNotFound: No unexpired blob has this hash
+        """
+        path = self.path(sha256)
+        try:
+            stat = os.stat(path)
+            with open(path + ".type") as f:
+                mime_type = f.read()
+        except FileNotFoundError:
+            raise BlobNotFound(sha256)
+        if stat.st_mtime + self.config.ttl < time.time():
+            raise BlobNotFound(sha256)
+        return BlobInfo(sha256, stat.st_size, mime_type)
+
+    def read(self, sha256: str) -> bytes:
+        """
+        Content of a stored blob.
+
+        Raises:
+            BlobNotFound: No unexpired blob has this hash
+        """
+        path = self.path(sha256)
+        if self._expired(path, time.time()):
+            raise BlobNotFound(sha256)
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise BlobNotFound(sha256)
+
+    def data_uri(self, sha256: str, mime_type: Optional[str] = None) -> str:
+        """
+        A stored blob as a base64 data URI, e.g. for an LLM image part.
+
+        Args:
+            sha256: Hash of the blob
+            mime_type: Content type to declare (the uploaded one by default)
+
+        Raises:
+            BlobNotFound: No unexpired blob has this hash
+        """
+        mime_type = mime_type or self.info(sha256).mime_type
+        encoded = base64.b64encode(self.read(sha256)).decode()
+        return f"data:{mime_type};base64,{encoded}"
+
+    async def adata_uri(self, sha256: str, mime_type: Optional[str] = None) -> str:
+        """
+        Async version of data_uri(), reading and encoding in a thread.
+
+        Raises:
+            BlobNotFound: No unexpired blob has this hash
+        """
+        return await _in_thread(self.data_uri, sha256, mime_type)
+
+    def usage(self) -> int:
+        """Bytes taken up by unexpired blobs"""
+        now = time.time()
+        total = 0
+        for name in os.listdir(self.config.directory):
+            if not _SHA256.match(name):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.config.directory, name))
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime + self.config.ttl >= now:
+                total += stat.st_size
+        return total
+
+    async def put(
+        self, chunks: AsyncIterable[bytes], mime_type: Optional[str] = None
+    ) -> BlobInfo:
+        """
+        Store streamed content, hashing it as it is written.
+
+        Args:
+            chunks: The content, e.g. Request.stream()
+            mime_type: Content type of the blob
+
+        Returns:
+            The stored blob; deduplicated if the content was already there
+
+        Raises:
+            BlobTooLarge: The content exceeds max_bytes (nothing is stored)
+            BlobStoreFull: Storing it would exceed max_total_bytes
+        """
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = await _in_thread(
+            tempfile.mkstemp, dir=self.config.directory, suffix=".part"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                # Disk writes go to a thread in batches, off the event loop
+                batch: List[bytes] = []
+                batched = 0
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > self.config.max_bytes:
+                        raise BlobTooLarge(
+                            f"Blob exceeds {self.config.max_bytes} bytes"
+                        )
+                    digest.update(chunk)
+                    batch.append(chunk)
+                    batched += len(chunk)
+                    if batched >= _WRITE_BATCH:
+                        await _in_thread(f.writelines, batch)
+                        batch = []
+                        batched = 0
+                if batch:
+                    await _in_thread(f.writelines, batch)
+            return await _in_thread(
+                self._commit, temp_path, digest.hexdigest(), size, mime_type
+            )
+        finally:
+            await _in_thread(_discard, temp_path)
+
+    def put_bytes(self, data: bytes, mime_type: Optional[str] = None) -> BlobInfo:
+        """
+        Store content held in memory.
+
+        Blocks on the file system; call it from a thread in async code.
+
+        Args:
+            data: The content
+            mime_type: Content type of the blob
+
+        Returns:
+            The stored blob; deduplicated if the content was already there
+
+        Raises:
+            BlobTooLarge: The content exceeds max_bytes
+            BlobStoreFull: Storing it would exceed max_total_bytes
+        """
+        if len(data) > self.config.max_bytes:
+            raise BlobTooLarge(f"Blob exceeds {self.config.max_bytes} bytes")
+        fd, temp_path = tempfile.mkstemp(dir=self.config.directory, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            return self._commit(
+                temp_path, hashlib.sha256(data).hexdigest(), len(data), mime_type
+            )
+        finally:
+            _discard(temp_path)
+
+    def _commit(
+        self, temp_path: str, sha256: str, size: int, mime_type: Optional[str]
+    ) -> BlobInfo:
+        """Move an upload into place, or refresh the copy already stored
+
+        Blocks on the file system (and on a purge sweep now and then), so
+        async callers run it in a thread.
+        """
+        mime_type = mime_type or DEFAULT_MIME_TYPE
+        path = self.path(sha256)
+        now = time.time()
+        deduplicated = not self._expired(path, now)
+        if deduplicated:
+            # Same content, only its expiry moves
+            try:
+                os.utime(path, (now, now))
+            except FileNotFoundError:
+                # Purged by another worker since the check
+                deduplicated = False
+        if not deduplicated:
+            if self.usage() + size > self.config.max_total_bytes:
+                # Expired blobs don't count, but may still be on disk
+                self.purge(now)
+                raise BlobStoreFull(
+                    f"Blob store is full ({self.config.max_total_bytes} bytes)"
+                )
+            os.replace(temp_path, path)
+        with open(path + ".type", "w") as f:
+            f.write(mime_type)
+        if now >= self._next_purge:
+            self._next_purge = now + min(self.config.ttl, _PURGE_INTERVAL)
+            self.purge(now)
+        return BlobInfo(sha256, size, mime_type, deduplicated)
+
+    def purge(self, now: Optional[float] = None) -> int:
+        """
+        Delete expired blobs.
+
+        Args:
+            now: Current time.time() (read from the clock by default)
+
+        Returns:
+            Number of blobs deleted
+        """
+        now = time.time() if now is None else now
+        deleted = 0
+        for name in os.listdir(self.config.directory):
+            if not _SHA256.match(name):
+                continue
+            path = os.path.join(self.config.directory, name)
+            if self._expired(path, now):
+                for stale in (path, path + ".type"):
+                    try:
+                        os.unlink(stale)
+                    except FileNotFoundError:
+                        pass
+                deleted += 1
+        return deleted
+
+
+async def _in_thread(func: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking file system call on the default executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, partial(func, *args, **kwargs))
+
+
+def _discard(path: str):
+    """Delete a leftover temporary upload file, if any"""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def set_blob_store(store: Optional[BlobStore]):
+    """Make a store the one ImageInput.blob references resolve against"""
+    global _store
+    _store = store
+
+
+def get_blob_store() -> Optional[BlobStore]:
+    """The store opened by the server, or None without run_server(blobs=...)"""
+    return _store
+
+
+def load_blob(sha256: str) -> bytes:
+    """
+    Content of an uploaded blob, e.g. an image referenced in a request.
+
+    Args:
+        sha256: Hash from ImageInput.blob
+
+    Returns:
+        The uploaded bytes
+
+    Raises:
+        BlobNotFound: No blob store is open or it has no such blob
+    """
+    if _store is None:
+        raise BlobNotFound(sha256)
+    return _store.read(sha256)
+
+
+def missing_blobs(images: Optional[Sequence[Any]]) -> List[Dict[str, Any]]:
+    """
+    Check that the blobs referenced by request images can be loaded.
+
+    Args:
+        images: Validated ImageInput objects of a request
+
+    Returns:
+        One validation error per reference to a blob that is not stored
+        (or to any blob when no store is open), located like pydantic's
+        errors relative to the images list
+    """
+    errors = []
+    for index, image in enumerate(images or ()):
+        sha256 = getattr(image, "blob", None)
+        if sha256 is None:
+            continue
+        if _store is None or not _store.exists(sha256):
+            errors.append(
+                {
+                    "type": "blob_not_found",
+                    "loc": (index, "blob"),
+                    "msg": f"Blob {sha256} is not stored or has expired",
+                    "input": sha256,
+                }
+            )
+    return errors
@@ -0,0 +1,148 @@
+"""
+Bulk builders for large Cards grids
+
+Product catalogs and search results turn into Cards grids of hundreds of
+cards. Building an Image, a Markdown and a Card model per row, then
+serializing the tree, costs far more than the data itself. bulk_cards()
+takes the values as columns and writes the Cards JSON directly, without
+creating any model. The result is the same bytes the models encode to.
+
+Example:
+    @chatbot("shop", stream=False)
+    def shop_bot(message: str):
+        products = search(message)
+        return bulk_cards_from_rows(
+            {
+                "image_url": p.photo,
+                "text": p.name,
+                "markdown": f"**${p.price}**",
+                "card_value": p.sku,
+            }
+            for p in products
+        )
+"""
+
+from typing import Any, Iterable, List, Mapping, Optional, Sequence
+
+from pydantic_core import to_json
+
+from .frozen import Frozen
+
+ORIENTATIONS = ("wide", "tall")
+
+# Fields of a Card, in the order pydantic writes them
+_CARD = (
+    b'{"type":"card","image":{"type":"image","url":%s,"alt":%s,"content":null},'
+    b'"text":%s,"markdown":%s,"card_value":%s}'
+)
+_MARKDOWN = b'{"type":"markdown","content":%s}'
+_NULL = b"null"
+
+
+def _encode(column: Optional[Sequence[Any]], name: str, size: int) -> List[bytes]:
+    """JSON-encode a column of optional strings"""
+    if column is None:
+        return [_NULL] * size
+    if len(column) != size:
+        raise ValueError(f"{name} has {len(column)} values, expected {size}")
+    encoded = []
+    for value in column:
+        if value is None:
+            encoded.append(_NULL)
+        elif type(value) is str:
+            encoded.append(to_json(value))
+        else:
+            raise TypeError(f"{name} values must be str or None, got {value!r}")
+    return encoded
+
+
+def bulk_cards(
+    image_urls: Sequence[str],
+    texts: Optional[Sequence[Optional[str]]] = None,
+    markdowns: Optional[Sequence[Optional[str]]] = None,
+    card_values: Optional[Sequence[Optional[str]]] = None,
+    alts: Optional[Sequence[Optional[str]]] = None,
+    orient: str = "wide",
+    page_size: Optional[int] = None,
+) -> List[Frozen]:
+    """
+    Build Cards grids from parallel columns, without component models.
+
+    Args:
+        image_urls: Image URL of each card
+        texts: Card texts (None for no text)
+        markdowns: Markdown content of each card (None for none)
+        card_values: Values sent when a card is clicked
+        alts: Image alt texts
+        orient: Grid orientation, "wide" or "tall"
+        page_size: Cards per grid; None puts every card in one grid
+
+    Returns:
+        One frozen Cards component per page, in order. Return the list
+        from a bot to send every page, or one page at a time
+
+    Raises:
+        ValueError: A column has another length than image_urls, or
+                    orient or page_size is invalid
+        TypeError: A value is not a string
+    """
+    if orient not in ORIENTATIONS:
+        raise ValueError(f"orient must be one of {ORIENTATIONS}, got {orient!r}")
+    if page_size is not None and page_size < 1:
+        raise ValueError("page_size must be at least 1")
+    size = len(image_urls)
+    urls = _encode(image_urls, "image_urls", size)
+    if _NULL in urls:
+        raise TypeError("image_urls values must be str")
+    cards = [
+        _CARD
+        % (url, alt, text, _NULL if markdown == _NULL else _MARKDOWN % markdown, value)
+        for url, alt, text, markdown, value in zip(
+            urls,
+            _encode(alts, "alts", size),
+            _encode(texts, "texts", size),
+            _encode(markdowns, "markdowns", size),
+            _encode(card_values, "card_values", size),
+        )
+    ]
+
+    head = b'{"type":"cards","orient":"%s","cards":[' % orient.encode()
+    step = page_size or max(size, 1)
+    return [
+        Frozen.from_json([head + b",".join(cards[start : start + step]) + b"]}"])
+        for start in range(0, max(size, 1), step)
+    ]
+
+
+def bulk_cards_from_rows(
+    rows: Iterable[Mapping[str, Optional[str]]],
+    orient: str = "wide",
+    page_size: Optional[int] = None,
+) -> List[Frozen]:
+    """
+    Build Cards grids from one mapping per card.
+
+    Rows need an "image_url" and may have "text", "markdown",
+    "card_value" and "alt".
+
+    Args:
+        rows: One mapping per card
+        orient: Grid orientation, "wide" or "tall"
+        page_size: Cards per grid; None puts every card in one grid
+
+    Returns:
+        One frozen Cards component per page, see bulk_cards()
+
+    Raises:
+        KeyError: A row has no image_url
+    """
+    rows = list(rows)
+    return bulk_cards(
+        [row["image_url"] for row in rows],
+        texts=[row.get("text") for row in rows],
+        markdowns=[row.get("markdown") for row in rows],
+        card_values=[row.get("card_value") for row in rows],
+        alts=[row.get("alt") for row in rows],
+        orient=orient,
+        page_size=page_size,
+    )
@@ -0,0 +1,356 @@
+"""
+Response caching for BubbleTea chatbots
+
+Bots whose answer only depends on the message and the request fields
+they take can cache their encoded responses. Both JSON
+component lists and complete SSE streams are stored as bytes, so a hit
+is served without running the bot or encoding anything.
+
+Example:
+    @chatbot("faq", cache=CacheConfig(ttl=3600, backend=SQLiteCache("faq.db")))
+    def faq_bot(message: str):
+        ...
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple, Union
+
+from .executor import BoundedExecutor
+
+# Default seconds a cached response stays valid
+DEFAULT_CACHE_TTL = 300.0
+
+# Default number of responses a backend keeps
+DEFAULT_CACHE_ENTRIES = 1024
+
+
+class CacheBackend:
+    """
+    Storage for cached responses.
+
+    Subclasses implement get, set and clear. Keys are short hex strings
+    and values are encoded response bodies.
+    """
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The stored body, or None if missing or expired
+        """
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float]):
+        """
+        Store a response.
+
+        Args:
+            key: Cache key
+            value: Encoded response body
+            ttl: Seconds until the entry expires (None never expires)
+        """
+        raise NotImplementedError
+
+    async def clear(self):
+        """Remove every entry"""
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """
+    In-process LRU cache.
+
+    Each worker process has its own copy.
+
+    Attributes:
+        max_entries: Entries kept before the least recently used is evicted
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Optional[float], bytes]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float]):
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def clear(self):
+        self._entries.clear()
+
+
+class SQLiteCache(CacheBackend):
+    """
+    On-disk LRU cache in a SQLite database.
+
+    The file can be shared by several worker processes and survives
+    restarts. Queries run on a dedicated thread so the event loop never
+    waits for disk I/O.
+
+    Attributes:
+        path: Database file path
+        max_entries: Entries kept before the least recently used is evicted
+    """
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_CACHE_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._pid: Optional[int] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor: Optional[BoundedExecutor] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Runs on the cache thread, which owns the connection
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                "expires_at REAL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed "
+                "ON responses (accessed_at)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    async def _run(self, func, *args):
+        if self._pid != os.getpid():
+            # First use, or a forked worker: threads and connections don't survive fork
+            self._pid = os.getpid()
+            self._conn = None
+            self._executor = BoundedExecutor(1, name="bubbletea-cache")
+        return await self._executor.run(func, *args)
+
+    def _get(self, key: str) -> Optional[bytes]:
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and now >= expires_at:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            conn.commit()
+            return None
+        conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        conn.commit()
+        return value
+
+    def _set(self, key: str, value: bytes, ttl: Optional[float]):
+        conn = self._connect()
+        now = time.time()
+        expires_at = None if ttl is None else now + ttl
+        conn.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+            (key, value, expires_at, now),
+        )
+        (count,) = conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        if count > self.max_entries:
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_entries,),
+            )
+        conn.commit()
+
+    def _clear(self):
+        conn = self._connect()
+        conn.execute("DELETE FROM responses")
+        conn.commit()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._run(self._get, key)
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float]):
+        await self._run(self._set, key, value, ttl)
+
+    async def clear(self):
+        await self._run(self._clear)
+
+
+class CacheConfig:
+    """
+    Response caching settings for a bot.
+
+    Attributes:
+        ttl: Seconds a cached response stays valid (None never expires)
+        key_params: Injected request fields that are part of the cache key
+                    besides the message (e.g. ("user_uuid",)); None keys
+                    on every request field the bot takes, so users who
+                    send the same message don't share answers
+        backend: Where responses are stored (defaults to a MemoryCache)
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[float] = DEFAULT_CACHE_TTL,
+        key_params: Optional[Tuple[str, ...]] = None,
+        backend: Optional[CacheBackend] = None,
+    ):
+        """Initialize caching settings.
+
+        Args:
+            ttl: Seconds a cached response stays valid
+            key_params: Request fields added to the key besides the message
+                        (None for all the bot takes)
+            backend: Storage backend (defaults to MemoryCache())
+        """
+        self.ttl = ttl
+        self.key_params = None if key_params is None else tuple(key_params)
+        self.backend = backend if backend is not None else MemoryCache()
+
+    def __repr__(self) -> str:
+        return (
+            f"CacheConfig(ttl={self.ttl!r}, key_params={self.key_params!r}, "
+            f"backend={self.backend!r})"
+        )
+
+
+def resolve_cache(cache: Union[bool, CacheConfig, None]) -> Optional[CacheConfig]:
+    """
+    Normalize a cache option to a config or None.
+
+    Args:
+        cache: True for defaults, a CacheConfig, or False/None to disable
+
+    Returns:
+        CacheConfig when caching is enabled, else None
+    """
+    if cache is True:
+        return CacheConfig()
+    if isinstance(cache, CacheConfig):
+        return cache
+    return None
+
+
+def _param_value(request: Any, name: str) -> Any:
+    """Key material for a request field, without validating lazy fields"""
+    raw = getattr(request, f"raw_{name}", None)
+    return raw if raw is not None else getattr(request, name, None)
+
+
+class ResponseCache:
+    """
+    A bot's response cache with hit and miss counters.
+
+    Attributes:
+        config: The caching settings
+        key_params: Request fields in the key, from the config or else
+                    every field the bot takes
+        hits: Lookups answered from the cache
+        misses: Lookups that ran the bot
+    """
+
+    def __init__(self, config: CacheConfig, params: Tuple[str, ...] = ()):
+        """Create the cache of one bot.
+
+        Args:
+            config: The caching settings
+            params: Injected request fields the bot takes, keyed on when
+                    config.key_params is None
+        """
+        self.config = config
+        self.key_params = (
+            tuple(params) if config.key_params is None else config.key_params
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, url_path: str, request: Any) -> str:
+        """
+        Build the cache key of a request.
+
+        Args:
+            url_path: The bot's URL path
+            request: The parsed chat request
+
+        Returns:
+            Hex digest of the path, message and configured key params
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(url_path.encode())
+        digest.update(b"\0")
+        digest.update(request.message.encode())
+        for name in self.key_params:
+            value = _param_value(request, name)
+            if not isinstance(value, str):
+                value = json.dumps(value, sort_keys=True, default=str)
+            digest.update(b"\0")
+            digest.update(value.encode())
+        return digest.hexdigest()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """
+        Look up a response, counting the hit or miss.
+
+        Args:
+            key: Key returned by key()
+
+        Returns:
+            The cached body or None
+        """
+        body = await self.config.backend.get(key)
+        if body is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return body
+
+    async def set(self, key: str, body: bytes):
+        """
+        Store a complete response body.
+
+        Args:
+            key: Key returned by key()
+            body: JSON body or complete SSE stream
+        """
+        await self.config.backend.set(key, body, self.config.ttl)
+
+    async def clear(self):
+        """Remove every cached response"""
+        await self.config.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of the cache counters.
+
+        Returns:
+            Dictionary with hits, misses and the hit ratio
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
@@ -1,10 +1,59 @@
 """
 BubbleTea UI Components
+
+Constructors validate their arguments with pydantic by default. Bots that
+build many components from values they already trust (50-card grids,
+thousands of streamed chunks) can switch validation off with
+set_component_validation(False) or run_server(validate_components=False):
+components are then built by storing the fields directly and serialize
+to the same JSON, but wrong argument types are no longer caught.
 """
 
-from typing import List, Literal, Optional, Union
+from typing import Any, Dict, List, Literal, Optional, Set, Union
 from pydantic import BaseModel
 
+# Whether component constructors validate, see set_component_validation()
+_validate = True
+
+# Slot setters of BaseModel, cheaper than object.__setattr__ per call
+_set_dict = BaseModel.__dict__["__dict__"].__set__
+_set_fields_set = BaseModel.__dict__["__pydantic_fields_set__"].__set__
+_set_extra = BaseModel.__dict__["__pydantic_extra__"].__set__
+_set_private = BaseModel.__dict__["__pydantic_private__"].__set__
+
+
+def set_component_validation(enabled: bool):
+    """
+    Turn validation of component constructor arguments on or off.
+
+    Keep it on during development; turn it off in production once the
+    bot is known to pass the right types.
+
+    Args:
+        enabled: Validate arguments (True) or trust them (False)
+    """
+    global _validate
+    _validate = enabled
+
+
+def component_validation() -> bool:
+    """Whether component constructors currently validate"""
+    return _validate
+
+
+def _trust(model: BaseModel, values: Dict[str, Any], fields_set: Set[str]):
+    """
+    Initialize a component from already-typed values, skipping validation.
+
+    Does what BaseModel.model_construct() does, on the instance being
+    initialized. values must hold every field in declaration order (the
+    JSON key order), fields_set the constructor arguments.
+    """
+    _set_dict(model, values)
+    _set_fields_set(model, fields_set)
+    _set_extra(model, None)
+    _set_private(model, None)
+
 
 class Text(BaseModel):
     """Plain text message component"""
@@ -13,7 +62,10 @@ class Text(BaseModel):
     content: str
 
     def __init__(self, content: str):
-        super().__init__(content=content)
+        if _validate:
+            super().__init__(content=content)
+        else:
+            _trust(self, {"type": "text", "content": content}, {"content"})
 
 
 class Image(BaseModel):
@@ -27,7 +79,14 @@ class Image(BaseModel):
     def __init__(
         self, url: str, alt: Optional[str] = None, content: Optional[str] = None
     ):
-        super().__init__(url=url, alt=alt, content=content)
+        if _validate:
+            super().__init__(url=url, alt=alt, content=content)
+        else:
+            _trust(
+                self,
+                {"type": "image", "url": url, "alt": alt, "content": content},
+                {"url", "alt", "content"},
+            )
 
 
 class Markdown(BaseModel):
@@ -37,7 +96,10 @@ class Markdown(BaseModel):
     content: str
 
     def __init__(self, content: str):
-        super().__init__(content=content)
+        if _validate:
+            super().__init__(content=content)
+        else:
+            _trust(self, {"type": "markdown", "content": content}, {"content"})
 
 
 class Card(BaseModel):
@@ -56,9 +118,22 @@ class Card(BaseModel):
         markdown: Optional[Markdown] = None,
         card_value: Optional[str] = None,
     ):
-        super().__init__(
-            image=image, text=text, markdown=markdown, card_value=card_value
-        )
+        if _validate:
+            super().__init__(
+                image=image, text=text, markdown=markdown, card_value=card_value
+            )
+        else:
+            _trust(
+                self,
+                {
+                    "type": "card",
+                    "image": image,
+                    "text": text,
+                    "markdown": markdown,
+                    "card_value": card_value,
+                },
+                {"image", "text", "markdown", "card_value"},
+            )
 
 
 class Cards(BaseModel):
@@ -69,7 +144,15 @@ class Cards(BaseModel):
     cards: List[Card]
 
     def __init__(self, cards: List[Card], orient: Literal["wide", "tall"] = "wide"):
-        super().__init__(cards=cards, orient=orient)
+        if _validate:
+            super().__init__(cards=cards, orient=orient)
+        else:
+            # Copied like validation does, so the caller's list stays theirs
+            _trust(
+                self,
+                {"type": "cards", "orient": orient, "cards": list(cards)},
+                {"cards", "orient"},
+            )
 
 
 class Done(BaseModel):
@@ -86,7 +169,14 @@ class Pill(BaseModel):
     pill_value: Optional[str] = None
 
     def __init__(self, text: str, pill_value: Optional[str] = None):
-        super().__init__(text=text, pill_value=pill_value)
+        if _validate:
+            super().__init__(text=text, pill_value=pill_value)
+        else:
+            _trust(
+                self,
+                {"type": "pill", "text": text, "pill_value": pill_value},
+                {"text", "pill_value"},
+            )
 
 
 class Pills(BaseModel):
@@ -96,7 +186,10 @@ class Pills(BaseModel):
     pills: List[Pill]
 
     def __init__(self, pills: List[Pill]):
-        super().__init__(pills=pills)
+        if _validate:
+            super().__init__(pills=pills)
+        else:
+            _trust(self, {"type": "pills", "pills": list(pills)}, {"pills"})
 
 
 class Video(BaseModel):
@@ -106,7 +199,10 @@ class Video(BaseModel):
     url: str
 
     def __init__(self, url: str):
-        super().__init__(url=url)
+        if _validate:
+            super().__init__(url=url)
+        else:
+            _trust(self, {"type": "video", "url": url}, {"url"})
 
 
 class Block(BaseModel):
@@ -116,7 +212,10 @@ class Block(BaseModel):
     timeout: int = 60
 
     def __init__(self, timeout: int = 60):
-        super().__init__(timeout=timeout)
+        if _validate:
+            super().__init__(timeout=timeout)
+        else:
+            _trust(self, {"type": "block", "timeout": timeout}, {"timeout"})
 
 
 class Error(BaseModel):
@@ -130,7 +229,19 @@ class Error(BaseModel):
     def __init__(
         self, title: str, description: Optional[str] = None, code: Optional[str] = None
     ):
-        super().__init__(title=title, description=description, code=code)
+        if _validate:
+            super().__init__(title=title, description=description, code=code)
+        else:
+            _trust(
+                self,
+                {
+                    "type": "error",
+                    "title": title,
+                    "description": description,
+                    "code": code,
+                },
+                {"title", "description", "code"},
+            )
 
 
 class PaymentRequest(BaseModel):
@@ -141,11 +252,98 @@ class PaymentRequest(BaseModel):
     note: Optional[str] = None
 
     def __init__(self, amount: float, note: Optional[str] = None):
-        super().__init__(amount=amount, note=note)
+        if _validate:
+            super().__init__(amount=amount, note=note)
+        else:
+            # Validation turns an int amount into a float (5 is sent as 5.0)
+            _trust(
+                self,
+                {"type": "payment_request", "amount": float(amount), "note": note},
+                {"amount", "note"},
+            )
+
+
+class TextDelta(BaseModel):
+    """Text appended to the block with the same block_id"""
+
+    type: Literal["text_delta"] = "text_delta"
+    block_id: str
+    content: str
+
+    def __init__(self, content: str, block_id: str):
+        if _validate:
+            super().__init__(content=content, block_id=block_id)
+        else:
+            _trust(
+                self,
+                {"type": "text_delta", "block_id": block_id, "content": content},
+                {"content", "block_id"},
+            )
+
+
+class MarkdownDelta(BaseModel):
+    """Markdown appended to the block with the same block_id"""
+
+    type: Literal["markdown_delta"] = "markdown_delta"
+    block_id: str
+    content: str
+
+    def __init__(self, content: str, block_id: str):
+        if _validate:
+            super().__init__(content=content, block_id=block_id)
+        else:
+            _trust(
+                self,
+                {"type": "markdown_delta", "block_id": block_id, "content": content},
+                {"content", "block_id"},
+            )
+
+
+class BlockSnapshot(BaseModel):
+    """Complete content of a block built from deltas, for late joiners"""
+
+    type: Literal["block_snapshot"] = "block_snapshot"
+    block_id: str
+    format: Literal["text", "markdown"] = "markdown"
+    content: str
+
+    def __init__(
+        self,
+        content: str,
+        block_id: str,
+        format: Literal["text", "markdown"] = "markdown",
+    ):
+        if _validate:
+            super().__init__(content=content, block_id=block_id, format=format)
+        else:
+            _trust(
+                self,
+                {
+                    "type": "block_snapshot",
+                    "block_id": block_id,
+                    "format": format,
+                    "content": content,
+                },
+                {"content", "block_id", "format"},
+            )
 
 
 Component = Union[
-    Text, Image, Markdown, Card, Cards, Done, Pill, Pills, Video, Block, Error, PaymentRequest
+    Text,
+    Image,
+    Markdown,
+    Card,
+    Cards,
+    Done,
+    Pill,
+    Pills,
+    Video,
+    Block,
+    Error,
+    PaymentRequest,
+    TextDelta,
+    MarkdownDelta,
+    BlockSnapshot,
 ]
 
 
@@ -162,4 +360,11 @@ class BaseComponent(BaseModel):
     ):
         if not isinstance(payload, list):
             payload = [payload]
-        super().__init__(payload=payload, thread_id=thread_id)
+        if _validate:
+            super().__init__(payload=payload, thread_id=thread_id)
+        else:
+            _trust(
+                self,
+                {"thread_id": thread_id, "payload": list(payload)},
+                {"payload", "thread_id"},
+            )
@@ -0,0 +1,120 @@
+"""
+Caching for bot configuration endpoints
+
+Config functions are called once and their validated BotConfig is kept
+as pre-serialized JSON bytes with an ETag, so repeated polling of the
+/config routes costs almost nothing.
+"""
+
+import asyncio
+import hashlib
+import time
+from typing import Callable, Optional, Tuple
+
+from .schemas import BotConfig
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header value against an ETag.
+
+    Args:
+        if_none_match: Raw header value (may list several tags or be "*")
+        etag: Current quoted ETag
+
+    Returns:
+        True if the client's cached copy is still current
+    """
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag == etag or tag == f"W/{etag}":
+            return True
+    return False
+
+
+class ConfigCache:
+    """
+    Cached, pre-serialized result of a config function.
+
+    Attributes:
+        func: The config function (sync or async)
+        ttl: Seconds before the config is rebuilt. None caches until
+             invalidate() is called, 0 rebuilds on every request.
+    """
+
+    def __init__(self, func: Callable, ttl: Optional[float] = None):
+        """Initialize the cache.
+
+        Args:
+            func: Config function returning a BotConfig or dict
+            ttl: Optional time-to-live in seconds
+        """
+        self.func = func
+        self.ttl = ttl
+        self._body: Optional[bytes] = None
+        self._etag: Optional[str] = None
+        self._expires_at: Optional[float] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    def invalidate(self):
+        """Drop the cached config so the next request rebuilds it"""
+        self._body = None
+        self._etag = None
+        self._expires_at = None
+
+    def _is_fresh(self) -> bool:
+        if self._body is None:
+            return False
+        return self._expires_at is None or time.monotonic() < self._expires_at
+
+    def store(self, result) -> BotConfig:
+        """
+        Validate and cache a config function result.
+
+        Args:
+            result: BotConfig, dict, or object with BotConfig attributes
+
+        Returns:
+            The validated BotConfig
+        """
+        # Ensure result is a BotConfig instance
+        if isinstance(result, BotConfig):
+            config = result
+        elif isinstance(result, dict):
+            config = BotConfig(**result)
+        else:
+            # Try to convert to BotConfig
+            config = BotConfig.model_validate(result, from_attributes=True)
+
+        body = config.__pydantic_serializer__.to_json(config)
+        self._etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        self._body = body
+        if self.ttl is not None:
+            self._expires_at = time.monotonic() + self.ttl
+        return config
+
+    async def get(self) -> Tuple[bytes, str]:
+        """
+        Get the serialized config, rebuilding it if missing or expired.
+
+        Concurrent requests that miss the cache share a single call
+        to the config function.
+
+        Returns:
+            Tuple of (JSON body, quoted ETag)
+        """
+        if self._is_fresh():
+            return self._body, self._etag
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not self._is_fresh():
+                if asyncio.iscoroutinefunction(self.func):
+                    result = await self.func()
+                else:
+                    result = self.func()
+                self.store(result)
+            return self._body, self._etag
@@ -23,13 +23,90 @@ from typing import (
     Optional,
 )
 
-from .components import Component, Done
-from .schemas import ComponentChatRequest, ComponentChatResponse, ImageInput
+from .admission import AdmissionConfig, resolve_admission
+from .cache import CacheConfig, ResponseCache, resolve_cache
+from .components import Component, Done, Text, component_validation
+from .config_cache import ConfigCache
+from .executor import BoundedExecutor, get_default_executor, iterate_in_thread
+from .frozen import Frozen
+from .schemas import (
+    ComponentChatRequest,
+    ComponentChatResponse,
+    ImageInput,
+    LazyChatRequest,
+)
+from .streaming import CoalesceConfig, resolve_coalesce
 
 # Global registries for managing chatbots and configurations
 _config_function: Optional[Tuple[Callable, str]] = None  # Legacy support
 _chatbot_registry: Dict[str, "ChatbotFunction"] = {}  # All registered chatbots
 _bot_config_registry: Dict[str, Callable] = {}  # Bot-specific configurations
+_config_caches: Dict[str, ConfigCache] = {}  # Config endpoint path -> cache
+
+
+# Request fields that can be injected into chatbot functions by parameter name
+INJECTABLE_PARAMS: Tuple[str, ...] = (
+    "images",
+    "user_email",
+    "user_uuid",
+    "conversation_uuid",
+    "chat_history",
+    "thread_id",
+)
+
+
+class InjectionPlan:
+    """
+    Precomputed parameter-injection plan for a chatbot function.
+
+    Built once when a function is wrapped by @chatbot so that requests
+    only have to execute the plan instead of inspecting the signature.
+
+    Attributes:
+        params: Request fields the function accepts, in injection order
+        accepts: Every parameter name, to match resources against
+        history_as_str: Whether chat_history must be coerced to a string
+        result_kind: One of SYNC, ASYNC, GENERATOR or ASYNC_GENERATOR
+    """
+
+    SYNC = "sync"
+    ASYNC = "async"
+    GENERATOR = "generator"
+    ASYNC_GENERATOR = "async_generator"
+
+    __slots__ = ("params", "accepts", "history_as_str", "result_kind")
+
+    def __init__(self, func: Callable):
+        """Inspect the function once and record how to call it.
+
+        Args:
+            func: The chatbot function to plan for
+        """
+        parameters = inspect.signature(func).parameters
+        self.params = tuple(name for name in INJECTABLE_PARAMS if name in parameters)
+        self.accepts = frozenset(parameters)
+
+        # Check if the function signature expects a string chat history
+        self.history_as_str = False
+        if "chat_history" in parameters:
+            annotation = parameters["chat_history"].annotation
+            self.history_as_str = annotation is str or annotation == Optional[str]
+
+        if inspect.isasyncgenfunction(func):
+            self.result_kind = self.ASYNC_GENERATOR
+        elif inspect.isgeneratorfunction(func):
+            self.result_kind = self.GENERATOR
+        elif inspect.iscoroutinefunction(func):
+            self.result_kind = self.ASYNC
+        else:
+            self.result_kind = self.SYNC
+
+    def __repr__(self) -> str:
+        return (
+            f"InjectionPlan(params={self.params!r}, "
+            f"history_as_str={self.history_as_str!r}, "
+            f"result_kind={self.result_kind!r})"
+        )
 
 
 class ChatbotFunction:
@@ -46,6 +123,13 @@ class ChatbotFunction:
         stream: Whether responses are streamed
         is_async: Whether the function is async
         is_generator: Whether the function yields responses
+        plan: Parameter-injection plan computed at decoration time
+        workers: Thread pool size for sync functions (None uses the server pool)
+        executor: Dedicated thread pool when workers > 0, else None
+        coalesce: Text chunk coalescing settings (None defers to the server)
+        admission: Concurrency limit settings (None defers to the server)
+        cache: Response cache, or None when caching is disabled
+        resources: Shared resources injected by parameter name
     """
 
     def __init__(
@@ -54,6 +138,10 @@ class ChatbotFunction:
         name: str = None,
         stream: bool = None,
         url_path: str = None,
+        workers: Optional[int] = None,
+        coalesce: Union[bool, CoalesceConfig, None] = None,
+        admission: Union[int, AdmissionConfig, None] = None,
+        cache: Union[bool, CacheConfig, None] = None,
     ):
         """Initialize a chatbot function wrapper.
 
@@ -62,25 +150,77 @@ class ChatbotFunction:
             name: Optional bot name (defaults to function name)
             stream: Force streaming mode (auto-detected if None)
             url_path: Custom URL path (defaults to /chat)
+            workers: Thread pool size for synchronous functions.
+                     None shares the server's pool, 0 runs the function
+                     directly on the event loop, N > 0 gives this bot a
+                     dedicated pool of N threads.
+            coalesce: Merge consecutive streamed Text/Markdown chunks.
+                      True or a CoalesceConfig enables it, False disables
+                      it, None uses the server setting.
+            admission: Limit concurrent requests to this bot. An int sets
+                       the maximum concurrency, an AdmissionConfig also
+                       sets the wait queue; None uses the server setting.
+            cache: Cache responses. True caches in memory by message and
+                   every request field the function takes, a CacheConfig
+                   sets the TTL, key params and backend.
         """
         self.func = func
         self.name = name or func.__name__
         self.url_path = url_path or "/chat"
-        self.is_async = inspect.iscoroutinefunction(func)
-        self.is_generator = inspect.isgeneratorfunction(
-            func
-        ) or inspect.isasyncgenfunction(func)
+        self.plan = InjectionPlan(func)
+        self.is_async = self.plan.result_kind == InjectionPlan.ASYNC
+        self.is_generator = self.plan.result_kind in (
+            InjectionPlan.GENERATOR,
+            InjectionPlan.ASYNC_GENERATOR,
+        )
         self.stream = stream if stream is not None else self.is_generator
+        self.workers = workers
+        self.executor = (
+            BoundedExecutor(workers, name=f"bubbletea-{self.name}")
+            if workers
+            else None
+        )
+        self.coalesce = coalesce if coalesce is False else resolve_coalesce(coalesce)
+        self.admission = resolve_admission(admission)
+
+        cache_config = resolve_cache(cache)
+        self.cache = (
+            ResponseCache(cache_config, self.plan.params) if cache_config else None
+        )
+        if cache_config and cache_config.key_params is not None:
+            unknown = set(cache_config.key_params) - set(INJECTABLE_PARAMS)
+            if unknown:
+                raise ValueError(
+                    f"Unknown cache key params {sorted(unknown)}, "
+                    f"expected some of {INJECTABLE_PARAMS}"
+                )
+        self.resources: Dict[str, Any] = {}
         self._config_func = None
 
-    def config(self, func: Callable) -> Callable:
+    def bind_resources(self, values: Dict[str, Any]):
+        """
+        Inject the opened resources whose names the function accepts.
+
+        Args:
+            values: Opened resources by name (see @resource)
+        """
+        self.resources = {
+            name: value for name, value in values.items() if name in self.plan.accepts
+        }
+
+    def config(
+        self, func: Callable = None, ttl: Optional[float] = None
+    ) -> Callable:
         """
         Decorator to attach configuration to this specific bot.
 
         Allows bot-specific configuration without global config.
+        The config is built once and served from cache; pass ttl to
+        rebuild it periodically or call invalidate_config().
 
         Args:
             func: Configuration function returning BotConfig
+            ttl: Optional seconds before the cached config is rebuilt
 
         Returns:
             The configuration function (unchanged)
@@ -98,9 +238,21 @@ class ChatbotFunction:
             ...         description="Real-time weather updates"
             ...     )
         """
-        self._config_func = func
-        _bot_config_registry[self.url_path] = func
-        return func
+
+        def decorator(func: Callable) -> Callable:
+            self._config_func = func
+            _bot_config_registry[self.url_path] = func
+            _config_caches[f"{self.url_path}/config"] = ConfigCache(func, ttl)
+            return func
+
+        # Allow using @bot.config(ttl=...) with parentheses
+        if func is None:
+            return decorator
+        return decorator(func)
+
+    def invalidate_config(self):
+        """Drop this bot's cached config so the next request rebuilds it"""
+        invalidate_config(f"{self.url_path}/config")
 
     async def __call__(
         self,
@@ -111,12 +263,14 @@ class ChatbotFunction:
         conversation_uuid: str = None,
         chat_history: Union[List[Dict[str, Any]], str] = None,
         thread_id: str = None,
+        executor: Optional[BoundedExecutor] = None,
     ) -> Union[List[Component], AsyncGenerator[Component, None]]:
         """
         Execute the wrapped chatbot function with smart parameter injection.
 
         Automatically provides only the parameters that the function accepts,
-        allowing for flexible function signatures.
+        allowing for flexible function signatures. The accepted parameters
+        are resolved once at decoration time (see InjectionPlan).
 
         Args:
             message: User's input message
@@ -126,52 +280,50 @@ class ChatbotFunction:
             conversation_uuid: Conversation identifier
             chat_history: Previous messages in conversation
             thread_id: Thread identifier for grouped conversations
+            executor: Thread pool for synchronous functions when this bot
+                      has no dedicated pool (defaults to the shared pool)
 
         Returns:
             List of components or async generator for streaming
         """
-        # Inspect function signature for smart parameter injection
-        sig = inspect.signature(self.func)
-        params = list(sig.parameters.keys())
-
-        # Build kwargs based on what the function accepts
-        kwargs = {}
-        if "images" in params:
-            kwargs["images"] = images
-        if "user_email" in params:
-            kwargs["user_email"] = user_email
-        if "user_uuid" in params:
-            kwargs["user_uuid"] = user_uuid
-        if "conversation_uuid" in params:
-            kwargs["conversation_uuid"] = conversation_uuid
-        if "thread_id" in params:
-            kwargs["thread_id"] = thread_id
-
-        # Handle chat_history parameter compatibility
-        if "chat_history" in params:
-            # Check if the function signature expects a specific type
-            param_annotation = sig.parameters["chat_history"].annotation
-            if param_annotation is str or param_annotation == Optional[str]:
-                # Function expects string, convert list to string if needed
-                if isinstance(chat_history, list):
-                    kwargs["chat_history"] = str(chat_history)
-                else:
-                    kwargs["chat_history"] = chat_history
-            else:
-                # Function expects list or is untyped, keep as is
-                kwargs["chat_history"] = chat_history
+        plan = self.plan
+        provided = {
+            "images": images,
+            "user_email": user_email,
+            "user_uuid": user_uuid,
+            "conversation_uuid": conversation_uuid,
+            "chat_history": chat_history,
+            "thread_id": thread_id,
+        }
+        kwargs = {param: provided[param] for param in plan.params}
+        if self.resources:
+            kwargs.update(self.resources)
+
+        # Function expects a string history, convert list to string if needed
+        if plan.history_as_str and isinstance(chat_history, list):
+            kwargs["chat_history"] = str(chat_history)
+
+        # Blocking functions run on a thread pool, not the event loop
+        pool = None
+        if self.workers != 0:
+            pool = self.executor or executor or get_default_executor()
 
         # Call function with appropriate parameters
-        if self.is_async:
+        if plan.result_kind == InjectionPlan.ASYNC:
             result = await self.func(message, **kwargs)
+        elif plan.result_kind == InjectionPlan.SYNC and pool:
+            result = await pool.run(self.func, message, **kwargs)
         else:
             result = self.func(message, **kwargs)
 
         # Handle different return types
         if self.is_generator:
             # Generator functions yield components
-            if inspect.isasyncgen(result):
+            if plan.result_kind == InjectionPlan.ASYNC_GENERATOR:
                 return result
+            elif pool:
+                # Advance the sync generator on a worker thread
+                return iterate_in_thread(result, pool)
             else:
                 # Convert sync generator to async
                 async def async_wrapper():
@@ -180,21 +332,38 @@ class ChatbotFunction:
 
                 return async_wrapper()
         else:
+            # Functions may hand back a stream, e.g. `return llm.stream(prompt)`
+            if hasattr(result, "__aiter__"):
+                return result
             # Non-generator functions return list of components
             if not isinstance(result, list):
                 result = [result]
             return result
 
-    async def handle_request(self, request: ComponentChatRequest):
-        """Handle incoming chat request and return appropriate response"""
+    async def handle_request(
+        self,
+        request: Union[ComponentChatRequest, LazyChatRequest],
+        executor: Optional[BoundedExecutor] = None,
+    ):
+        """Handle incoming chat request and return appropriate response
+
+        Only the images and chat_history the function declares are read,
+        so a LazyChatRequest never validates fields the bot ignores.
+
+        Args:
+            request: The chat request (ComponentChatRequest or LazyChatRequest)
+            executor: Server thread pool for synchronous functions
+        """
+        params = self.plan.params
         components = await self(
             request.message,
-            images=request.images,
+            images=request.images if "images" in params else None,
             user_email=request.user_email,
             user_uuid=request.user_uuid,
             conversation_uuid=request.conversation_uuid,
-            chat_history=request.chat_history,
+            chat_history=request.chat_history if "chat_history" in params else None,
             thread_id=request.thread_id,
+            executor=executor,
         )
 
         if self.stream:
@@ -202,19 +371,35 @@ class ChatbotFunction:
             return components
         else:
             # Return list for non-streaming
-            if inspect.isasyncgen(components):
+            if hasattr(components, "__aiter__"):
                 # Collect all components from generator
                 collected = []
                 async for component in components:
                     if not isinstance(component, Done):
                         collected.append(component)
-                return ComponentChatResponse(responses=collected)
-            else:
+                components = collected
+            # Raw str chunks and results are sent as Text
+            components = [
+                Text(component) if type(component) is str else component
+                for component in components
+            ]
+            if component_validation() and not any(
+                isinstance(component, Frozen) for component in components
+            ):
                 return ComponentChatResponse(responses=components)
+            # Trusted and frozen components are already checked, and frozen
+            # ones are spliced in as bytes by the server
+            return ComponentChatResponse.model_construct(responses=list(components))
 
 
 def chatbot(
-    name_or_url: Union[str, Callable] = None, stream: bool = None, name: str = None
+    name_or_url: Union[str, Callable] = None,
+    stream: bool = None,
+    name: str = None,
+    workers: Optional[int] = None,
+    coalesce: Union[bool, CoalesceConfig, None] = None,
+    admission: Union[int, AdmissionConfig, None] = None,
+    cache: Union[bool, CacheConfig, None] = None,
 ) -> Union[ChatbotFunction, Callable[[Callable], ChatbotFunction]]:
     """
     Transform any function into a BubbleTea chatbot.
@@ -231,6 +416,19 @@ def chatbot(
                     Or the function itself when used without parentheses
         stream: Force streaming mode (auto-detected if None)
         name: Explicit bot name (defaults to function name)
+        workers: Thread pool size for synchronous functions. None shares
+                 the server pool, 0 runs on the event loop (needed when the
+                 function calls asyncio.create_task), N > 0 gives the bot
+                 a dedicated pool of N threads
+        coalesce: Merge consecutive streamed Text/Markdown chunks into
+                  fewer SSE frames (True or a CoalesceConfig; None uses
+                  the server setting)
+        admission: Limit concurrent requests (an int max concurrency or an
+                   AdmissionConfig with a wait queue and timeout). Excess
+                   requests get a 503 with Retry-After
+        cache: Cache encoded responses (True, or a CacheConfig with TTL,
+               key params and a MemoryCache/SQLiteCache backend). Works
+               for streaming bots too, only complete streams are stored
 
     Returns:
         ChatbotFunction wrapper or decorator function
@@ -251,6 +449,12 @@ def chatbot(
             ... async def stream_bot(message: str):
             ...     for word in message.split():
             ...         yield Text(word)
+
+        Streaming raw strings (sent as Text, without building models):
+            >>> @chatbot(stream=True)
+            ... async def llm_bot(message: str):
+            ...     async for chunk in llm.stream(message):
+            ...         yield chunk
     """
 
     def decorator(func: Callable) -> ChatbotFunction:
@@ -269,7 +473,14 @@ def chatbot(
                 bot_name = name_or_url.strip("/").replace("-", "_").replace("/", "_")
 
         chatbot_func = ChatbotFunction(
-            func, name=bot_name, stream=stream, url_path=url_path
+            func,
+            name=bot_name,
+            stream=stream,
+            url_path=url_path,
+            workers=workers,
+            coalesce=coalesce,
+            admission=admission,
+            cache=cache,
         )
 
         # Check if this URL path is already registered
@@ -329,16 +540,21 @@ def get_bot_configs() -> Dict[str, Callable]:
     return _bot_config_registry.copy()
 
 
-def config(path: str = "/config") -> Union[Callable, Callable[[Callable], Callable]]:
+def config(
+    path: str = "/config", ttl: Optional[float] = None
+) -> Union[Callable, Callable[[Callable], Callable]]:
     """
     Define global bot configuration.
 
     Sets up a configuration endpoint that returns bot metadata,
     settings, and capabilities. This is used by BubbleTea to
-    understand how to interact with your bot.
+    understand how to interact with your bot. The config is built
+    once and served from cache with an ETag.
 
     Args:
         path: Custom path for config endpoint (default: /config)
+        ttl: Optional seconds before the cached config is rebuilt
+             (None caches until invalidate_config() is called)
 
     Returns:
         Decorator function or decorated function
@@ -362,16 +578,55 @@ def config(path: str = "/config") -> Union[Callable, Callable[[Callable], Callab
         For multiple bots, use bot-specific config instead:
         @bot_name.config
     """
+    global _config_function
 
     def decorator(func: Callable) -> Callable:
         global _config_function
         _config_function = (func, path)
+        _config_caches[path] = ConfigCache(func, ttl)
         return func
 
     # Allow using @config without parentheses
     if callable(path):
         func = path
         _config_function = (func, "/config")
+        _config_caches["/config"] = ConfigCache(func, ttl)
         return func
 
     return decorator
+
+
+def get_config_cache(path: str, func: Callable) -> ConfigCache:
+    """
+    Get the cache serving a config endpoint.
+
+    Args:
+        path: Config endpoint path
+        func: Config function registered for the path
+
+    Returns:
+        The registered ConfigCache, or a new one if func was registered
+        without going through a config decorator
+    """
+    cache = _config_caches.get(path)
+    if cache is None or cache.func is not func:
+        cache = ConfigCache(func)
+        _config_caches[path] = cache
+    return cache
+
+
+def invalidate_config(path: Optional[str] = None):
+    """
+    Drop cached configs so they are rebuilt on the next request.
+
+    Args:
+        path: Config endpoint path to invalidate (default: all of them)
+
+    Example:
+        >>> bt.invalidate_config()  # e.g. after changing pricing
+    """
+    if path is None:
+        for cache in _config_caches.values():
+            cache.invalidate()
+    elif path in _config_caches:
+        _config_caches[path].invalidate()
@@ -0,0 +1,104 @@
+"""
+Client disconnect detection for BubbleTea chat requests
+
+Watches the ASGI receive channel while a bot is working and cancels the
+bot as soon as the client goes away, so abandoned chats stop consuming
+CPU, sockets and upstream LLM tokens.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Optional
+
+
+class ClientDisconnected(Exception):
+    """Raised when the client disconnected while the bot was working"""
+
+
+class DisconnectWatcher:
+    """
+    Cancels guarded awaits of the current task when the client disconnects.
+
+    Only awaits wrapped in guard() are cancelled. A disconnect that
+    arrives between them just sets `disconnected`, which callers check
+    before doing more work.
+
+    Example:
+        >>> watcher = DisconnectWatcher(request.receive)
+        >>> watcher.start()
+        >>> try:
+        ...     result = await watcher.guard(slow_call())
+        ... finally:
+        ...     watcher.stop()
+
+    Attributes:
+        disconnected: Whether the client has gone away
+    """
+
+    def __init__(self, receive: Callable[[], Awaitable[Any]]):
+        """Initialize the watcher.
+
+        Args:
+            receive: ASGI receive callable of the request
+        """
+        self.disconnected = False
+        self._receive = receive
+        self._task: Optional[asyncio.Task] = None
+        self._watch_task: Optional[asyncio.Task] = None
+        self._armed = False
+
+    def start(self):
+        """Start watching on behalf of the current task"""
+        self._task = asyncio.current_task()
+        self._watch_task = asyncio.ensure_future(self._watch())
+
+    def stop(self):
+        """Stop watching"""
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            self._watch_task = None
+
+    async def _watch(self):
+        while True:
+            message = await self._receive()
+            if message["type"] == "http.disconnect":
+                break
+        self.disconnected = True
+        if self._armed:
+            self._task.cancel()
+
+    def _absorb_cancel(self) -> bool:
+        """Undo our own cancellation, unless someone else cancelled too"""
+        uncancel = getattr(self._task, "uncancel", None)
+        if uncancel is None:
+            # Python < 3.11 has no cancellation count to check
+            return True
+        return uncancel() == 0
+
+    async def guard(self, awaitable: Awaitable[Any]) -> Any:
+        """
+        Await something that should stop when the client disconnects.
+
+        Args:
+            awaitable: Typically the bot call or the next stream item
+
+        Returns:
+            The awaitable's result
+
+        Raises:
+            ClientDisconnected: The client went away while waiting
+        """
+        if self.disconnected:
+            close = getattr(awaitable, "close", None)
+            if close is not None:
+                # Never started, close it to avoid a "never awaited" warning
+                close()
+            raise ClientDisconnected()
+        self._armed = True
+        try:
+            return await awaitable
+        except asyncio.CancelledError:
+            if self.disconnected and self._absorb_cancel():
+                raise ClientDisconnected() from None
+            raise
+        finally:
+            self._armed = False
@@ -0,0 +1,156 @@
+"""
+Graceful draining for BubbleTea servers
+
+When the process is asked to stop (SIGTERM on scale-in or deploys),
+uvicorn stops accepting connections and waits for the requests in
+progress. With a drain timeout the server additionally:
+
+- answers /health and new chat requests with 503 while draining, so load
+  balancers move traffic elsewhere
+- lets in-flight requests and streams finish until the deadline, then
+  cancels the rest
+- gives background jobs the remaining time to finish
+- prints what was abandoned
+
+Example:
+    # Cloud Run sends SIGKILL 10 s after SIGTERM
+    run_server(drain_timeout=8)
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+
+
+class DrainState:
+    """
+    In-flight chat requests of one server and its draining flag.
+
+    Only used from the event loop thread, so no locking is needed.
+
+    Attributes:
+        timeout: Seconds requests and jobs get once draining started
+                 (None waits without limit)
+        draining: Whether the server is shutting down
+        started_at: monotonic() time draining started
+        active: Chat requests and streams in progress per bot
+        finished: Requests that completed while draining
+        abandoned: Requests cancelled while draining, per bot
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.timeout = timeout
+        self.draining = False
+        self.started_at: Optional[float] = None
+        self.active: Dict[str, int] = {}
+        self.finished = 0
+        self.abandoned: Dict[str, int] = {}
+        self._idle: Optional[asyncio.Event] = None
+
+    @property
+    def in_flight(self) -> int:
+        """Chat requests and streams in progress"""
+        return sum(self.active.values())
+
+    def start(self):
+        """Enter draining mode (idempotent)"""
+        if not self.draining:
+            self.draining = True
+            self.started_at = time.monotonic()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left until the deadline (None without a timeout)"""
+        if self.timeout is None:
+            return None
+        if self.started_at is None:
+            return self.timeout
+        return max(0.0, self.started_at + self.timeout - time.monotonic())
+
+    def enter(self, bot: str):
+        """A chat request for bot started"""
+        self.active[bot] = self.active.get(bot, 0) + 1
+
+    def leave(self, bot: str, cancelled: bool = False):
+        """
+        A chat request for bot ended.
+
+        Args:
+            bot: URL path of the bot
+            cancelled: Whether it was cancelled rather than completed
+        """
+        self.active[bot] -= 1
+        if self.draining:
+            if cancelled:
+                self.abandoned[bot] = self.abandoned.get(bot, 0) + 1
+            else:
+                self.finished += 1
+        if not self.in_flight and self._idle is not None:
+            self._idle.set()
+
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until no chat request is in progress.
+
+        Args:
+            timeout: Seconds to wait (None waits without limit)
+
+        Returns:
+            True if every request ended in time
+        """
+        while self.in_flight:
+            self._idle = asyncio.Event()
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    def report(self, jobs_abandoned: int = 0) -> Dict[str, Any]:
+        """
+        Summary of the drain.
+
+        Args:
+            jobs_abandoned: Background jobs that didn't finish
+
+        Returns:
+            Dictionary with finished, abandoned and still running requests
+            and abandoned background jobs
+        """
+        return {
+            "finished": self.finished,
+            "abandoned": dict(self.abandoned),
+            "still_running": self.in_flight,
+            "jobs_abandoned": jobs_abandoned,
+        }
+
+
+# Drain states of the apps served by this process
+_states: List[DrainState] = []
+
+
+def register(state: DrainState):
+    """Put a server's state under control of begin_drain()"""
+    if state not in _states:
+        _states.append(state)
+
+
+def unregister(state: DrainState):
+    """Release a state registered with register()"""
+    if state in _states:
+        _states.remove(state)
+
+
+def begin_drain():
+    """Switch every registered server to draining mode"""
+    for state in _states:
+        state.start()
+
+
+class DrainingServer(uvicorn.Server):
+    """uvicorn server that starts draining as soon as it is asked to exit"""
+
+    def handle_exit(self, sig, frame):
+        begin_drain()
+        super().handle_exit(sig, frame)
@@ -0,0 +1,186 @@
+"""
+Server-Sent Events encoders for BubbleTea components
+
+Encoders turn components (or any JSON-compatible value) into ready-to-send
+``bytes``. The server writes these frames directly, so no intermediate
+``str`` is built and encoded again. The pydantic backend is always
+available; orjson and msgspec backends are used when installed.
+
+Components are always serialized by pydantic-core, which writes models
+straight to JSON. Going through model_dump() and another library is
+about twice as slow, so the optional backends only encode plain values
+such as dicts and lists.
+"""
+
+from typing import Any, Callable, Dict, Union
+
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+from .components import Done
+
+SSE_PREFIX = b"data: "
+SSE_SUFFIX = b"\n\n"
+
+# A Text component around an already-encoded JSON string, for raw str chunks
+TEXT_TEMPLATE = b'{"type":"text","content":%s}'
+TEXT_FRAME_TEMPLATE = SSE_PREFIX + TEXT_TEMPLATE + SSE_SUFFIX
+
+
+class SSEEncoder:
+    """
+    Base class for component encoders.
+
+    Subclasses implement dumps(); frame() and the pre-encoded Done frame
+    are derived from it.
+
+    Attributes:
+        name: Backend name used with get_encoder()
+        done_frame: Pre-encoded SSE frame for the stream completion signal
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self.done_frame = self.frame(Done())
+
+    def dumps(self, obj: Any) -> bytes:
+        """
+        Serialize a component or JSON-compatible value to JSON bytes.
+
+        Args:
+            obj: Pydantic model, dict, list or scalar
+
+        Returns:
+            Compact JSON encoding of obj
+        """
+        raise NotImplementedError
+
+    def frame(self, obj: Any) -> bytes:
+        """
+        Encode a value as a complete SSE ``data:`` frame.
+
+        Args:
+            obj: Pydantic model, dict, list or scalar
+
+        Returns:
+            The frame bytes, including the trailing blank line
+        """
+        return SSE_PREFIX + self.dumps(obj) + SSE_SUFFIX
+
+    def text(self, content: str) -> bytes:
+        """
+        Encode a str as a Text component without building the model.
+
+        Args:
+            content: The text
+
+        Returns:
+            The same JSON as dumps(Text(content))
+        """
+        return TEXT_TEMPLATE % self.dumps(content)
+
+    def text_frame(self, content: str) -> bytes:
+        """
+        Encode a str as a complete Text SSE frame without building the model.
+
+        Only the string itself is escaped, into a pre-built template.
+
+        Args:
+            content: The text
+
+        Returns:
+            The same frame as frame(Text(content))
+        """
+        return TEXT_FRAME_TEMPLATE % self.dumps(content)
+
+
+class PydanticEncoder(SSEEncoder):
+    """Default encoder using pydantic-core's native JSON serializer"""
+
+    name = "pydantic"
+
+    def dumps(self, obj: Any) -> bytes:
+        if isinstance(obj, BaseModel):
+            return obj.__pydantic_serializer__.to_json(obj)
+        return to_json(obj)
+
+
+class OrjsonEncoder(SSEEncoder):
+    """Encoder using orjson (pip install orjson) for plain values"""
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self._dumps = orjson.dumps
+        super().__init__()
+
+    def dumps(self, obj: Any) -> bytes:
+        if isinstance(obj, BaseModel):
+            return obj.__pydantic_serializer__.to_json(obj)
+        return self._dumps(obj)
+
+
+class MsgspecEncoder(SSEEncoder):
+    """Encoder using msgspec (pip install msgspec) for plain values"""
+
+    name = "msgspec"
+
+    def __init__(self):
+        import msgspec
+
+        self._dumps = msgspec.json.Encoder().encode
+        super().__init__()
+
+    def dumps(self, obj: Any) -> bytes:
+        if isinstance(obj, BaseModel):
+            return obj.__pydantic_serializer__.to_json(obj)
+        return self._dumps(obj)
+
+
+_ENCODERS: Dict[str, Callable[[], SSEEncoder]] = {
+    "pydantic": PydanticEncoder,
+    "orjson": OrjsonEncoder,
+    "msgspec": MsgspecEncoder,
+}
+
+# Shared default instance, safe to reuse because encoders are stateless
+default_encoder = PydanticEncoder()
+
+# Pre-encoded stream completion frame
+DONE_FRAME = default_encoder.done_frame
+
+
+def get_encoder(encoder: Union[str, SSEEncoder, None] = None) -> SSEEncoder:
+    """
+    Resolve an encoder by name or pass an instance through.
+
+    Args:
+        encoder: "pydantic", "orjson", "msgspec", an SSEEncoder instance,
+                 or None for the pydantic default
+
+    Returns:
+        An SSEEncoder instance
+
+    Raises:
+        ValueError: If the name is unknown
+        ImportError: If the backend's package is not installed
+    """
+    if encoder is None or encoder == "pydantic":
+        return default_encoder
+    if isinstance(encoder, SSEEncoder):
+        return encoder
+    if encoder not in _ENCODERS:
+        raise ValueError(
+            f"Unknown encoder '{encoder}'. Choose one of: {', '.join(_ENCODERS)}"
+        )
+    try:
+        return _ENCODERS[encoder]()
+    except ImportError:
+        raise ImportError(
+            "\n"
+            f"{encoder} is not installed. To use the {encoder} encoder, install with:\n"
+            f"  pip install {encoder}\n"
+        )
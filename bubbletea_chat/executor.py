@@ -0,0 +1,241 @@
+"""
+Thread pool execution for synchronous chatbot functions
+
+Synchronous bot functions (e.g. ones calling blocking LLM SDKs) are run
+on a bounded thread pool so they never block the event loop that serves
+every other request. Synchronous generators are drained by a worker
+thread and handed to the event loop through a bounded buffer.
+"""
+
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncGenerator, Callable, Dict, Iterator, Optional
+
+# Default number of worker threads for synchronous chatbot functions
+DEFAULT_SYNC_WORKERS = 40
+
+# Default number of items a sync generator may produce ahead of the consumer
+DEFAULT_STREAM_BUFFER = 8
+
+
+class BoundedExecutor:
+    """
+    Bounded thread pool for running synchronous chatbot functions.
+
+    Work submitted through run() executes in a copy of the caller's
+    context, so contextvars set by the server or middleware are still
+    visible inside the bot function.
+
+    Attributes:
+        max_workers: Maximum number of worker threads
+        name: Prefix used for worker thread names
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_SYNC_WORKERS, name: str = "bubbletea"):
+        """Initialize the executor.
+
+        Args:
+            max_workers: Maximum number of worker threads (must be >= 1)
+            name: Prefix used for worker thread names
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.max_workers = max_workers
+        self.name = name
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=name
+        )
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._completed = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of submitted calls waiting for a free worker thread"""
+        return self._queued
+
+    @property
+    def active(self) -> int:
+        """Number of calls currently running on a worker thread"""
+        return self._active
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of pool utilisation.
+
+        Returns:
+            Dictionary with max_workers, active, queued and completed counts
+        """
+        return {
+            "max_workers": self.max_workers,
+            "active": self._active,
+            "queued": self._queued,
+            "completed": self._completed,
+        }
+
+    def _run_in_worker(
+        self, ctx: contextvars.Context, func: Callable, /, *args, **kwargs
+    ):
+        """Run func on a worker thread inside the caller's context"""
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+        try:
+            return ctx.run(func, *args, **kwargs)
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._completed += 1
+
+    def submit(self, func: Callable, /, *args, **kwargs):
+        """
+        Submit func to the pool and return a concurrent future.
+
+        Args:
+            func: Synchronous callable to run
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            concurrent.futures.Future for the call
+        """
+        ctx = contextvars.copy_context()
+        with self._lock:
+            self._queued += 1
+        try:
+            return self._pool.submit(self._run_in_worker, ctx, func, *args, **kwargs)
+        except BaseException:
+            with self._lock:
+                self._queued -= 1
+            raise
+
+    async def run(self, func: Callable, /, *args, **kwargs) -> Any:
+        """
+        Run a synchronous callable on the pool without blocking the event loop.
+
+        Args:
+            func: Synchronous callable to run
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            The callable's return value
+        """
+        return await asyncio.wrap_future(self.submit(func, *args, **kwargs))
+
+    def shutdown(self, wait: bool = True):
+        """
+        Shut down the worker threads.
+
+        Args:
+            wait: Block until running calls have finished
+        """
+        self._pool.shutdown(wait=wait)
+
+
+_default_executor: Optional[BoundedExecutor] = None
+_default_executor_lock = threading.Lock()
+
+
+def get_default_executor() -> BoundedExecutor:
+    """
+    Get the process-wide executor used when no other executor is configured.
+
+    Returns:
+        Lazily created BoundedExecutor with DEFAULT_SYNC_WORKERS threads
+    """
+    global _default_executor
+    if _default_executor is None:
+        with _default_executor_lock:
+            if _default_executor is None:
+                _default_executor = BoundedExecutor(DEFAULT_SYNC_WORKERS)
+    return _default_executor
+
+
+class _Failure:
+    """Exception raised by a sync generator, forwarded to the consumer"""
+
+    __slots__ = ("error",)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+_END = object()  # Marks exhaustion of a sync generator
+
+
+async def iterate_in_thread(
+    iterator: Iterator[Any],
+    executor: BoundedExecutor,
+    max_buffer: int = DEFAULT_STREAM_BUFFER,
+) -> AsyncGenerator[Any, None]:
+    """
+    Consume a synchronous iterator from async code without blocking the loop.
+
+    A worker thread advances the iterator and hands items to the event loop
+    through a buffer of at most max_buffer items. When the buffer is full
+    the worker waits, so a slow consumer throttles the producer. When the
+    consumer stops early (e.g. the client disconnected), the worker stops
+    after its current next() call and closes the generator in its own
+    thread, running any finally blocks it contains.
+
+    Note that each active stream holds one worker thread for its lifetime.
+
+    Args:
+        iterator: Synchronous iterator or generator to consume
+        executor: Pool providing the worker thread
+        max_buffer: Maximum number of items produced ahead of the consumer
+
+    Yields:
+        Items produced by the iterator, in order
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    slots = threading.Semaphore(max_buffer)
+    stop = threading.Event()
+
+    def hand_over(item: Any):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            # Event loop already closed, nobody is listening anymore
+            stop.set()
+
+    def produce():
+        try:
+            for item in iterator:
+                slots.acquire()
+                if stop.is_set():
+                    break
+                hand_over(item)
+        except BaseException as e:
+            hand_over(_Failure(e))
+        finally:
+            try:
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    close()
+            except BaseException as e:
+                # Raised by the generator's own cleanup
+                hand_over(_Failure(e))
+            finally:
+                # Always, or the consumer would wait forever
+                hand_over(_END)
+
+    executor.submit(produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _END:
+                break
+            if isinstance(item, _Failure):
+                raise item.error
+            slots.release()
+            yield item
+    finally:
+        stop.set()
+        # Wake the worker if it is waiting for buffer space
+        slots.release()
@@ -0,0 +1,211 @@
+"""
+Frozen components for BubbleTea chatbots
+
+Menus, help texts and other responses that never change can be declared
+once with frozen(). They are checked and serialized at declaration, and
+the server writes the cached bytes directly, both as SSE frames and in
+non-streaming JSON responses.
+
+Example:
+    HELP = frozen(Markdown("**Commands:** ..."))
+    GENRES = frozen([Text("Pick a genre:"), Pills([Pill("Drama"), ...])])
+
+    @chatbot("movies", stream=False)
+    def movies_bot(message: str):
+        if message == "help":
+            return HELP
+        return [Text(f"You said {message}"), GENRES]
+
+Frozen components may be mixed with regular ones, in lists and in
+streams. Changing a component after freezing it doesn't change what is
+sent.
+"""
+
+import json
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from pydantic import BaseModel, TypeAdapter
+
+from . import components as _components
+from .components import BaseComponent, Component
+from .encoders import SSE_PREFIX, SSE_SUFFIX, SSEEncoder
+
+_COMPONENTS_ADAPTER = TypeAdapter(List[Union[Component, BaseComponent]])
+
+# Component classes by their "type" tag, to rebuild encoded components
+_CLASSES: Dict[str, type] = {
+    cls.model_fields["type"].default: cls
+    for cls in (
+        _components.Text,
+        _components.Image,
+        _components.Markdown,
+        _components.Card,
+        _components.Cards,
+        _components.Done,
+        _components.Pill,
+        _components.Pills,
+        _components.Video,
+        _components.Block,
+        _components.Error,
+        _components.PaymentRequest,
+        _components.TextDelta,
+        _components.MarkdownDelta,
+        _components.BlockSnapshot,
+    )
+}
+
+
+def _load(value: Any) -> Any:
+    """Rebuild components from their decoded JSON form"""
+    if isinstance(value, list):
+        return [_load(item) for item in value]
+    if isinstance(value, dict):
+        fields = {name: _load(item) for name, item in value.items() if name != "type"}
+        if "type" in value:
+            return _CLASSES[value["type"]](**fields)
+        return BaseComponent(**fields)
+    return value
+
+
+class Frozen:
+    """
+    Components serialized once and sent as cached bytes.
+
+    Attributes:
+        components: The components, in order
+        json: Compact JSON bytes of each component
+        frames: SSE frames of all components, concatenated
+        body: Non-streaming response body when returned on its own
+    """
+
+    __slots__ = ("_components", "json", "frames", "body")
+
+    def __init__(self, components: Union[BaseModel, Sequence[Any]]):
+        """Check and serialize the components.
+
+        Args:
+            components: A component, or a list of components and
+                        Frozen instances
+
+        Raises:
+            ValidationError: An item is not a component
+        """
+        if not isinstance(components, (list, tuple)):
+            components = [components]
+        items: List[Any] = []
+        for item in components:
+            if isinstance(item, Frozen):
+                items.extend(item.components)
+            else:
+                items.append(item)
+        self._components: Optional[Tuple[BaseModel, ...]] = tuple(
+            _COMPONENTS_ADAPTER.validate_python(items)
+        )
+        self._encode(
+            tuple(
+                component.__pydantic_serializer__.to_json(component)
+                for component in self._components
+            )
+        )
+
+    @classmethod
+    def from_json(cls, encoded: Sequence[bytes]) -> "Frozen":
+        """
+        Wrap components that are already encoded, e.g. by bulk_cards().
+
+        The components themselves are only rebuilt from the JSON when
+        something iterates them, such as a request hook.
+
+        Args:
+            encoded: Compact JSON bytes of each component, as the pydantic
+                     encoder writes them
+
+        Returns:
+            Frozen components sending these bytes
+        """
+        frozen = cls.__new__(cls)
+        frozen._components = None
+        frozen._encode(tuple(encoded))
+        return frozen
+
+    def _encode(self, encoded: Tuple[bytes, ...]):
+        self.json = encoded
+        self.frames = b"".join(SSE_PREFIX + data + SSE_SUFFIX for data in encoded)
+        self.body = b'{"responses":[' + b",".join(encoded) + b"]}"
+
+    @property
+    def components(self) -> Tuple[BaseModel, ...]:
+        """The components, in order"""
+        if self._components is None:
+            self._components = tuple(_load(json.loads(data)) for data in self.json)
+        return self._components
+
+    def __iter__(self) -> Iterator[BaseModel]:
+        return iter(self.components)
+
+    def __len__(self) -> int:
+        return len(self.json)
+
+    def __repr__(self) -> str:
+        return f"Frozen({list(self.components)!r})"
+
+
+def frozen(components: Union[BaseModel, Sequence[Any]]) -> Frozen:
+    """
+    Declare components that never change, serialized once.
+
+    Call it at import time and return (or yield) the result from the bot.
+
+    Args:
+        components: A component or a list of components
+
+    Returns:
+        Frozen components, usable wherever a component is
+
+    Examples:
+        >>> HELP = frozen(Markdown("**Commands:** start, stop"))
+        >>> MENU = frozen([Text("Choose:"), Pills([Pill("A"), Pill("B")])])
+    """
+    return Frozen(components)
+
+
+def expand(components: Sequence[Any]) -> Iterator[Any]:
+    """Iterate components with frozen ones replaced by their contents"""
+    for component in components:
+        if isinstance(component, Frozen):
+            yield from component.components
+        else:
+            yield component
+
+
+def count_components(components: Sequence[Any]) -> int:
+    """Number of components, counting those inside frozen ones"""
+    return sum(
+        len(component) if isinstance(component, Frozen) else 1
+        for component in components
+    )
+
+
+def encode_response(encoder: SSEEncoder, response: Any) -> bytes:
+    """
+    Serialize a ComponentChatResponse, splicing in frozen bytes.
+
+    Args:
+        encoder: Encoder for the components that aren't frozen
+        response: The response to serialize
+
+    Returns:
+        The same JSON the encoder writes for the expanded response
+    """
+    responses = response.responses
+    if len(responses) == 1 and isinstance(responses[0], Frozen):
+        return responses[0].body
+    if not any(isinstance(component, Frozen) for component in responses):
+        return encoder.dumps(response)
+    parts = []
+    for component in responses:
+        if isinstance(component, Frozen):
+            parts.extend(component.json)
+        else:
+            parts.append(encoder.dumps(component))
+    return b'{"responses":[' + b",".join(parts) + b"]}"
@@ -0,0 +1,148 @@
+"""
+Request lifecycle hooks and timing for BubbleTea chatbots
+
+Hooks are notified as a chat request moves through the server: after it
+was parsed, for every component the bot produces, and when it completes
+or fails. Each request carries a RequestContext with per-phase timings
+that the server can also report in Server-Timing headers.
+
+Example:
+    class SlowRequestLogger(RequestHooks):
+        def on_complete(self, ctx):
+            if ctx.elapsed() > 2:
+                print(ctx.bot, ctx.server_timing())
+
+    run_server(hooks=[SlowRequestLogger()])
+"""
+
+import json
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+# Name of the SSE event carrying the timings of a stream
+TIMING_EVENT = "server-timing"
+
+
+class RequestContext:
+    """
+    State of one chat request, shared by all hooks.
+
+    Attributes:
+        bot: URL path of the bot handling the request
+        request: The parsed chat request
+        start: perf_counter() value when the request arrived
+        timings: Seconds spent per phase ("parse", "admission", "bot",
+                 "serialize", "first_component", "encode", "total")
+        components: Components produced so far
+        state: Free-form storage for hooks
+    """
+
+    __slots__ = ("bot", "request", "start", "timings", "components", "state")
+
+    def __init__(self, bot: str, request: Any, start: float):
+        self.bot = bot
+        self.request = request
+        self.start = start
+        self.timings: Dict[str, float] = {}
+        self.components = 0
+        self.state: Dict[str, Any] = {}
+
+    def elapsed(self) -> float:
+        """Seconds since the request arrived"""
+        return time.perf_counter() - self.start
+
+    def record(self, phase: str, seconds: float):
+        """
+        Add time spent in a phase.
+
+        Args:
+            phase: Phase name
+            seconds: Duration to add
+        """
+        self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+
+    def server_timing(self) -> str:
+        """
+        Format the timings as a Server-Timing header value.
+
+        Returns:
+            e.g. "parse;dur=0.12, bot;dur=35.40, total;dur=35.91" (milliseconds)
+        """
+        return ", ".join(
+            f"{phase};dur={seconds * 1000:.2f}" for phase, seconds in self.timings.items()
+        )
+
+
+class RequestHooks:
+    """
+    Base class for request lifecycle hooks.
+
+    Override the methods you need. Hooks run on the event loop for every
+    request (on_component for every component), so they should be quick;
+    hand slow work such as exporting to a task or thread. Exceptions
+    raised by hooks are printed and never fail the request.
+    """
+
+    def on_request_start(self, ctx: RequestContext):
+        """The request was parsed and the bot is about to run"""
+
+    def on_first_component(self, ctx: RequestContext, component: Any):
+        """The bot produced its first component"""
+
+    def on_component(self, ctx: RequestContext, component: Any):
+        """The bot produced a component (including the first)"""
+
+    def on_complete(self, ctx: RequestContext):
+        """The response was fully produced"""
+
+    def on_error(self, ctx: RequestContext, error: BaseException):
+        """The bot or the response encoding failed"""
+
+
+class HookRunner:
+    """
+    Calls every registered hook, isolating the request from hook errors.
+
+    Attributes:
+        hooks: The registered hooks, called in order
+    """
+
+    def __init__(self, hooks: Optional[Iterable[RequestHooks]] = None):
+        self.hooks: List[RequestHooks] = list(hooks or ())
+
+    def _call(self, event: str, *args):
+        for hook in self.hooks:
+            try:
+                getattr(hook, event)(*args)
+            except Exception as e:
+                print(f"Error in {type(hook).__name__}.{event}: {e}")
+
+    def request_start(self, ctx: RequestContext):
+        self._call("on_request_start", ctx)
+
+    def component(self, ctx: RequestContext, component: Any):
+        """Count a component and notify on_first_component/on_component"""
+        ctx.components += 1
+        if ctx.components == 1:
+            self._call("on_first_component", ctx, component)
+        self._call("on_component", ctx, component)
+
+    def complete(self, ctx: RequestContext):
+        self._call("on_complete", ctx)
+
+    def error(self, ctx: RequestContext, error: BaseException):
+        self._call("on_error", ctx, error)
+
+
+def timing_event(ctx: RequestContext) -> bytes:
+    """
+    Encode the timings of a stream as an SSE event.
+
+    Args:
+        ctx: Context of the finished stream
+
+    Returns:
+        "event: server-timing" frame whose data maps phases to milliseconds
+    """
+    data = {phase: round(seconds * 1000, 2) for phase, seconds in ctx.timings.items()}
+    return f"event: {TIMING_EVENT}\ndata: {json.dumps(data)}\n\n".encode()
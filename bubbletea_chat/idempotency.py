@@ -0,0 +1,469 @@
+"""
+Idempotent request deduplication for BubbleTea chatbots
+
+Retried chat requests are answered from a single execution of the bot.
+Each request is keyed on its Idempotency-Key header, scoped to its user
+and conversation (or, if enabled, on its conversation and a hash of the
+message). Reusing a header key with a different body is a 422. The first request starts a
+shared run whose response is recorded. Duplicates that arrive while the
+run is in progress follow the recording live, and duplicates that arrive
+later (within the TTL) get it replayed. Responses longer than max_bytes
+are only followed live, never kept for replay.
+"""
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Tuple, Union
+
+from fastapi.responses import Response, StreamingResponse
+
+from .disconnect import ClientDisconnected, DisconnectWatcher
+from .schemas import LazyChatRequest
+
+# Default seconds a finished response is kept for late duplicates
+DEFAULT_IDEMPOTENCY_TTL = 60.0
+
+# Default number of responses kept at once
+DEFAULT_IDEMPOTENCY_ENTRIES = 1024
+
+# Default largest response body kept for replay, in bytes
+DEFAULT_IDEMPOTENCY_MAX_BYTES = 1024 * 1024
+
+# Header added to responses served from another request's execution
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# Response headers that are recomputed rather than recorded
+_SKIPPED_HEADERS = ("content-length", "content-type")
+
+
+class IdempotencyConfig:
+    """
+    Settings for request deduplication.
+
+    Attributes:
+        ttl: Seconds a finished response is replayed to duplicates
+        max_entries: Responses kept at once (in-flight runs are never evicted)
+        header: Request header carrying a client-chosen idempotency key
+        key_by_message: Without the header, treat requests with the same
+                        conversation_uuid, message, user, thread and history
+                        length as duplicates. Off by default: a user who
+                        sends the same message twice on purpose would get
+                        the first answer replayed
+        max_bytes: Largest response body recorded for replay; longer
+                   streams are buffered only until every follower has
+                   read them
+    """
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_IDEMPOTENCY_TTL,
+        max_entries: int = DEFAULT_IDEMPOTENCY_ENTRIES,
+        header: str = "Idempotency-Key",
+        key_by_message: bool = False,
+        max_bytes: int = DEFAULT_IDEMPOTENCY_MAX_BYTES,
+    ):
+        """Initialize deduplication settings.
+
+        Args:
+            ttl: Seconds a finished response is replayed to duplicates
+            max_entries: Responses kept at once
+            header: Request header carrying a client-chosen key
+            key_by_message: Derive a key from the conversation and message
+                            when the header is missing
+            max_bytes: Largest response body recorded for replay
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.header = header
+        self.key_by_message = key_by_message
+        self.max_bytes = max_bytes
+
+    def __repr__(self) -> str:
+        return (
+            f"IdempotencyConfig(ttl={self.ttl!r}, max_entries={self.max_entries!r}, "
+            f"header={self.header!r}, key_by_message={self.key_by_message!r}, "
+            f"max_bytes={self.max_bytes!r})"
+        )
+
+
+def resolve_idempotency(
+    idempotency: Union[bool, IdempotencyConfig, None]
+) -> Optional[IdempotencyConfig]:
+    """
+    Normalize an idempotency option to a config or None.
+
+    Args:
+        idempotency: True for defaults, an IdempotencyConfig, or False/None
+
+    Returns:
+        IdempotencyConfig when deduplication is enabled, else None
+    """
+    if idempotency is True:
+        return IdempotencyConfig()
+    if isinstance(idempotency, IdempotencyConfig):
+        return idempotency
+    return None
+
+
+class IdempotencyKeyReused(Exception):
+    """An Idempotency-Key was sent again with a different request body"""
+
+
+def _size(value: Any) -> int:
+    """Length of a raw list/str field, 0 when absent"""
+    return len(value) if isinstance(value, (list, str)) else 0
+
+
+class RecordedResponse:
+    """
+    Response of a shared bot run, recorded for every duplicate request.
+
+    Attributes:
+        status_code: HTTP status, None until the run produced a response
+        headers: Response headers other than content length and type
+        media_type: Response media type
+        streaming: Whether the response is an SSE stream
+        chunks: Body chunks recorded so far (from the first one a
+                follower still needs, once truncated)
+        size: Bytes recorded so far
+        truncated: Whether the body outgrew max_bytes and won't be replayed
+        done: Whether the body is complete
+        error: Exception that ended the run, if any
+        expires_at: monotonic() time after which the recording is dropped
+        fingerprint: Hash of the request body that started the run, which
+                     duplicates sent with the same header key must match
+    """
+
+    def __init__(
+        self,
+        on_finish: Callable[["RecordedResponse"], None],
+        max_bytes: Optional[int] = None,
+        on_truncate: Optional[Callable[["RecordedResponse"], None]] = None,
+        fingerprint: Optional[str] = None,
+    ):
+        self.status_code: Optional[int] = None
+        self.headers: Dict[str, str] = {}
+        self.media_type: Optional[str] = None
+        self.streaming = False
+        self.chunks: List[bytes] = []
+        self.size = 0
+        self.truncated = False
+        self.max_bytes = max_bytes
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.expires_at: Optional[float] = None
+        self.fingerprint = fingerprint
+        self._on_finish = on_finish
+        self._on_truncate = on_truncate
+        # Index of chunks[0] in the whole body, and of each follower's next chunk
+        self._offset = 0
+        self._readers: Dict[object, int] = {}
+        self._subscribers = 0
+        self._task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        """Whether the run has completed or failed"""
+        return self.done or self.error is not None
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def start(self, produce: Awaitable[Response]):
+        """
+        Run the request once and record its response.
+
+        Args:
+            produce: Awaitable returning the response of the real request
+        """
+        self._task = asyncio.ensure_future(self._record(produce))
+
+    async def _record(self, produce: Awaitable[Response]):
+        try:
+            response = await produce
+            self.headers = {
+                name: value
+                for name, value in response.headers.items()
+                if name not in _SKIPPED_HEADERS
+            }
+            self.media_type = response.media_type
+            self.streaming = isinstance(response, StreamingResponse)
+            self.status_code = response.status_code
+            self._notify()
+            if self.streaming:
+                async for chunk in response.body_iterator:
+                    self._append(chunk)
+                    self._notify()
+            else:
+                self._append(response.body)
+            self.done = True
+        except BaseException as e:
+            # Includes our own cancellation once every requester has gone
+            self.error = e
+        finally:
+            self._notify()
+            self._on_finish(self)
+
+    def _append(self, chunk: bytes):
+        self.chunks.append(chunk)
+        self.size += len(chunk)
+        if (
+            not self.truncated
+            and self.max_bytes is not None
+            and self.size > self.max_bytes
+        ):
+            # Too long to keep for late duplicates, only followers get it
+            self.truncated = True
+            if self._on_truncate is not None:
+                self._on_truncate(self)
+        if self.truncated:
+            # Drop the chunks every follower has already read
+            keep = min(self._readers.values(), default=self._offset + len(self.chunks))
+            if keep > self._offset:
+                del self.chunks[: keep - self._offset]
+                self._offset = keep
+
+    def _raise_error(self):
+        if isinstance(self.error, asyncio.CancelledError):
+            raise RuntimeError("Shared bot run was cancelled") from self.error
+        raise self.error
+
+    def _unsubscribe(self, reader: object):
+        self._readers.pop(reader, None)
+        self._subscribers -= 1
+        if self._subscribers == 0 and not self.finished and self._task is not None:
+            # Nobody is waiting for the result anymore
+            self._task.cancel()
+
+    async def respond(
+        self, receive: Callable[[], Awaitable[Any]], replayed: bool
+    ) -> Response:
+        """
+        Build a response for one request that follows this recording.
+
+        Args:
+            receive: ASGI receive callable, watched for client disconnects
+            replayed: Whether the request is a duplicate
+
+        Returns:
+            The recorded response, streamed live when it is still running
+        """
+        self._subscribers += 1
+        # Followers register right away so no chunk they need is dropped
+        reader = object()
+        self._readers[reader] = self._offset
+        handed_off = False
+        watcher = DisconnectWatcher(receive)
+        watcher.start()
+        try:
+            while self.status_code is None and not self.finished:
+                await watcher.guard(self._changed.wait())
+            if self.status_code is None:
+                self._raise_error()
+
+            headers = dict(self.headers)
+            if replayed:
+                headers[REPLAYED_HEADER] = "true"
+            if self.streaming:
+                handed_off = True
+                return StreamingResponse(
+                    self._replay(receive, reader),
+                    status_code=self.status_code,
+                    headers=headers,
+                    media_type=self.media_type,
+                )
+
+            while not self.finished:
+                await watcher.guard(self._changed.wait())
+            if not self.done:
+                self._raise_error()
+            return Response(
+                b"".join(self.chunks),
+                status_code=self.status_code,
+                headers=headers,
+                media_type=self.media_type,
+            )
+        except ClientDisconnected:
+            # Nobody is listening, this only closes the ASGI exchange
+            return Response(status_code=499)
+        finally:
+            watcher.stop()
+            if not handed_off:
+                self._unsubscribe(reader)
+
+    async def _replay(self, receive: Callable[[], Awaitable[Any]], reader: object):
+        """Yield recorded chunks, then new ones as the run produces them"""
+        watcher = DisconnectWatcher(receive)
+        watcher.start()
+        index = self._readers[reader]
+        try:
+            while True:
+                changed = self._changed
+                while index < self._offset + len(self.chunks):
+                    chunk = self.chunks[index - self._offset]
+                    index += 1
+                    self._readers[reader] = index
+                    yield chunk
+                if self.done:
+                    return
+                if self.error is not None:
+                    self._raise_error()
+                await watcher.guard(changed.wait())
+        except ClientDisconnected:
+            pass
+        finally:
+            watcher.stop()
+            self._unsubscribe(reader)
+
+
+class IdempotencyCache:
+    """
+    Bounded map of idempotency keys to recorded responses.
+
+    Only used from the event loop thread, so no locking is needed.
+
+    Example:
+        >>> cache = IdempotencyCache(IdempotencyConfig(ttl=30))
+        >>> key = cache.key("/chat", request.headers, chat_request)
+        >>> fingerprint = cache.fingerprint(request.headers, body)
+        >>> recording, created = cache.claim(key, fingerprint)
+    """
+
+    def __init__(self, config: IdempotencyConfig):
+        self.config = config
+        self._entries: "OrderedDict[str, RecordedResponse]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def key(
+        self, url_path: str, headers: Mapping[str, str], request: LazyChatRequest
+    ) -> Optional[str]:
+        """
+        Derive the deduplication key of a request.
+
+        Args:
+            url_path: The bot's URL path
+            headers: Request headers
+            request: The parsed chat request
+
+        Returns:
+            The key, or None when the request should not be deduplicated
+        """
+        value = headers.get(self.config.header)
+        if value:
+            # Another user's key, or one from another conversation, is a
+            # different request rather than a way to read its response
+            return "\n".join(
+                (
+                    url_path,
+                    "header",
+                    request.user_uuid or "",
+                    request.conversation_uuid or "",
+                    value,
+                )
+            )
+        if not self.config.key_by_message or not request.conversation_uuid:
+            return None
+
+        # A new message with the same text still has a longer history
+        fingerprint = "\0".join(
+            (
+                request.message,
+                request.user_uuid or "",
+                request.thread_id or "",
+                str(_size(request.raw_chat_history)),
+                str(_size(request.raw_images)),
+            )
+        )
+        digest = hashlib.blake2b(fingerprint.encode(), digest_size=16).hexdigest()
+        return f"{url_path}\nmessage\n{request.conversation_uuid}\n{digest}"
+
+    def fingerprint(self, headers: Mapping[str, str], body: bytes) -> Optional[str]:
+        """
+        Hash of the body of a request keyed by its header.
+
+        Args:
+            headers: Request headers
+            body: Raw request body
+
+        Returns:
+            Hex digest of the body, or None without the header (derived
+            keys already cover what they compare)
+        """
+        if not headers.get(self.config.header):
+            return None
+        return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+    def claim(
+        self, key: str, fingerprint: Optional[str] = None
+    ) -> Tuple[Optional[RecordedResponse], bool]:
+        """
+        Find the recording for a key, or create one for a new request.
+
+        Args:
+            key: Key returned by key()
+            fingerprint: Value returned by fingerprint()
+
+        Returns:
+            Tuple of (recording, created). The recording is None when the
+            cache is full of in-flight runs and the request should run
+            without deduplication.
+
+        Raises:
+            IdempotencyKeyReused: The key's run was started by a request
+                                  with a different body
+        """
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires_at is None or now < entry.expires_at:
+                if entry.fingerprint != fingerprint:
+                    raise IdempotencyKeyReused(
+                        f"{self.config.header} was already used "
+                        "with a different request body"
+                    )
+                return entry, False
+            del self._entries[key]
+
+        if len(self._entries) >= self.config.max_entries:
+            self._evict(now)
+            if len(self._entries) >= self.config.max_entries:
+                return None, False
+
+        def on_finish(recording: RecordedResponse):
+            if (
+                recording.done
+                and not recording.truncated
+                and 200 <= recording.status_code < 300
+            ):
+                recording.expires_at = time.monotonic() + self.config.ttl
+            else:
+                # Failures and rejections are not replayed, retries run again
+                forget(recording)
+
+        def forget(recording: RecordedResponse):
+            if self._entries.get(key) is recording:
+                del self._entries[key]
+
+        entry = self._entries[key] = RecordedResponse(
+            on_finish, self.config.max_bytes, forget, fingerprint
+        )
+        return entry, True
+
+    def _evict(self, now: float):
+        """Drop expired recordings, then the oldest finished ones"""
+        finished = [
+            (key, entry)
+            for key, entry in self._entries.items()
+            if entry.expires_at is not None
+        ]
+        excess = len(self._entries) - self.config.max_entries + 1
+        for key, entry in finished:
+            if now >= entry.expires_at or excess > 0:
+                del self._entries[key]
+                excess -= 1
@@ -0,0 +1,664 @@
+"""
+Background jobs for BubbleTea chatbots
+
+Bots that answer right away and deliver the real result later (e.g. a
+generated video pushed to the conversation) hand that work to a shared
+job runner instead of starting their own threads, event loops or
+untracked tasks. The runner executes jobs on one dedicated event loop
+with a bounded number of workers, runs the jobs of a conversation in the
+order they were submitted, retries failures and can persist jobs to
+SQLite so they survive restarts.
+
+The runner's own options are prefixed (_key, _retries, _persist) so that
+every other keyword argument reaches the job, even one named key.
+
+Example:
+    @chatbot("video-bot")
+    def video_bot(message: str, conversation_uuid: str = None):
+        background(generate_and_send, message, conversation_uuid,
+                   _key=conversation_uuid, _retries=2)
+        return Text("Working on it, I'll send the video when it's ready!")
+"""
+
+import asyncio
+import importlib
+import json
+import os
+import sqlite3
+import threading
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from .executor import BoundedExecutor
+
+# Default number of jobs running at once
+DEFAULT_BACKGROUND_WORKERS = 8
+
+# Default number of jobs waiting before submissions are refused
+DEFAULT_BACKGROUND_QUEUE = 10000
+
+# Default seconds before the first retry (doubled for every further retry)
+DEFAULT_RETRY_DELAY = 1.0
+
+
+class JobQueueFull(RuntimeError):
+    """Raised when a job is submitted while the queue is full"""
+
+
+class Job:
+    """
+    A unit of background work.
+
+    Attributes:
+        func: Function or coroutine function to call
+        args: Positional arguments
+        kwargs: Keyword arguments
+        key: Jobs with the same key run one at a time, in order
+        retries: How often a failed job is retried
+        attempts: Calls made so far
+        persist: Whether the job is stored until it finished
+        future: concurrent.futures.Future resolved with the result or the
+                final error; await it with asyncio.wrap_future()
+    """
+
+    __slots__ = (
+        "func",
+        "args",
+        "kwargs",
+        "key",
+        "retries",
+        "attempts",
+        "persist",
+        "future",
+        "stored_id",
+    )
+
+    def __init__(
+        self,
+        func: Callable,
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+        key: Optional[str] = None,
+        retries: int = 0,
+        persist: bool = False,
+    ):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.key = key
+        self.retries = retries
+        self.attempts = 0
+        self.persist = persist
+        self.future: Future = Future()
+        self.stored_id: Optional[int] = None
+
+    @property
+    def name(self) -> str:
+        """Qualified name of the job function"""
+        return getattr(self.func, "__qualname__", repr(self.func))
+
+    def result(self, timeout: Optional[float] = None) -> Any:
+        """
+        Block until the job finished.
+
+        Args:
+            timeout: Seconds to wait (None waits forever)
+
+        Returns:
+            The job's return value (raises its final error)
+        """
+        return self.future.result(timeout)
+
+
+def _function_ref(func: Callable) -> str:
+    """Importable "module:qualname" reference of a module-level function"""
+    qualname = getattr(func, "__qualname__", "")
+    if not qualname or "<" in qualname:
+        raise ValueError(
+            f"Persistent jobs need a module-level function, got {func!r}"
+        )
+    return f"{func.__module__}:{qualname}"
+
+
+def _resolve_ref(ref: str) -> Callable:
+    """Import the function behind a "module:qualname" reference"""
+    module_name, qualname = ref.split(":", 1)
+    target: Any = importlib.import_module(module_name)
+    for part in qualname.split("."):
+        target = getattr(target, part)
+    return target
+
+
+def _alive(pid: int) -> bool:
+    """Whether a process with this pid is running"""
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+class SQLiteJobStore:
+    """
+    Keeps submitted jobs in a SQLite database until they finished.
+
+    Jobs are stored as a reference to a module-level function plus JSON
+    arguments, so only JSON-serializable arguments can be persisted. Each
+    stored job belongs to the process that ran it; jobs of processes that
+    are gone are taken over when a runner starts, so several worker
+    processes can share one file.
+
+    Attributes:
+        path: Database file path
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Only used from the runner thread, which owns the connection
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, func TEXT NOT NULL, "
+                "payload TEXT NOT NULL, key TEXT, retries INTEGER NOT NULL, "
+                "attempts INTEGER NOT NULL, owner INTEGER)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def add(self, func: str, payload: str, key: Optional[str], retries: int) -> int:
+        """
+        Store a new job owned by this process.
+
+        Args:
+            func: "module:qualname" of the job function
+            payload: JSON object with "args" and "kwargs"
+            key: Ordering key
+            retries: Retries allowed
+
+        Returns:
+            Id of the stored job
+        """
+        cursor = self._connect().execute(
+            "INSERT INTO jobs (func, payload, key, retries, attempts, owner) "
+            "VALUES (?, ?, ?, ?, 0, ?)",
+            (func, payload, key, retries, os.getpid()),
+        )
+        return cursor.lastrowid
+
+    def update(self, job_id: int, attempts: int):
+        """Record the attempts made for a job"""
+        self._connect().execute(
+            "UPDATE jobs SET attempts = ? WHERE id = ?", (attempts, job_id)
+        )
+
+    def remove(self, job_id: int):
+        """Forget a finished job"""
+        self._connect().execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def claim(self) -> List[Tuple[int, str, str, Optional[str], int, int]]:
+        """
+        Take over the jobs of processes that are gone.
+
+        Returns:
+            (id, func, payload, key, retries, attempts) rows in submission order
+        """
+        conn = self._connect()
+        pid = os.getpid()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            owners = [
+                owner
+                for (owner,) in conn.execute("SELECT DISTINCT owner FROM jobs")
+                if owner is None or not _alive(owner)
+            ]
+            for owner in owners:
+                if owner is None:
+                    conn.execute("UPDATE jobs SET owner = ? WHERE owner IS NULL", (pid,))
+                else:
+                    conn.execute("UPDATE jobs SET owner = ? WHERE owner = ?", (pid, owner))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return conn.execute(
+            "SELECT id, func, payload, key, retries, attempts FROM jobs "
+            "WHERE owner = ? ORDER BY id",
+            (pid,),
+        ).fetchall()
+
+    def close(self):
+        """Close the database connection"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class JobRunner:
+    """
+    Runs background jobs on a dedicated event loop thread.
+
+    At most `workers` jobs run at once; coroutine functions run on the
+    runner's loop and plain functions on a thread pool of the same size.
+    Jobs sharing a key run one after another in submission order, while
+    jobs without a key run independently. A failed job is retried after
+    retry_delay, 2 * retry_delay, ... seconds, holding its key meanwhile.
+
+    Attributes:
+        workers: Jobs running at once
+        max_queue: Jobs waiting before submit() raises JobQueueFull
+                   (None for no limit)
+        store: Optional store keeping persistent jobs across restarts
+        retry_delay: Seconds before the first retry
+        completed: Jobs that succeeded
+        failed: Jobs that failed after their last retry
+        retried: Retries made
+        abandoned: Jobs still queued or running when shutdown() stopped
+                   the runner
+    """
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_BACKGROUND_WORKERS,
+        max_queue: Optional[int] = DEFAULT_BACKGROUND_QUEUE,
+        store: Optional[SQLiteJobStore] = None,
+        retry_delay: float = DEFAULT_RETRY_DELAY,
+        name: str = "bubbletea-jobs",
+    ):
+        """Initialize the runner.
+
+        Args:
+            workers: Jobs running at once (must be >= 1)
+            max_queue: Jobs waiting before submissions are refused
+            store: Store for persistent jobs
+            retry_delay: Seconds before the first retry
+            name: Name of the runner thread
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.workers = workers
+        self.max_queue = max_queue
+        self.store = store
+        self.retry_delay = retry_delay
+        self.name = name
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.abandoned = 0
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._executor: Optional[BoundedExecutor] = None
+        self._closed = False
+        self._queued = 0
+        self._active = 0
+        # Only touched on the runner loop: jobs waiting per key, and keys
+        # whose next job may run
+        self._lanes: Dict[Any, Deque[Job]] = {}
+        self._ready: Optional[asyncio.Queue] = None
+        self._idle: Optional[asyncio.Event] = None
+
+    @property
+    def started(self) -> bool:
+        """Whether the runner thread is running in this process"""
+        return self._thread is not None and self._pid == os.getpid()
+
+    @property
+    def queued(self) -> int:
+        """Jobs waiting to run"""
+        return self._queued
+
+    @property
+    def active(self) -> int:
+        """Jobs currently running"""
+        return self._active
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of the runner.
+
+        Returns:
+            Dictionary with workers, active, queued, completed, failed
+            and retried counts
+        """
+        return {
+            "workers": self.workers,
+            "active": self._active,
+            "queued": self._queued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried": self.retried,
+        }
+
+    def start(self):
+        """Start the runner thread, resuming stored jobs (idempotent)"""
+        with self._lock:
+            if self.started:
+                return
+            if self._closed:
+                raise RuntimeError("Background runner is shut down")
+            # First start, or a forked worker: threads don't survive fork
+            self._pid = os.getpid()
+            self._queued = self._active = 0
+            self._lanes = {}
+            ready = threading.Event()
+            self._thread = threading.Thread(
+                target=self._serve, args=(ready,), name=self.name, daemon=True
+            )
+            self._thread.start()
+        ready.wait()
+
+    def submit(
+        self,
+        func: Callable,
+        /,
+        *args,
+        _key: Optional[str] = None,
+        _retries: int = 0,
+        _persist: bool = False,
+        **kwargs,
+    ) -> Job:
+        """
+        Queue a job. Safe to call from any thread.
+
+        Args:
+            func: Function or coroutine function to run
+            *args: Positional arguments for func
+            _key: Ordering key, e.g. the conversation_uuid
+            _retries: How often to retry the job if it raises
+            _persist: Store the job so it resumes after a restart (needs a
+                      store, a module-level func and JSON arguments)
+            **kwargs: Keyword arguments for func, whatever their names
+
+        Returns:
+            The queued Job
+
+        Raises:
+            JobQueueFull: When max_queue jobs are already waiting
+        """
+        job = Job(func, args, kwargs, key=_key, retries=_retries, persist=_persist)
+        if _persist:
+            if self.store is None:
+                raise ValueError("_persist=True requires a runner with a store")
+            # Fail in the caller when the job can't be stored
+            ref = _function_ref(func)
+            payload = json.dumps({"args": args, "kwargs": kwargs})
+        self.start()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Background runner is shut down")
+            if self.max_queue is not None and self._queued >= self.max_queue:
+                raise JobQueueFull(f"{self._queued} background jobs are waiting")
+            self._queued += 1
+        if _persist:
+            self._loop.call_soon_threadsafe(self._store_and_enqueue, job, ref, payload)
+        else:
+            self._loop.call_soon_threadsafe(self._enqueue, job)
+        return job
+
+    def shutdown(self, wait: bool = True, timeout: Optional[float] = None) -> bool:
+        """
+        Stop accepting jobs and stop the runner thread.
+
+        Args:
+            wait: Run the queued jobs first. Otherwise running jobs are
+                  cancelled and persistent jobs resume on the next start
+            timeout: Seconds to wait for the queue to drain
+
+        Returns:
+            True if every queued job finished
+        """
+        with self._lock:
+            self._closed = True
+            if not self.started:
+                return self._queued == 0
+            loop, thread = self._loop, self._thread
+        drained = False
+        if wait:
+            future = asyncio.run_coroutine_threadsafe(self._drain(), loop)
+            try:
+                future.result(timeout)
+                drained = True
+            except FutureTimeout:
+                future.cancel()
+        with self._lock:
+            # Counted now: stopping the loop cancels the jobs and resets them
+            self.abandoned = self._queued + self._active
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        return drained
+
+    def _serve(self, ready: threading.Event):
+        """Runner thread: owns the event loop and the store connection"""
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._ready = asyncio.Queue()
+        self._idle = asyncio.Event()
+        try:
+            if self.store is not None:
+                self._restore()
+            tasks = [loop.create_task(self._work()) for _ in range(self.workers)]
+        finally:
+            ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            if self.store is not None:
+                self.store.close()
+            loop.close()
+
+    def _restore(self):
+        """Queue the stored jobs of this and of finished processes"""
+        for job_id, ref, payload, key, retries, attempts in self.store.claim():
+            try:
+                func = _resolve_ref(ref)
+            except Exception as e:
+                print(f"Error restoring background job {ref}: {e}")
+                continue
+            data = json.loads(payload)
+            job = Job(func, tuple(data["args"]), data["kwargs"], key, retries, True)
+            job.attempts = attempts
+            job.stored_id = job_id
+            with self._lock:
+                self._queued += 1
+            self._enqueue(job)
+
+    def _store_and_enqueue(self, job: Job, ref: str, payload: str):
+        try:
+            job.stored_id = self.store.add(ref, payload, job.key, job.retries)
+        except Exception as e:
+            print(f"Error storing background job {job.name}: {e}")
+            job.stored_id = None
+        self._enqueue(job)
+
+    def _enqueue(self, job: Job):
+        # Jobs without a key get a lane of their own
+        lane = job if job.key is None else job.key
+        waiting = self._lanes.get(lane)
+        if waiting is None:
+            self._lanes[lane] = deque([job])
+            self._ready.put_nowait(lane)
+        else:
+            waiting.append(job)
+
+    async def _drain(self):
+        while self._queued or self._active:
+            self._idle.clear()
+            await self._idle.wait()
+
+    async def _work(self):
+        while True:
+            lane = await self._ready.get()
+            waiting = self._lanes[lane]
+            job = waiting.popleft()
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+            try:
+                await self._run(job)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                if waiting:
+                    self._ready.put_nowait(lane)
+                else:
+                    del self._lanes[lane]
+                self._idle.set()
+
+    async def _run(self, job: Job):
+        """Call a job until it succeeds or runs out of retries"""
+        while True:
+            job.attempts += 1
+            try:
+                result = await self._call(job)
+            except asyncio.CancelledError:
+                # Shutdown: a stored job resumes on the next start
+                job.future.cancel()
+                raise
+            except Exception as e:
+                if job.attempts <= job.retries:
+                    self.retried += 1
+                    self._update_store(job)
+                    await asyncio.sleep(self.retry_delay * 2 ** (job.attempts - 1))
+                    continue
+                self.failed += 1
+                print(
+                    f"Error in background job {job.name} "
+                    f"after {job.attempts} attempt(s): {e}"
+                )
+                self._forget(job)
+                job.future.set_exception(e)
+                return
+            self.completed += 1
+            self._forget(job)
+            job.future.set_result(result)
+            return
+
+    async def _call(self, job: Job) -> Any:
+        if asyncio.iscoroutinefunction(job.func):
+            return await job.func(*job.args, **job.kwargs)
+        if self._executor is None:
+            self._executor = BoundedExecutor(self.workers, name=f"{self.name}-sync")
+        result = await self._executor.run(job.func, *job.args, **job.kwargs)
+        if asyncio.iscoroutine(result):
+            # e.g. a partial of a coroutine function
+            result = await result
+        return result
+
+    def _update_store(self, job: Job):
+        if job.stored_id is not None:
+            try:
+                self.store.update(job.stored_id, job.attempts)
+            except Exception as e:
+                print(f"Error storing background job {job.name}: {e}")
+
+    def _forget(self, job: Job):
+        if job.stored_id is not None:
+            try:
+                self.store.remove(job.stored_id)
+            except Exception as e:
+                print(f"Error storing background job {job.name}: {e}")
+
+
+_runner: Optional[JobRunner] = None
+_runner_lock = threading.Lock()
+
+
+def configure_background(
+    workers: int = DEFAULT_BACKGROUND_WORKERS,
+    max_queue: Optional[int] = DEFAULT_BACKGROUND_QUEUE,
+    store: Optional[SQLiteJobStore] = None,
+    retry_delay: float = DEFAULT_RETRY_DELAY,
+) -> JobRunner:
+    """
+    Configure the runner used by background().
+
+    Call at module level, before the first job is submitted. A runner
+    with a store is started with the server so stored jobs resume.
+
+    Args:
+        workers: Jobs running at once
+        max_queue: Jobs waiting before background() raises JobQueueFull
+        store: SQLiteJobStore for _persist=True jobs
+        retry_delay: Seconds before the first retry
+
+    Returns:
+        The new runner
+    """
+    global _runner
+    with _runner_lock:
+        if _runner is not None and _runner.started:
+            raise RuntimeError(
+                "configure_background() must be called before jobs are submitted"
+            )
+        _runner = JobRunner(workers, max_queue, store, retry_delay)
+        return _runner
+
+
+def get_background_runner(create: bool = True) -> Optional[JobRunner]:
+    """
+    Get the process-wide job runner.
+
+    Args:
+        create: Create a runner with default settings if none exists
+
+    Returns:
+        The runner, or None if none exists and create is False
+    """
+    global _runner
+    if _runner is None and create:
+        with _runner_lock:
+            if _runner is None:
+                _runner = JobRunner()
+    return _runner
+
+
+def background(
+    func: Callable,
+    /,
+    *args,
+    _key: Optional[str] = None,
+    _retries: int = 0,
+    _persist: bool = False,
+    **kwargs,
+) -> Job:
+    """
+    Run func(*args, **kwargs) in the background.
+
+    Works from sync and async bots alike. Jobs with the same key (e.g. a
+    conversation_uuid) run one after another in submission order.
+
+    Args:
+        func: Function or coroutine function to run
+        *args: Positional arguments for func
+        _key: Ordering key
+        _retries: How often to retry the job if it raises
+        _persist: Keep the job in the configured store until it finished
+        **kwargs: Keyword arguments for func, whatever their names
+
+    Returns:
+        The queued Job
+
+    Example:
+        background(send_video, prompt, conversation_uuid, _key=conversation_uuid)
+    """
+    return get_background_runner().submit(
+        func, *args, _key=_key, _retries=_retries, _persist=_persist, **kwargs
+    )
@@ -2,6 +2,7 @@
 LiteLLM integration for easy LLM calls in BubbleTea bots
 """
 
+import asyncio
 from typing import List, Dict, Optional, AsyncGenerator, Union, Any
 from litellm import acompletion, completion, image_generation, aimage_generation
 from litellm.assistants.main import (
@@ -11,6 +12,7 @@ from litellm.assistants.main import (
     create_assistants,
     get_messages,
 )
+from .blobs import BlobNotFound, get_blob_store
 from .schemas import ImageInput
 from datetime import datetime
 
@@ -26,6 +28,10 @@ class LLM:
         # Streaming
         async for chunk in llm.stream("Tell me a story"):
             yield Text(chunk)
+
+        # Streaming into one growing markdown block
+        async for delta in stream_deltas(llm.stream("Tell me a story")):
+            yield delta
     """
 
     def __init__(self, model: str = "gpt-3.5-turbo", **kwargs):
@@ -63,6 +69,16 @@ class LLM:
             return chunk.choices[0].delta.content
         return None
 
+    async def _close_stream(self, response):
+        """Close a provider stream so an abandoned request stops the upstream call"""
+        aclose = getattr(response, "aclose", None)
+        if aclose is not None:
+            await aclose()
+            return
+        close = getattr(response, "close", None)
+        if close is not None:
+            close()
+
     def _extract_id(self, response: Any) -> Optional[str]:
         """Extract ID from various response formats"""
         if isinstance(response, dict) and "id" in response:
@@ -99,9 +115,33 @@ class LLM:
                     content_parts.append(
                         {"type": "image_url", "image_url": {"url": image_url}}
                     )
+            elif img.blob:
+                # Uploaded once to the blob endpoint, only encoded here
+                store = get_blob_store()
+                if store is None:
+                    raise BlobNotFound(img.blob)
+                image_url = store.data_uri(img.blob, img.mime_type)
+                content_parts.append(
+                    {"type": "image_url", "image_url": {"url": image_url}}
+                )
 
         return content_parts
 
+    async def _aformat_message_with_images(
+        self, content: str, images: Optional[List[ImageInput]] = None
+    ) -> Union[str, List[Dict]]:
+        """Async version of _format_message_with_images()
+
+        Uploaded blobs are read from disk and base64-encoded in a thread,
+        so a large image doesn't hold up the event loop.
+        """
+        if not any(img.blob for img in images or ()):
+            return self._format_message_with_images(content, images)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, self._format_message_with_images, content, images
+        )
+
     def complete(self, prompt: str, **kwargs) -> str:
         """
         Get a completion from the LLM
@@ -156,10 +196,13 @@ class LLM:
             **self._merge_params(**kwargs),
         )
 
-        async for chunk in response:
-            content = await self._extract_stream_chunk(chunk)
-            if content:
-                yield content
+        try:
+            async for chunk in response:
+                content = await self._extract_stream_chunk(chunk)
+                if content:
+                    yield content
+        finally:
+            await self._close_stream(response)
 
     def with_messages(self, messages: List[Dict[str, str]], **kwargs) -> str:
         """
@@ -197,10 +240,13 @@ class LLM:
             **self._merge_params(**kwargs),
         )
 
-        async for chunk in response:
-            content = await self._extract_stream_chunk(chunk)
-            if content:
-                yield content
+        try:
+            async for chunk in response:
+                content = await self._extract_stream_chunk(chunk)
+                if content:
+                    yield content
+        finally:
+            await self._close_stream(response)
 
     def complete_with_images(
         self, prompt: str, images: List[ImageInput], **kwargs
@@ -238,7 +284,7 @@ class LLM:
         Returns:
             The LLM's response
         """
-        content = self._format_message_with_images(prompt, images)
+        content = await self._aformat_message_with_images(prompt, images)
         response = await acompletion(
             model=self.model,
             messages=self._create_user_message(content),
@@ -260,7 +306,7 @@ class LLM:
         Yields:
             Chunks of the LLM's response
         """
-        content = self._format_message_with_images(prompt, images)
+        content = await self._aformat_message_with_images(prompt, images)
         response = await acompletion(
             model=self.model,
             messages=self._create_user_message(content),
@@ -268,10 +314,13 @@ class LLM:
             **self._merge_params(**kwargs),
         )
 
-        async for chunk in response:
-            content = await self._extract_stream_chunk(chunk)
-            if content:
-                yield content
+        try:
+            async for chunk in response:
+                content = await self._extract_stream_chunk(chunk)
+                if content:
+                    yield content
+        finally:
+            await self._close_stream(response)
 
     async def generate_image(self, prompt: str, **kwargs) -> str:
         """
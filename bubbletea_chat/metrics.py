@@ -0,0 +1,258 @@
+"""
+Runtime metrics for BubbleTea chatbots
+
+Per-bot counters and latency histograms rendered in the Prometheus text
+exposition format. All recording happens on the event loop thread, so
+the counters are plain integers and floats without any locking.
+"""
+
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+def _escape(value: str) -> str:
+    """Escape a Prometheus label value"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format(value: float) -> str:
+    """Format a sample value the way Prometheus expects"""
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram of durations in seconds.
+
+    Attributes:
+        bounds: Bucket upper bounds (an implicit +Inf bucket is added)
+        counts: Observations per bucket (not cumulative)
+        sum: Sum of all observed values
+        count: Number of observations
+    """
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """Record one observation"""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self) -> Iterable[Tuple[str, float]]:
+        """Yield (le, cumulative count) pairs including +Inf"""
+        cumulative = 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            cumulative += count
+            yield _format(bound), cumulative
+
+
+class BotMetrics:
+    """
+    Counters and histograms for one bot URL path.
+
+    Attributes:
+        requests: Requests received
+        in_flight: Requests currently being handled
+        errors: Requests that raised an exception
+        rejected: Requests turned away by admission control
+        cancelled: Requests abandoned by the client before completion
+        deduplicated: Duplicate requests answered from another request's run
+        cache_hits: Requests answered from the bot's response cache
+        cache_misses: Cache lookups that had to run the bot
+        components: Components emitted
+        bytes: Response body bytes emitted
+        latency: Total request duration histogram
+        first_component: Time-to-first-component histogram (streaming bots)
+    """
+
+    __slots__ = (
+        "requests",
+        "in_flight",
+        "errors",
+        "rejected",
+        "cancelled",
+        "deduplicated",
+        "cache_hits",
+        "cache_misses",
+        "components",
+        "bytes",
+        "latency",
+        "first_component",
+    )
+
+    def __init__(self):
+        self.requests = 0
+        self.in_flight = 0
+        self.errors = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self.deduplicated = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.components = 0
+        self.bytes = 0
+        self.latency = Histogram()
+        self.first_component = Histogram()
+
+    def start(self):
+        """Record the start of a request"""
+        self.requests += 1
+        self.in_flight += 1
+
+    def finish(self, duration: float, error: bool = False):
+        """
+        Record the end of a request.
+
+        Args:
+            duration: Total request duration in seconds
+            error: Whether the request failed
+        """
+        self.in_flight -= 1
+        self.latency.observe(duration)
+        if error:
+            self.errors += 1
+
+
+# (metric name, type, help text, BotMetrics attribute)
+_COUNTERS: List[Tuple[str, str, str, str]] = [
+    ("bubbletea_requests_total", "counter", "Chat requests received", "requests"),
+    ("bubbletea_requests_in_flight", "gauge", "Chat requests in progress", "in_flight"),
+    ("bubbletea_request_errors_total", "counter", "Chat requests that failed", "errors"),
+    (
+        "bubbletea_requests_rejected_total",
+        "counter",
+        "Chat requests rejected by admission control",
+        "rejected",
+    ),
+    (
+        "bubbletea_requests_cancelled_total",
+        "counter",
+        "Chat requests abandoned by the client",
+        "cancelled",
+    ),
+    (
+        "bubbletea_requests_deduplicated_total",
+        "counter",
+        "Duplicate chat requests answered from a shared run",
+        "deduplicated",
+    ),
+    ("bubbletea_cache_hits_total", "counter", "Response cache hits", "cache_hits"),
+    ("bubbletea_cache_misses_total", "counter", "Response cache misses", "cache_misses"),
+    ("bubbletea_components_total", "counter", "Components emitted", "components"),
+    ("bubbletea_response_bytes_total", "counter", "Response bytes emitted", "bytes"),
+]
+
+_HISTOGRAMS: List[Tuple[str, str, str]] = [
+    (
+        "bubbletea_request_duration_seconds",
+        "Total chat request duration",
+        "latency",
+    ),
+    (
+        "bubbletea_time_to_first_component_seconds",
+        "Time until a streaming bot emitted its first component",
+        "first_component",
+    ),
+]
+
+
+class MetricsRegistry:
+    """
+    Collection of per-bot metrics with Prometheus text rendering.
+
+    Example:
+        >>> registry = MetricsRegistry()
+        >>> registry.bot("/chat").start()
+        >>> print(registry.render())
+    """
+
+    def __init__(self):
+        self._bots: Dict[str, BotMetrics] = {}
+
+    def bot(self, url_path: str) -> BotMetrics:
+        """
+        Get (or create) the metrics for a bot URL path.
+
+        Args:
+            url_path: The bot's URL path
+
+        Returns:
+            BotMetrics for the path
+        """
+        metrics = self._bots.get(url_path)
+        if metrics is None:
+            metrics = self._bots[url_path] = BotMetrics()
+        return metrics
+
+    def render(
+        self, gauges: Optional[List[Tuple[str, str, Dict[str, str], float]]] = None
+    ) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Args:
+            gauges: Extra (name, help, labels, value) gauge samples to include
+
+        Returns:
+            Exposition text ending with a newline
+        """
+        lines: List[str] = []
+        bots = sorted(self._bots.items())
+
+        for name, kind, help_text, attr in _COUNTERS:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for path, metrics in bots:
+                lines.append(f'{name}{{bot="{_escape(path)}"}} {getattr(metrics, attr)}')
+
+        for name, help_text, attr in _HISTOGRAMS:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for path, metrics in bots:
+                histogram = getattr(metrics, attr)
+                label = f'bot="{_escape(path)}"'
+                for le, cumulative in histogram.samples():
+                    lines.append(f'{name}_bucket{{{label},le="{le}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{label}}} {_format(histogram.sum)}")
+                lines.append(f"{name}_count{{{label}}} {histogram.count}")
+
+        # Samples of the same gauge must be listed together
+        grouped: Dict[str, Tuple[str, List[str]]] = {}
+        for name, help_text, labels, value in gauges or []:
+            label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+            sample = f"{name}{{{label_text}}} {_format(value)}"
+            grouped.setdefault(name, (help_text, []))[1].append(sample)
+        for name, (help_text, samples) in grouped.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(samples)
+
+        return "\n".join(lines) + "\n"
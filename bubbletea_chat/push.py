@@ -0,0 +1,317 @@
+"""
+Client for pushing messages into BubbleTea conversations
+
+Bots that reply later (from a background job or a scheduler) post their
+messages to the developer conversation API. PushClient keeps one pooled
+keep-alive connection set for all of them, bounds how many sends are in
+flight and retries transient failures with jittered exponential backoff.
+Only failures where the API cannot have accepted the message are retried
+(no connection, 429 and 503), so a push is never delivered twice.
+
+Requires httpx (pip install 'bubbletea-chat[push]', or
+'bubbletea-chat[http2]' for HTTP/2).
+
+Example:
+    async def send_video(conversation_uuid: str, url: str):
+        await push_message(conversation_uuid, Video(url=url))
+
+    background(send_video, conversation_uuid, url, _key=conversation_uuid)
+"""
+
+import asyncio
+import os
+import random
+import weakref
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from pydantic import BaseModel
+
+# Default API location, overridable with BUBBLETEA_API_URL
+DEFAULT_API_URL = "https://backend.bubbletea.chat"
+
+# Default seconds to wait for the API (connect, read and write)
+DEFAULT_PUSH_TIMEOUT = 10.0
+
+# Default number of sends in flight (also the connection pool size)
+DEFAULT_PUSH_CONCURRENCY = 20
+
+# Status codes that mean the message was not accepted and can be re-sent.
+# Others, like 500 or 504, may come after the message was stored.
+RETRY_STATUSES = frozenset({429, 503})
+
+Content = Union[BaseModel, Dict[str, Any]]
+
+# What a successful send returns: the JSON answer, its text, or None
+Answer = Union[Dict[str, Any], str, None]
+
+
+class PushError(Exception):
+    """
+    A message could not be delivered.
+
+    Attributes:
+        status_code: HTTP status of the last attempt (None for network errors)
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _import_httpx():
+    try:
+        import httpx
+    except ImportError:
+        raise ImportError(
+            "\n"
+            "httpx is not installed. To push messages, install with:\n"
+            "  pip install 'bubbletea-chat[push]'\n"
+        )
+    return httpx
+
+
+def _retry_after(headers: Any) -> Optional[float]:
+    """Seconds from a numeric Retry-After header"""
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class PushClient:
+    """
+    Pooled async client for the developer conversation API.
+
+    The underlying connections belong to the event loop that first uses
+    the client, so use one client per loop (get_push_client() does this
+    for you). Close it with aclose() or `async with`.
+
+    Attributes:
+        api_key: Developer API key
+        base_url: API location
+        timeout: Seconds to wait for the API
+        retries: Extra attempts after a failure that left the message
+                 undelivered (connection errors, 429 and 503)
+        backoff: Base seconds of the retry backoff, doubled per attempt
+        max_backoff: Cap of a single backoff
+        max_concurrency: Sends in flight at once
+        http2: Negotiate HTTP/2 (requires the h2 package)
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        timeout: float = DEFAULT_PUSH_TIMEOUT,
+        retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 10.0,
+        max_concurrency: int = DEFAULT_PUSH_CONCURRENCY,
+        http2: bool = False,
+        transport: Any = None,
+    ):
+        """Initialize the client.
+
+        Args:
+            api_key: Developer API key (defaults to BUBBLETEA_API_KEY)
+            base_url: API location (defaults to BUBBLETEA_API_URL or the
+                      hosted API)
+            timeout: Seconds to wait for the API
+            retries: Extra attempts after a transient failure
+            backoff: Base seconds of the retry backoff
+            max_backoff: Cap of a single backoff
+            max_concurrency: Sends in flight at once (must be >= 1)
+            http2: Negotiate HTTP/2
+            transport: Custom httpx transport, e.g. for tests
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.api_key = api_key if api_key is not None else os.getenv("BUBBLETEA_API_KEY")
+        self.base_url = (
+            base_url or os.getenv("BUBBLETEA_API_URL") or DEFAULT_API_URL
+        ).rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_concurrency = max_concurrency
+        self.http2 = http2
+        self._transport = transport
+        self._client = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _get_client(self):
+        if self._client is None:
+            httpx = _import_httpx()
+            limits = httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+            )
+            headers = {"accept": "application/json"}
+            if self.api_key:
+                headers["x-api-key"] = self.api_key
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=headers,
+                timeout=self.timeout,
+                limits=limits,
+                http2=self.http2,
+                transport=self._transport,
+            )
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    def _delay(self, attempt: int, retry_after: Optional[float]) -> float:
+        """Full-jitter backoff, at least what the server asked for"""
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_backoff))
+        return delay
+
+    async def send(
+        self,
+        conversation_uuid: str,
+        content: Content,
+        sender: str = "agent",
+        **fields: Any,
+    ) -> Answer:
+        """
+        Post a message to a conversation.
+
+        Args:
+            conversation_uuid: Target conversation
+            content: Component (e.g. Text, Video) or its dict form
+            sender: Message sender
+            **fields: Extra payload fields, e.g. sender_account_id
+
+        Returns:
+            The API's JSON answer (its text if it isn't JSON), or None
+            when it has no body
+
+        Raises:
+            PushError: When the message could not be delivered
+        """
+        if isinstance(content, BaseModel):
+            content = content.model_dump(mode="json")
+        payload = {"sender": sender, "content": content, **fields}
+        path = f"/v1/developer/conversation/{conversation_uuid}/message"
+
+        client = self._get_client()
+        httpx = _import_httpx()
+        # Raised before any of the request reached the API
+        unsent = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+        async with self._slots:
+            attempt = 0
+            while True:
+                retry_after = None
+                try:
+                    response = await client.post(path, json=payload)
+                except unsent as e:
+                    error = PushError(f"Push to {conversation_uuid} failed: {e}")
+                except httpx.TransportError as e:
+                    # The message may have been delivered, re-sending could
+                    # post it twice
+                    raise PushError(f"Push to {conversation_uuid} failed: {e}") from e
+                else:
+                    if response.status_code < 300:
+                        if not response.content:
+                            return None
+                        try:
+                            return response.json()
+                        except ValueError:
+                            return response.text
+                    error = PushError(
+                        f"Push to {conversation_uuid} failed with "
+                        f"{response.status_code}: {response.text[:200]}",
+                        response.status_code,
+                    )
+                    if response.status_code not in RETRY_STATUSES:
+                        raise error
+                    retry_after = _retry_after(response.headers)
+                if attempt >= self.retries:
+                    raise error
+                await asyncio.sleep(self._delay(attempt, retry_after))
+                attempt += 1
+
+    async def send_many(
+        self,
+        messages: Iterable[Tuple[str, Content]],
+        sender: str = "agent",
+    ) -> List[Union[Answer, PushError]]:
+        """
+        Post many messages concurrently, e.g. a daily brief to every user.
+
+        At most max_concurrency sends are in flight; one failure doesn't
+        stop the others.
+
+        Args:
+            messages: (conversation_uuid, content) pairs
+            sender: Message sender
+
+        Returns:
+            Per message, in order: the API's answer or the PushError
+        """
+        results = await asyncio.gather(
+            *(self.send(uuid, content, sender) for uuid, content in messages),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException) and not isinstance(result, PushError):
+                raise result
+        return results
+
+    async def aclose(self):
+        """Close the pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self) -> "PushClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+
+# One shared client per event loop, dropped with its loop
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, PushClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_push_client() -> PushClient:
+    """
+    Get the shared client of the running event loop.
+
+    Settings come from BUBBLETEA_API_KEY and BUBBLETEA_API_URL.
+
+    Returns:
+        PushClient reused by every push on this loop
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = PushClient()
+    return client
+
+
+async def push_message(
+    conversation_uuid: str, content: Content, sender: str = "agent", **fields: Any
+) -> Answer:
+    """
+    Post a message to a conversation with the shared client.
+
+    Args:
+        conversation_uuid: Target conversation
+        content: Component or its dict form
+        sender: Message sender
+        **fields: Extra payload fields
+
+    Returns:
+        The API's JSON answer (its text if it isn't JSON), or None when it
+        has no body
+
+    Raises:
+        PushError: When the message could not be delivered
+    """
+    return await get_push_client().send(conversation_uuid, content, sender, **fields)
@@ -0,0 +1,174 @@
+"""
+Shared resources for BubbleTea chatbots
+
+Expensive objects such as API clients or models are declared once with
+@resource, created when the server starts and closed when it stops.
+Chatbot functions receive them by parameter name, the same way request
+fields like user_uuid are injected.
+
+A resource factory may be a plain or async function returning the
+resource, or a (async) generator yielding it once; code after the yield
+runs at shutdown. Factories can take earlier resources as parameters.
+
+Example:
+    @resource
+    async def http():
+        async with httpx.AsyncClient() as client:
+            yield client
+
+    @chatbot("weather")
+    async def weather_bot(message: str, http):
+        response = await http.get(WEATHER_URL, params={"q": message})
+        return Text(response.json()["summary"])
+"""
+
+import inspect
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from .decorators import INJECTABLE_PARAMS
+
+# Names that can't be used for resources, they are request fields
+RESERVED_NAMES = ("message",) + INJECTABLE_PARAMS
+
+# Registered resource factories, in declaration order
+_resource_registry: Dict[str, "Resource"] = {}
+
+
+class Resource:
+    """
+    A declared resource.
+
+    Attributes:
+        name: Parameter name bots use to receive it
+        factory: Function creating the resource
+        depends: Names of earlier resources the factory receives
+    """
+
+    def __init__(self, factory: Callable, name: Optional[str] = None):
+        self.factory = factory
+        self.name = name or factory.__name__
+        if self.name in RESERVED_NAMES:
+            raise ValueError(
+                f"Resource name '{self.name}' is reserved for a request field"
+            )
+        self.depends = tuple(inspect.signature(factory).parameters)
+
+    async def open(self, values: Dict[str, Any]) -> Tuple[Any, Optional[Any]]:
+        """
+        Create the resource.
+
+        Args:
+            values: Resources created so far
+
+        Returns:
+            Tuple of (resource, generator to resume at shutdown or None)
+        """
+        missing = [name for name in self.depends if name not in values]
+        if missing:
+            raise ValueError(
+                f"Resource '{self.name}' needs {missing}, declare them before it"
+            )
+        result = self.factory(**{name: values[name] for name in self.depends})
+        if inspect.isasyncgen(result):
+            return await result.__anext__(), result
+        if inspect.isgenerator(result):
+            return next(result), result
+        if inspect.isawaitable(result):
+            result = await result
+        return result, None
+
+    def __repr__(self) -> str:
+        return f"Resource(name={self.name!r}, depends={self.depends!r})"
+
+
+def resource(
+    name_or_func: Union[str, Callable, None] = None
+) -> Union[Callable, Callable[[Callable], Callable]]:
+    """
+    Declare a resource shared by every request.
+
+    Args:
+        name_or_func: Parameter name bots use (defaults to the function
+                      name), or the function when used without parentheses
+
+    Returns:
+        The factory, unchanged, or a decorator
+
+    Examples:
+        >>> @resource
+        ... def anthropic():
+        ...     return Anthropic()
+
+        >>> @resource("model")
+        ... def gemini_model():
+        ...     return genai.GenerativeModel("gemini-2.0-flash")
+    """
+
+    def decorator(func: Callable) -> Callable:
+        declared = Resource(func, name_or_func if isinstance(name_or_func, str) else None)
+        if declared.name in _resource_registry:
+            raise ValueError(f"A resource named '{declared.name}' is already declared")
+        _resource_registry[declared.name] = declared
+        return func
+
+    if callable(name_or_func):
+        return decorator(name_or_func)
+    return decorator
+
+
+def get_registered_resources() -> Dict[str, Resource]:
+    """Get all declared resources, in declaration order"""
+    return _resource_registry.copy()
+
+
+class ResourceManager:
+    """
+    Opens resources at startup and closes them at shutdown.
+
+    Attributes:
+        resources: The resources to manage, in opening order
+        values: Opened resources by name
+        ready: Whether every resource has been opened
+    """
+
+    def __init__(self, resources: Dict[str, Resource]):
+        self.resources = resources
+        self.values: Dict[str, Any] = {}
+        self.ready = not resources
+        self._cleanups: List[Tuple[str, Any]] = []
+
+    async def startup(self):
+        """
+        Open every resource in declaration order.
+
+        Raises:
+            Exception: The first failure, after closing what was opened
+        """
+        try:
+            for name, declared in self.resources.items():
+                value, cleanup = await declared.open(self.values)
+                self.values[name] = value
+                if cleanup is not None:
+                    self._cleanups.append((name, cleanup))
+        except BaseException:
+            await self.shutdown()
+            raise
+        self.ready = True
+
+    async def shutdown(self):
+        """Close the opened resources in reverse order"""
+        self.ready = False
+        while self._cleanups:
+            name, cleanup = self._cleanups.pop()
+            try:
+                if inspect.isasyncgen(cleanup):
+                    await cleanup.__anext__()
+                else:
+                    next(cleanup)
+            except (StopIteration, StopAsyncIteration):
+                pass
+            except Exception as e:
+                print(f"Error closing resource {name}: {e}")
+            else:
+                print(f"Resource {name} yielded more than once")
+        self.values.clear()
@@ -3,12 +3,12 @@ Request and response schemas for BubbleTea
 """
 
 from typing import List, Literal, Optional, Union, Dict, Any
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, PrivateAttr, TypeAdapter, validator
 from .components import Component, BaseComponent
 
 
 class ImageInput(BaseModel):
-    """Image input that can be either a URL or base64 encoded data"""
+    """Image input given as a URL, base64 encoded data or an uploaded blob"""
 
     text: Optional[str] = Field(None, description="Text description of the image")
     url: Optional[str] = Field(
@@ -17,6 +17,11 @@ class ImageInput(BaseModel):
     base64: Optional[str] = Field(
         None, description="Base64 encoded image data"
     )  # Raw base64 string
+    blob: Optional[str] = Field(
+        None,
+        description="SHA-256 of an image uploaded to the blob endpoint",
+        pattern=r"^[0-9a-f]{64}$",
+    )  # See run_server(blobs=True)
     mime_type: Optional[str] = Field(
         None, description="MIME type of the image (e.g., image/jpeg, image/png)"
     )
@@ -48,6 +53,50 @@ class ComponentChatRequest(BaseModel):
     )  # For threaded conversations
 
 
+# Validators for the request fields that LazyChatRequest defers
+_IMAGES_ADAPTER = TypeAdapter(Optional[List[ImageInput]])
+_CHAT_HISTORY_ADAPTER = TypeAdapter(Optional[Union[List[Dict[str, Any]], str]])
+
+
+class LazyChatRequest(BaseModel):
+    """
+    Chat request whose images and chat_history are validated on first access
+
+    Both fields are kept as parsed JSON until read, so bots that don't
+    declare them never pay for validating long histories or many images.
+    Reading them gives the same values as ComponentChatRequest.
+    """
+
+    type: Literal["user"]
+    message: str
+    user_uuid: Optional[str] = None
+    conversation_uuid: Optional[str] = None
+    user_email: Optional[str] = None
+    thread_id: Optional[str] = None
+    raw_images: Any = Field(None, alias="images")
+    raw_chat_history: Any = Field(None, alias="chat_history")
+
+    # Validated values, None until first read (or when the field is absent)
+    _images: Any = PrivateAttr(default=None)
+    _chat_history: Any = PrivateAttr(default=None)
+
+    @property
+    def images(self) -> Optional[List[ImageInput]]:
+        """Images validated as ImageInput objects"""
+        if self._images is None and self.raw_images is not None:
+            self._images = _IMAGES_ADAPTER.validate_python(self.raw_images)
+        return self._images
+
+    @property
+    def chat_history(self) -> Optional[Union[List[Dict[str, Any]], str]]:
+        """Validated chat history (list of message dicts or context string)"""
+        if self._chat_history is None and self.raw_chat_history is not None:
+            self._chat_history = _CHAT_HISTORY_ADAPTER.validate_python(
+                self.raw_chat_history
+            )
+        return self._chat_history
+
+
 class ComponentChatResponse(BaseModel):
     """Non-streaming response containing list of components"""
 
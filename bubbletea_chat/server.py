@@ -3,16 +3,100 @@ FastAPI server implementation for BubbleTea chatbots
 """
 
 import asyncio
-from typing import Optional, Dict, Any, Callable
-from fastapi import FastAPI
-from fastapi.responses import StreamingResponse
+import json
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+from fastapi import FastAPI, Request, WebSocket
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import (
+    JSONResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
+from pydantic import ValidationError
 
+from .admission import AdmissionConfig, AdmissionController, resolve_admission
+from .blobs import (
+    BlobConfig,
+    BlobNotFound,
+    BlobStore,
+    BlobStoreFull,
+    BlobTooLarge,
+    missing_blobs,
+    resolve_blobs,
+    set_blob_store,
+)
+from .components import BaseComponent, Error, Text, set_component_validation
+from .config_cache import ConfigCache, etag_matches
 from .decorators import ChatbotFunction
 from . import decorators
-from .schemas import ComponentChatRequest, BotConfig
-from .components import Done
+from .disconnect import ClientDisconnected, DisconnectWatcher
+from .drain import DrainState, DrainingServer, register, unregister
+from .encoders import SSEEncoder, get_encoder
+from .executor import BoundedExecutor, DEFAULT_SYNC_WORKERS
+from .frozen import Frozen, count_components, encode_response, expand
+from .hooks import HookRunner, RequestContext, RequestHooks, timing_event
+from .idempotency import (
+    IdempotencyCache,
+    IdempotencyConfig,
+    IdempotencyKeyReused,
+    resolve_idempotency,
+)
+from .jobs import get_background_runner
+from .metrics import BotMetrics, MetricsRegistry
+from .resources import ResourceManager, get_registered_resources
+from .schemas import BotConfig, LazyChatRequest
+from .streaming import CoalesceConfig, coalesce_text, resolve_coalesce
+from .websocket import DEFAULT_HEARTBEAT, WebSocketSession
+from .workers import preload_modules, run_workers
+
+# Environment variable carrying server options to worker processes
+SERVER_OPTIONS_ENV = "BUBBLETEA_SERVER_OPTIONS"
+
+# Type tag of an encoded Error component
+_ERROR_TAG = b'"type":"error"'
+
+# Hooks of the server being run, inherited by forked workers (hooks are
+# objects, so unlike the other options they can't go through the environment)
+_worker_hooks: List[RequestHooks] = []
+
+
+def _body_errors(error: ValidationError, loc: Tuple[Any, ...]) -> List[Dict[str, Any]]:
+    """Validation errors with their locations prefixed, as FastAPI reports them"""
+    return [
+        {**detail, "loc": loc + tuple(detail["loc"])}
+        for detail in error.errors(include_url=False)
+    ]
+
+
+def _is_error(component: Any) -> bool:
+    """Whether a response item is or contains an Error component"""
+    if isinstance(component, Error):
+        return True
+    if isinstance(component, Frozen):
+        # Quotes inside JSON strings are escaped, so the tag can't be text
+        return any(_ERROR_TAG in data for data in component.json)
+    if isinstance(component, BaseComponent):
+        return any(isinstance(item, Error) for item in component.payload)
+    return False
 
 
 class BubbleTeaServer:
@@ -31,6 +115,18 @@ class BubbleTeaServer:
         cors: bool = True,
         cors_config: Optional[Dict[str, Any]] = None,
         register_all: bool = True,
+        sync_workers: int = DEFAULT_SYNC_WORKERS,
+        encoder: Union[str, SSEEncoder] = "pydantic",
+        coalesce: Union[bool, CoalesceConfig] = False,
+        metrics: bool = False,
+        admission: Union[int, AdmissionConfig, None] = None,
+        idempotency: Union[bool, IdempotencyConfig] = False,
+        hooks: Optional[List[RequestHooks]] = None,
+        server_timing: bool = False,
+        drain_timeout: Optional[float] = None,
+        websocket: Union[bool, float] = False,
+        validate_components: Optional[bool] = None,
+        blobs: Union[bool, BlobConfig] = False,
     ):
         """
         Initialize the BubbleTea server
@@ -41,11 +137,77 @@ class BubbleTeaServer:
             cors: Enable CORS support
             cors_config: Custom CORS configuration
             register_all: Register all decorated chatbots
+            sync_workers: Thread pool size for synchronous chatbot functions
+            encoder: Response encoder ("pydantic", "orjson", "msgspec" or an
+                     SSEEncoder instance)
+            coalesce: Merge consecutive streamed Text/Markdown chunks for
+                      bots that don't set @chatbot(coalesce=...)
+            metrics: Expose Prometheus-style metrics at /metrics
+            admission: Concurrency limit for bots that don't set
+                       @chatbot(admission=...)
+            idempotency: Answer retried requests from a single bot run
+            hooks: Request lifecycle hooks (RequestHooks instances)
+            server_timing: Report per-phase timings in a Server-Timing
+                           header, and in a trailing event for streams
+            drain_timeout: Seconds in-flight requests and background jobs
+                           get to finish on shutdown (None waits for
+                           requests without limit and drops jobs)
+            websocket: Also serve each bot over a WebSocket at
+                       "<url_path>/ws"; a number sets the heartbeat seconds
+            validate_components: Validate component constructor arguments
+                                 (process-wide, see set_component_validation;
+                                 None keeps the current setting)
+            blobs: Accept image uploads at "/blobs", referenced by SHA-256
+                   in chat requests (True or a BlobConfig)
         """
-        self.app = FastAPI(title="BubbleTea Bot Server")
+        self.app = FastAPI(title="BubbleTea Bot Server", lifespan=self._lifespan)
         self.chatbot = chatbot
         self.port = port
         self.register_all = register_all
+        self.executor = BoundedExecutor(sync_workers, name="bubbletea-sync")
+        self.encoder = get_encoder(encoder)
+        self.coalesce = resolve_coalesce(coalesce)
+        self.metrics = MetricsRegistry() if metrics else None
+        self.hooks = HookRunner(hooks)
+        self.server_timing = server_timing
+        # Per-request contexts are only built when something consumes them
+        self._trace = bool(self.hooks.hooks) or server_timing
+        self.drain = DrainState(drain_timeout)
+        self.websocket = websocket
+        if validate_components is not None:
+            set_component_validation(validate_components)
+        # Opened when the app starts, see @resource
+        self.resources = ResourceManager(get_registered_resources())
+        self.admission = resolve_admission(admission)
+        self._admission: Dict[str, AdmissionController] = {}
+        idempotency_config = resolve_idempotency(idempotency)
+        self.idempotency = (
+            IdempotencyCache(idempotency_config) if idempotency_config else None
+        )
+        blob_config = resolve_blobs(blobs)
+        self.blobs = BlobStore(blob_config) if blob_config else None
+        if self.blobs:
+            set_blob_store(self.blobs)
+
+        # JSON-serializable options used to rebuild the server in workers
+        self._options = {
+            "chatbot": chatbot.url_path if chatbot else None,
+            "port": port,
+            "cors": cors,
+            "cors_config": cors_config,
+            "register_all": register_all,
+            "sync_workers": sync_workers,
+            "encoder": self.encoder.name,
+            "coalesce": vars(self.coalesce) if self.coalesce else False,
+            "metrics": metrics,
+            "admission": vars(self.admission) if self.admission else None,
+            "idempotency": vars(idempotency_config) if idempotency_config else False,
+            "server_timing": server_timing,
+            "drain_timeout": drain_timeout,
+            "websocket": websocket,
+            "validate_components": validate_components,
+            "blobs": vars(blob_config) if blob_config else False,
+        }
 
         # Check if bot config has CORS settings
         if cors and not cors_config and decorators._config_function:
@@ -57,6 +219,10 @@ class BubbleTeaServer:
                     pass
                 else:
                     config = config_func()
+                    # Seed the config endpoint cache with this result
+                    config = decorators.get_config_cache(
+                        decorators._config_function[1], config_func
+                    ).store(config)
                     if hasattr(config, "cors_config") and config.cors_config:
                         cors_config = config.cors_config
             except Exception:
@@ -68,6 +234,40 @@ class BubbleTeaServer:
 
         self._setup_routes()
 
+    @asynccontextmanager
+    async def _lifespan(self, app: FastAPI):
+        """Open resources and resume stored jobs; drain and close on shutdown"""
+        await self.resources.startup()
+        for bot in decorators.get_registered_chatbots().values():
+            bot.bind_resources(self.resources.values)
+        runner = get_background_runner(create=False)
+        if runner is not None and runner.store is not None:
+            runner.start()
+        register(self.drain)
+        yield
+        unregister(self.drain)
+        if self.drain.timeout is not None:
+            await self._drain(get_background_runner(create=False))
+        await self.resources.shutdown()
+        self.executor.shutdown(wait=False)
+
+    async def _drain(self, runner):
+        """Give requests and background jobs the rest of the drain timeout"""
+        self.drain.start()
+        # The ASGI server already waited for requests, unless it has no deadline
+        await self.drain.wait(self.drain.remaining())
+        jobs_abandoned = 0
+        if runner is not None and runner.started:
+            loop = asyncio.get_running_loop()
+            remaining = self.drain.remaining()
+            await loop.run_in_executor(None, runner.shutdown, True, remaining)
+            jobs_abandoned = runner.abandoned
+        report = self.drain.report(jobs_abandoned)
+        if report["abandoned"] or report["still_running"] or jobs_abandoned:
+            print(f"Drain timeout exceeded, abandoned: {report}")
+        else:
+            print(f"Drained {report['finished']} request(s) and background jobs")
+
     def _setup_cors(self, cors_config: Optional[Dict[str, Any]] = None):
         """
         Setup CORS middleware with sensible defaults
@@ -106,117 +306,756 @@ class BubbleTeaServer:
 
         # Register each chatbot at its URL path
         for url_path, chatbot in registered_bots.items():
-            # Create a closure to capture the chatbot instance
-            def create_chat_endpoint(bot: ChatbotFunction):
-                async def chat_endpoint(request: ComponentChatRequest):
-                    """Handle chat requests"""
-                    response = await bot.handle_request(request)
-
-                    if bot.stream:
-                        # Streaming response - use Server-Sent Events
-                        async def stream_generator():
-                            async for component in response:
-                                # Convert component to JSON and wrap in SSE format
-                                data = component.model_dump_json()
-                                yield f"data: {data}\n\n"
-                            # Send done signal
-                            done = Done()
-                            yield f"data: {done.model_dump_json()}\n\n"
-
-                        return StreamingResponse(
-                            stream_generator(), media_type="text/event-stream"
-                        )
-                    else:
-                        # Non-streaming response
-                        return response
-
-                return chat_endpoint
-
-            # Register the endpoint
-            self.app.post(url_path)(create_chat_endpoint(chatbot))
+            self.app.post(url_path)(self._create_chat_endpoint(chatbot))
+            if self.websocket:
+                self.app.websocket(f"{url_path.rstrip('/')}/ws")(
+                    self._create_websocket_endpoint(chatbot)
+                )
 
         @self.app.get("/health")
         async def health_check():
             """Health check endpoint for monitoring"""
             registered_bots = decorators.get_registered_chatbots()
-            bots_info = [
-                {"name": bot.name, "url": url_path, "streaming": bot.stream}
-                for url_path, bot in registered_bots.items()
-            ]
+            bots_info = []
+            for url_path, bot in registered_bots.items():
+                info = {"name": bot.name, "url": url_path, "streaming": bot.stream}
+                if bot.executor:
+                    info["sync_pool"] = bot.executor.stats()
+                if url_path in self._admission:
+                    info["admission"] = self._admission[url_path].stats()
+                if bot.cache is not None:
+                    info["cache"] = bot.cache.stats()
+                bots_info.append(info)
 
-            return {
+            if self.drain.draining:
+                # Tell load balancers to send new traffic elsewhere
+                return JSONResponse(
+                    {"status": "draining", "in_flight": self.drain.in_flight},
+                    status_code=503,
+                )
+            if not self.resources.ready:
+                # Resources are still being opened
+                return JSONResponse({"status": "starting"}, status_code=503)
+            health = {
                 "status": "healthy",
                 "registered_bots": bots_info,
                 "bot_count": len(registered_bots),
+                "sync_pool": self.executor.stats(),
             }
+            runner = get_background_runner(create=False)
+            if runner is not None:
+                health["background"] = runner.stats()
+            return health
+
+        if self.blobs:
+            self._setup_blob_routes(self.blobs)
+
+        if self.metrics:
+
+            @self.app.get("/metrics", response_class=PlainTextResponse)
+            async def metrics_endpoint():
+                """Prometheus-style metrics for all bots"""
+                return PlainTextResponse(
+                    self.metrics.render(self._pool_gauges()),
+                    media_type="text/plain; version=0.0.4",
+                )
 
         # Register bot-specific config endpoints
         bot_configs = decorators.get_bot_configs()
         for bot_url_path, config_func in bot_configs.items():
             # Create config endpoint path (e.g., /pillsbot/config)
             config_path = f"{bot_url_path}/config"
-
-            # Create a closure to capture the config function
-            def create_config_endpoint(func: Callable):
-                async def config_endpoint():
-                    """Get bot configuration"""
-                    try:
-                        # Check if config function is async
-                        if asyncio.iscoroutinefunction(func):
-                            result = await func()
-                        else:
-                            result = func()
-
-                        # Ensure result is a BotConfig instance
-                        if isinstance(result, BotConfig):
-                            return result
-                        elif isinstance(result, dict):
-                            return BotConfig(**result)
-                        else:
-                            # Try to convert to BotConfig
-                            return result
-                    except Exception as e:
-                        # Log error for debugging
-                        print(f"Error in config endpoint: {e}")
-                        raise
-
-                return config_endpoint
+            cache = decorators.get_config_cache(config_path, config_func)
 
             # Register the config endpoint
             self.app.get(config_path, response_model=BotConfig)(
-                create_config_endpoint(config_func)
+                self._create_config_endpoint(cache)
             )
 
         # Register global config endpoint if decorator was used (backward compatibility)
         if decorators._config_function:
             config_func, config_path = decorators._config_function
+            cache = decorators.get_config_cache(config_path, config_func)
+            self.app.get(config_path, response_model=BotConfig)(
+                self._create_config_endpoint(cache)
+            )
 
-            @self.app.get(config_path, response_model=BotConfig)
-            async def config_endpoint():
-                """Get bot configuration"""
-                # Check if config function is async
-                if asyncio.iscoroutinefunction(config_func):
-                    result = await config_func()
-                else:
-                    result = config_func()
+    def _setup_blob_routes(self, store: BlobStore):
+        """
+        Setup the blob upload and lookup endpoints
+
+        Args:
+            store: Store the uploads are written to
+        """
+        max_bytes = store.config.max_bytes
+
+        @self.app.post(store.config.path)
+        async def upload_blob(request: Request):
+            """Store the raw request body under its SHA-256"""
+            length = request.headers.get("content-length")
+            if length and length.isdigit() and int(length) > max_bytes:
+                # Refused before reading any of the body
+                return JSONResponse(
+                    {"detail": f"Blob exceeds {max_bytes} bytes"}, status_code=413
+                )
+            try:
+                info = await store.put(
+                    request.stream(), request.headers.get("content-type")
+                )
+            except BlobTooLarge as e:
+                return JSONResponse({"detail": str(e)}, status_code=413)
+            except BlobStoreFull as e:
+                return JSONResponse({"detail": str(e)}, status_code=507)
+            return vars(info)
+
+        @self.app.head(store.config.path + "/{sha256}")
+        async def blob_exists(sha256: str):
+            """200 if the blob is stored, so clients can skip re-uploading"""
+            try:
+                loop = asyncio.get_running_loop()
+                info = await loop.run_in_executor(None, store.info, sha256)
+            except (BlobNotFound, ValueError):
+                return Response(status_code=404)
+            return Response(
+                headers={
+                    "Content-Length": str(info.size),
+                    "Content-Type": info.mime_type,
+                }
+            )
+
+    def _pool_gauges(self) -> List[Tuple[str, str, Dict[str, str], float]]:
+        """Thread pool utilisation gauges for the metrics endpoint"""
+        pools = [("server", self.executor)]
+        pools += [
+            (url_path, bot.executor)
+            for url_path, bot in decorators.get_registered_chatbots().items()
+            if bot.executor
+        ]
+        gauges = []
+        for key, help_text in (
+            ("active", "Sync bot calls running on a worker thread"),
+            ("queued", "Sync bot calls waiting for a worker thread"),
+            ("max_workers", "Worker threads in the pool"),
+        ):
+            for pool_name, executor in pools:
+                gauges.append(
+                    (
+                        f"bubbletea_sync_pool_{key}",
+                        help_text,
+                        {"pool": pool_name},
+                        executor.stats()[key],
+                    )
+                )
+        for key, help_text in (
+            ("active", "Chat requests holding an admission slot"),
+            ("queued", "Chat requests waiting for an admission slot"),
+        ):
+            for url_path, controller in sorted(self._admission.items()):
+                gauges.append(
+                    (
+                        f"bubbletea_admission_{key}",
+                        help_text,
+                        {"bot": url_path},
+                        getattr(controller, key),
+                    )
+                )
+        runner = get_background_runner(create=False)
+        if runner is not None:
+            for key, help_text in (
+                ("active", "Background jobs running"),
+                ("queued", "Background jobs waiting to run"),
+            ):
+                gauges.append(
+                    (f"bubbletea_background_{key}", help_text, {}, getattr(runner, key))
+                )
+        return gauges
+
+    def _create_chat_endpoint(self, bot: ChatbotFunction) -> Callable:
+        """
+        Create the chat endpoint for a chatbot
+
+        Args:
+            bot: The chatbot to serve
+
+        Returns:
+            Endpoint returning an SSE stream or a JSON component list
+        """
+        stats = self.metrics.bot(bot.url_path) if self.metrics else None
+        admission = bot.admission or self.admission
+        controller = None
+        if admission:
+            controller = self._admission[bot.url_path] = AdmissionController(admission)
+
+        async def chat_endpoint(http_request: Request):
+            """Handle chat requests"""
+            if self.drain.draining:
+                return self._draining_response(bot)
+            body = await http_request.body()
+            arrived = time.perf_counter()
+            request = self._parse_request(bot, body)
+            ctx = None
+            if self._trace:
+                ctx = RequestContext(bot.url_path, request, arrived)
+                ctx.record("parse", time.perf_counter() - arrived)
+
+            cache_key = None
+            if bot.cache is not None:
+                cache_key = bot.cache.key(bot.url_path, request)
+                cached = await bot.cache.get(cache_key)
+                if stats:
+                    if cached is None:
+                        stats.cache_misses += 1
+                    else:
+                        stats.cache_hits += 1
+                if cached is not None:
+                    return Response(
+                        cached,
+                        media_type="text/event-stream"
+                        if bot.stream
+                        else "application/json",
+                    )
+
+            if self.idempotency is not None:
+                key = self.idempotency.key(bot.url_path, http_request.headers, request)
+                if key is not None:
+                    fingerprint = self.idempotency.fingerprint(
+                        http_request.headers, body
+                    )
+                    try:
+                        recording, created = self.idempotency.claim(key, fingerprint)
+                    except IdempotencyKeyReused as e:
+                        return JSONResponse({"detail": str(e)}, status_code=422)
+                    if recording is not None:
+                        if created:
+                            # One shared run, every duplicate follows its recording
+                            recording.start(respond(request, None, cache_key, ctx))
+                        elif stats:
+                            stats.deduplicated += 1
+                        return await recording.respond(
+                            http_request.receive, replayed=not created
+                        )
+            return await respond(request, http_request, cache_key, ctx)
+
+        async def respond(
+            request: LazyChatRequest,
+            http_request: Optional[Request],
+            cache_key: Optional[str] = None,
+            ctx: Optional[RequestContext] = None,
+        ) -> Response:
+            """Run the bot, stopping it if the client of http_request leaves
+
+            Complete responses are stored under cache_key when it is set,
+            and ctx collects timings and drives the hooks when given.
+            """
+            if controller:
+                waiting = time.perf_counter()
+                if not await controller.acquire():
+                    if stats:
+                        stats.rejected += 1
+                    return self._overloaded_response(bot, controller.config)
+                if ctx is not None:
+                    ctx.record("admission", time.perf_counter() - waiting)
+
+            start = time.perf_counter()
+            if stats:
+                stats.start()
+            if ctx is not None:
+                self.hooks.request_start(ctx)
+            self.drain.enter(bot.url_path)
+
+            if bot.stream:
+                # Creating the generator is instant, the stream is watched later
+                try:
+                    response = await bot.handle_request(
+                        request, executor=self.executor
+                    )
+                except BaseException as e:
+                    if stats:
+                        stats.finish(time.perf_counter() - start, error=True)
+                    if ctx is not None:
+                        self.hooks.error(ctx, e)
+                    if controller:
+                        controller.release()
+                    self.drain.leave(
+                        bot.url_path, isinstance(e, asyncio.CancelledError)
+                    )
+                    raise
+
+                # Optionally merge small text chunks into fewer frames
+                coalesce = self.coalesce if bot.coalesce is None else bot.coalesce
+                if coalesce:
+                    response = coalesce_text(response, coalesce)
+
+                record = None
+                if cache_key is not None:
+                    record = partial(bot.cache.set, cache_key)
+
+                # Streaming response - use Server-Sent Events
+                return StreamingResponse(
+                    self._encode_stream(
+                        response,
+                        http_request,
+                        stats,
+                        start,
+                        controller,
+                        record,
+                        ctx,
+                        partial(self.drain.leave, bot.url_path),
+                    ),
+                    media_type="text/event-stream",
+                    headers=self._timing_headers(ctx),
+                )
+
+            # Non-streaming response: stop the bot if the client goes away
+            aborted = False
+            watcher = None
+            if http_request is not None:
+                watcher = DisconnectWatcher(http_request.receive)
+                watcher.start()
+            try:
+                call = bot.handle_request(request, executor=self.executor)
+                response = await (watcher.guard(call) if watcher else call)
+                if ctx is not None:
+                    ctx.record("bot", time.perf_counter() - start)
+                    for component in expand(response.responses):
+                        self.hooks.component(ctx, component)
+                    serializing = time.perf_counter()
+                body = encode_response(self.encoder, response)
+                if ctx is not None:
+                    ctx.record("serialize", time.perf_counter() - serializing)
+            except (ClientDisconnected, asyncio.CancelledError) as e:
+                if stats:
+                    stats.cancelled += 1
+                    stats.finish(time.perf_counter() - start)
+                if isinstance(e, asyncio.CancelledError):
+                    aborted = True
+                    raise
+                # Nobody is listening, this only closes the ASGI exchange
+                return Response(status_code=499)
+            except BaseException as e:
+                if stats:
+                    stats.finish(time.perf_counter() - start, error=True)
+                if ctx is not None:
+                    self.hooks.error(ctx, e)
+                raise
+            finally:
+                if watcher:
+                    watcher.stop()
+                if controller:
+                    controller.release()
+                self.drain.leave(bot.url_path, aborted)
+
+            if stats:
+                stats.components += count_components(response.responses)
+                stats.bytes += len(body)
+                stats.finish(time.perf_counter() - start)
+            if cache_key is not None and not any(
+                _is_error(component) for component in response.responses
+            ):
+                # Failures aren't cached, the next request retries
+                await bot.cache.set(cache_key, body)
+            if ctx is not None:
+                ctx.record("total", ctx.elapsed())
+                self.hooks.complete(ctx)
+            return Response(
+                body, media_type="application/json", headers=self._timing_headers(ctx)
+            )
+
+        return chat_endpoint
+
+    def _create_websocket_endpoint(self, bot: ChatbotFunction) -> Callable:
+        """
+        Create the WebSocket endpoint for a chatbot
+
+        Args:
+            bot: The chatbot to serve
+
+        Returns:
+            Endpoint running a WebSocketSession per connection
+        """
+        heartbeat = DEFAULT_HEARTBEAT
+        if not isinstance(self.websocket, bool):
+            heartbeat = float(self.websocket)
 
-                # Ensure result is a BotConfig instance
-                if isinstance(result, BotConfig):
-                    return result
-                elif isinstance(result, dict):
-                    return BotConfig(**result)
+        async def websocket_endpoint(websocket: WebSocket):
+            """Serve one persistent connection"""
+            if self.drain.draining:
+                # 1013: try again later
+                await websocket.close(code=1013)
+                return
+            await WebSocketSession(self, bot, websocket, heartbeat).run()
+
+        return websocket_endpoint
+
+    def _timing_headers(self, ctx: Optional[RequestContext]) -> Optional[Dict[str, str]]:
+        """Server-Timing header for the phases recorded so far, if enabled"""
+        if ctx is None or not self.server_timing:
+            return None
+        return {"Server-Timing": ctx.server_timing()}
+
+    def _parse_request(self, bot: ChatbotFunction, body: bytes) -> LazyChatRequest:
+        """
+        Parse a chat request body, validating only the fields the bot reads
+
+        Args:
+            bot: The chatbot the request is for
+            body: Raw JSON request body
+
+        Returns:
+            The parsed request
+
+        Raises:
+            RequestValidationError: The body is invalid (answered with 422)
+        """
+        try:
+            request = LazyChatRequest.model_validate_json(body)
+        except ValidationError as e:
+            raise RequestValidationError(_body_errors(e, ("body",)))
+
+        # Fields the bot declares are validated now so bad input is a 422
+        for name in ("images", "chat_history"):
+            if name in bot.plan.params:
+                try:
+                    value = getattr(request, name)
+                except ValidationError as e:
+                    raise RequestValidationError(_body_errors(e, ("body", name)))
+                if name == "images" and value:
+                    # Unknown hashes would otherwise fail in the bot
+                    errors = missing_blobs(value)
+                    if errors:
+                        raise RequestValidationError(
+                            [
+                                {**error, "loc": ("body", name) + error["loc"]}
+                                for error in errors
+                            ]
+                        )
+        return request
+
+    def _overloaded_response(
+        self, bot: ChatbotFunction, config: AdmissionConfig
+    ) -> Response:
+        """
+        Build the response for a request rejected by admission control
+
+        Args:
+            bot: The chatbot that is at capacity
+            config: Its admission settings
+
+        Returns:
+            503 with Retry-After; streaming bots also get an Error frame
+        """
+        return self._unavailable_response(
+            bot,
+            config.retry_after,
+            Error(
+                title="Bot is busy",
+                description="Too many concurrent requests, please retry shortly",
+                code="overloaded",
+            ),
+            "Too many concurrent requests",
+        )
+
+    def _draining_response(self, bot: ChatbotFunction) -> Response:
+        """503 for requests arriving while the server shuts down"""
+        return self._unavailable_response(
+            bot,
+            1,
+            Error(
+                title="Bot is restarting",
+                description="This server is shutting down, please retry",
+                code="draining",
+            ),
+            "Server is shutting down",
+        )
+
+    def _unavailable_response(
+        self, bot: ChatbotFunction, retry_after: int, error: Error, detail: str
+    ) -> Response:
+        """
+        Build a 503 with Retry-After
+
+        Args:
+            bot: The chatbot the request was for
+            retry_after: Seconds after which clients should retry
+            error: Error frame sent to streaming clients
+            detail: Message for JSON clients
+
+        Returns:
+            An Error frame for streaming bots, a JSON detail otherwise
+        """
+        headers = {"Retry-After": str(retry_after)}
+        if bot.stream:
+            return Response(
+                self.encoder.frame(error) + self.encoder.done_frame,
+                status_code=503,
+                media_type="text/event-stream",
+                headers=headers,
+            )
+        return Response(
+            self.encoder.dumps({"detail": detail}),
+            status_code=503,
+            media_type="application/json",
+            headers=headers,
+        )
+
+    async def _encode_stream(
+        self,
+        components: AsyncIterator[Any],
+        request: Optional[Request],
+        stats: Optional[BotMetrics],
+        start: float,
+        controller: Optional[AdmissionController] = None,
+        record: Optional[Callable[[bytes], Awaitable[None]]] = None,
+        ctx: Optional[RequestContext] = None,
+        done: Optional[Callable[[bool], None]] = None,
+    ) -> AsyncGenerator[bytes, None]:
+        """
+        Encode a component stream as SSE byte frames
+
+        When the client disconnects, the pending read from the bot is
+        cancelled and the bot generator closed, which also closes any
+        upstream LLM stream it is consuming.
+
+        Args:
+            components: Components produced by the bot
+            request: The HTTP request, watched for client disconnects
+                     (None when the stream is shared by several requests)
+            stats: Metrics for the bot, or None when metrics are disabled
+            start: perf_counter() value when the request started
+            controller: Admission slot holder to release when the stream ends
+            record: Called with the whole stream once it completed normally
+            ctx: Request context collecting timings and driving the hooks
+            done: Called once the stream ended, with whether it was cancelled
+
+        Yields:
+            One frame per component, then the Done frame
+        """
+        frame = self.encoder.frame
+        text_frame = self.encoder.text_frame
+        iterator = components.__aiter__()
+        watcher = None
+        if request is not None:
+            watcher = DisconnectWatcher(request.receive)
+            watcher.start()
+        error = False
+        cancelled = False
+        first = stats is not None
+        recorded: Optional[List[bytes]] = [] if record is not None else None
+        try:
+            while True:
+                if ctx is not None:
+                    waiting = time.perf_counter()
+                try:
+                    item = iterator.__anext__()
+                    component = await (watcher.guard(item) if watcher else item)
+                except StopAsyncIteration:
+                    break
+                if ctx is not None:
+                    encoding = time.perf_counter()
+                    ctx.record("bot", encoding - waiting)
+                    if not ctx.components:
+                        ctx.record("first_component", encoding - ctx.start)
+                    if isinstance(component, Frozen):
+                        for item in component:
+                            self.hooks.component(ctx, item)
+                    elif type(component) is str:
+                        self.hooks.component(ctx, Text(component))
+                    else:
+                        self.hooks.component(ctx, component)
+                    encoding = time.perf_counter()
+                # Encode component straight to an SSE byte frame; raw str
+                # chunks only have their text escaped into a Text template
+                if type(component) is str:
+                    data = text_frame(component)
+                    count = 1
+                elif isinstance(component, Frozen):
+                    data = component.frames
+                    count = len(component)
                 else:
-                    # Try to convert to BotConfig
-                    return result
+                    data = frame(component)
+                    count = 1
+                if ctx is not None:
+                    ctx.record("encode", time.perf_counter() - encoding)
+                if stats is not None:
+                    if first:
+                        stats.first_component.observe(time.perf_counter() - start)
+                        first = False
+                    stats.components += count
+                    stats.bytes += len(data)
+                if recorded is not None:
+                    if _is_error(component):
+                        # Failures aren't cached, the next request retries
+                        recorded = None
+                    else:
+                        recorded.append(data)
+                yield data
+            if ctx is not None:
+                ctx.record("total", ctx.elapsed())
+                if self.server_timing:
+                    # Not recorded for the cache, timings are per request
+                    yield timing_event(ctx)
+            # Send done signal
+            yield self.encoder.done_frame
+            if stats is not None:
+                stats.bytes += len(self.encoder.done_frame)
+            if recorded is not None:
+                recorded.append(self.encoder.done_frame)
+                await record(b"".join(recorded))
+            if ctx is not None:
+                self.hooks.complete(ctx)
+        except ClientDisconnected:
+            pass
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        except Exception as e:
+            error = True
+            if ctx is not None:
+                self.hooks.error(ctx, e)
+            raise
+        finally:
+            # Cancelled by the server (e.g. shutdown), not by the client
+            aborted = cancelled
+            if watcher:
+                watcher.stop()
+                cancelled = cancelled or watcher.disconnected
+            if stats is not None:
+                if cancelled:
+                    stats.cancelled += 1
+                stats.finish(time.perf_counter() - start, error=error)
+            if controller:
+                controller.release()
+            if done is not None:
+                done(aborted)
+            # Close the bot generator if the stream ended early
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    def _create_config_endpoint(self, cache: ConfigCache) -> Callable:
+        """
+        Create a config endpoint serving cached, pre-serialized bytes
+
+        Args:
+            cache: Cache wrapping the config function
+
+        Returns:
+            Endpoint answering If-None-Match with 304 when the ETag matches
+        """
+
+        async def config_endpoint(request: Request):
+            """Get bot configuration"""
+            try:
+                body, etag = await cache.get()
+            except Exception as e:
+                # Log error for debugging
+                print(f"Error in config endpoint: {e}")
+                raise
+
+            headers = {"ETag": etag, "Cache-Control": "no-cache"}
+            if etag_matches(request.headers.get("if-none-match"), etag):
+                return Response(status_code=304, headers=headers)
+            return Response(body, media_type="application/json", headers=headers)
 
-    def run(self, host: str = "0.0.0.0"):
+        return config_endpoint
+
+    def run(
+        self,
+        host: str = "0.0.0.0",
+        workers: int = 1,
+        loop: str = "auto",
+        http: str = "auto",
+        preload: Optional[List[str]] = None,
+    ):
         """
         Run the server
 
         Args:
             host: Host address to bind to
+            workers: Number of worker processes. With more than one, each
+                     worker builds its own app through create_app()
+            loop: Event loop implementation ("auto", "asyncio" or "uvloop")
+            http: HTTP implementation ("auto", "h11" or "httptools")
+            preload: Modules to import before starting workers, so forked
+                     workers share them copy-on-write (e.g. ["litellm"])
         """
-        uvicorn.run(self.app, host=host, port=self.port)
+        preload_modules(preload)
+
+        if workers > 1:
+            # Workers rebuild the encoder from its name
+            if type(get_encoder(self.encoder.name)) is not type(self.encoder):
+                raise ValueError("Multiple workers require an encoder chosen by name")
+            if self.hooks.hooks and not hasattr(os, "fork"):
+                raise ValueError("Multiple workers with hooks require os.fork()")
+            _worker_hooks[:] = self.hooks.hooks
+            os.environ[SERVER_OPTIONS_ENV] = json.dumps(self._options)
+            run_workers(
+                host,
+                self.port,
+                workers,
+                loop=loop,
+                http=http,
+                drain_timeout=self.drain.timeout,
+            )
+        else:
+            config = uvicorn.Config(
+                self.app,
+                host=host,
+                port=self.port,
+                loop=loop,
+                http=http,
+                timeout_graceful_shutdown=self.drain.timeout,
+            )
+            server = DrainingServer(config)
+            server.run()
+            if not server.started:
+                sys.exit(3)  # uvicorn's startup failure code
+
+
+def create_app() -> FastAPI:
+    """
+    App factory used by worker processes
+
+    Rebuilds the server from the options that BubbleTeaServer.run() stored
+    in the BUBBLETEA_SERVER_OPTIONS environment variable. The chatbot
+    registry is already populated: forked workers inherit it from the
+    supervisor and spawned workers re-import the main module.
+
+    Returns:
+        The FastAPI application for this worker
+    """
+    options = json.loads(os.environ.get(SERVER_OPTIONS_ENV, "{}"))
+
+    chatbot_path = options.pop("chatbot", None)
+    chatbot = None
+    if chatbot_path:
+        chatbot = decorators.get_registered_chatbots().get(chatbot_path)
+
+    coalesce = options.pop("coalesce", False)
+    if isinstance(coalesce, dict):
+        coalesce = CoalesceConfig(**coalesce)
+
+    admission = options.pop("admission", None)
+    if isinstance(admission, dict):
+        admission = AdmissionConfig(**admission)
+
+    idempotency = options.pop("idempotency", False)
+    if isinstance(idempotency, dict):
+        idempotency = IdempotencyConfig(**idempotency)
+
+    blobs = options.pop("blobs", False)
+    if isinstance(blobs, dict):
+        blobs = BlobConfig(**blobs)
+
+    return BubbleTeaServer(
+        chatbot,
+        coalesce=coalesce,
+        admission=admission,
+        idempotency=idempotency,
+        blobs=blobs,
+        hooks=_worker_hooks,
+        **options,
+    ).app
 
 
 def run_server(
@@ -226,6 +1065,22 @@ def run_server(
     cors: bool = True,
     cors_config: Optional[Dict[str, Any]] = None,
     register_all: bool = True,
+    sync_workers: int = DEFAULT_SYNC_WORKERS,
+    encoder: Union[str, SSEEncoder] = "pydantic",
+    coalesce: Union[bool, CoalesceConfig] = False,
+    metrics: bool = False,
+    admission: Union[int, AdmissionConfig, None] = None,
+    idempotency: Union[bool, IdempotencyConfig] = False,
+    hooks: Optional[List[RequestHooks]] = None,
+    server_timing: bool = False,
+    drain_timeout: Optional[float] = None,
+    websocket: Union[bool, float] = False,
+    validate_components: Optional[bool] = None,
+    blobs: Union[bool, BlobConfig] = False,
+    workers: int = 1,
+    loop: str = "auto",
+    http: str = "auto",
+    preload: Optional[List[str]] = None,
 ):
     """
     Run a FastAPI server for chatbots
@@ -246,6 +1101,73 @@ def run_server(
             - allow_headers: Allowed headers (default: ["*"])
         register_all: If True, registers all decorated chatbots (default: True)
                       If False, only registers the specified chatbot
+        sync_workers: Thread pool size for synchronous chatbot functions
+                      (default: 40). Bots can override with @chatbot(workers=N)
+        encoder: Response encoder backend: "pydantic" (default), "orjson"
+                 or "msgspec" (requires the package), or an SSEEncoder.
+                 Components are always serialized by pydantic-core; the
+                 other backends only encode plain dict/list values
+        coalesce: Merge consecutive streamed Text/Markdown chunks until 512
+                  bytes or 30 ms have accumulated (default: False).
+                  Pass a CoalesceConfig to tune the thresholds
+        metrics: Expose Prometheus-style per-bot metrics at /metrics
+                 (default: False)
+        admission: Limit concurrent requests per bot (default: None, no
+                   limit). An int sets the concurrency; an AdmissionConfig
+                   also allows a wait queue and timeout. Excess requests
+                   get a 503 with Retry-After. Bots can override with
+                   @chatbot(admission=...)
+        idempotency: Deduplicate retried requests (default: False). Requests
+                     with the same Idempotency-Key header, user and
+                     conversation share one bot run whose response is
+                     replayed for 60 s (responses over 1 MB are only
+                     shared while running); a different body under the
+                     same key gets a 422. Pass an
+                     IdempotencyConfig to tune the TTL and sizes, or to
+                     also match requests by conversation_uuid and message
+        hooks: RequestHooks notified when requests start, for every
+               component, and when they complete or fail (default: None).
+               Cache hits and deduplicated replays don't run the bot and
+               don't fire hooks
+        server_timing: Report parse/admission/bot/serialize timings in a
+                       Server-Timing header (default: False). Streams also
+                       end with a "server-timing" event before done
+        drain_timeout: Seconds to finish in-flight requests, streams and
+                       background jobs after SIGTERM (default: None, wait
+                       for requests without limit). New requests and
+                       /health get 503 meanwhile, and whatever is still
+                       running at the deadline is cancelled and reported.
+                       Use 8 on Cloud Run, which kills after 10 s
+        websocket: Also serve each bot over a persistent WebSocket at
+                   "<url_path>/ws" (default: False). Turns are multiplexed
+                   by id (up to 8 at once per connection), and components
+                   sent with push_local() reach connections that sent a
+                   turn of that conversation as the same user (in
+                   addition to, not instead of, push_message()). A number
+                   sets the heartbeat interval (default: 20 s). Requires
+                   'bubbletea-chat[websocket]'
+        validate_components: Validate the arguments of component
+                             constructors (default: None, keep the setting
+                             of set_component_validation(), which starts
+                             on). False builds
+                             components without pydantic validation, much
+                             faster for large Cards grids and long streams,
+                             with the same JSON output; turn it off once
+                             the bot is known to pass the right types
+        blobs: Accept image uploads at POST /blobs (default: False).
+               Uploads are streamed to disk under their SHA-256, up to
+               20 MB each and 1 GB in all (further uploads get a 507),
+               kept for 24 h; chat requests then send
+               {"blob": "<sha256>"} instead of base64, and HEAD
+               /blobs/<sha256> tells whether an image is already
+               stored. Pass a BlobConfig to change the directory, size
+               limits, TTL or path
+        workers: Number of worker processes (default: 1). Bots must be
+                 defined at module level so every worker registers them
+        loop: Event loop: "auto" (uvloop if installed), "asyncio" or "uvloop"
+        http: HTTP parser: "auto" (httptools if installed), "h11" or "httptools"
+        preload: Modules to import once before forking workers, e.g.
+                 ["litellm"], so their memory is shared copy-on-write
 
     Examples:
         # Single bot
@@ -260,8 +1182,27 @@ def run_server(
         @chatbot("bot2")
         def bot2(message: str): ...
         run_server()  # Serves both bots
+
+        # Use every core of the instance
+        run_server(workers=4, preload=["litellm"])
     """
     server = BubbleTeaServer(
-        chatbot, port, cors=cors, cors_config=cors_config, register_all=register_all
+        chatbot,
+        port,
+        cors=cors,
+        cors_config=cors_config,
+        register_all=register_all,
+        sync_workers=sync_workers,
+        encoder=encoder,
+        coalesce=coalesce,
+        metrics=metrics,
+        admission=admission,
+        idempotency=idempotency,
+        hooks=hooks,
+        server_timing=server_timing,
+        drain_timeout=drain_timeout,
+        websocket=websocket,
+        validate_components=validate_components,
+        blobs=blobs,
     )
-    server.run(host)
+    server.run(host, workers=workers, loop=loop, http=http, preload=preload)
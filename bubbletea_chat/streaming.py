@@ -0,0 +1,240 @@
+"""
+Stream processing stages for BubbleTea chatbots
+
+Stages sit between a bot's async generator and the SSE writer in the
+server and transform the component stream without the bot noticing.
+"""
+
+import asyncio
+import uuid
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    AsyncGenerator,
+    Iterable,
+    List,
+    Optional,
+    Union,
+)
+
+from .components import BlockSnapshot, Markdown, MarkdownDelta, Text, TextDelta
+
+# Default UTF-8 bytes buffered before a merged chunk is flushed
+DEFAULT_COALESCE_BYTES = 512
+
+# Default maximum time (seconds) a chunk may wait in the buffer
+DEFAULT_COALESCE_INTERVAL = 0.03
+
+# Component types (and raw str chunks) whose consecutive chunks can be merged
+_MERGEABLE = (Text, Markdown, str)
+
+# Delta types, merged only within the same block
+_DELTAS = (TextDelta, MarkdownDelta)
+
+
+class CoalesceConfig:
+    """
+    Settings for merging consecutive text chunks in a stream.
+
+    Attributes:
+        max_bytes: Flush once the buffered text is this long in UTF-8, so
+                   CJK or emoji text doesn't make frames several times bigger
+        flush_interval: Flush once the oldest buffered chunk is this old (seconds)
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_COALESCE_BYTES,
+        flush_interval: float = DEFAULT_COALESCE_INTERVAL,
+    ):
+        """Initialize coalescing settings.
+
+        Args:
+            max_bytes: Flush once this many UTF-8 bytes are buffered
+            flush_interval: Maximum time a chunk waits before being sent
+        """
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+
+    def __repr__(self) -> str:
+        return (
+            f"CoalesceConfig(max_bytes={self.max_bytes!r}, "
+            f"flush_interval={self.flush_interval!r})"
+        )
+
+
+def resolve_coalesce(
+    coalesce: Union[bool, CoalesceConfig, None]
+) -> Optional[CoalesceConfig]:
+    """
+    Normalize a coalesce option to a config or None.
+
+    Args:
+        coalesce: True for defaults, a CoalesceConfig, or False/None to disable
+
+    Returns:
+        CoalesceConfig when coalescing is enabled, else None
+    """
+    if coalesce is True:
+        return CoalesceConfig()
+    if isinstance(coalesce, CoalesceConfig):
+        return coalesce
+    return None
+
+
+async def coalesce_text(
+    components: AsyncIterator[Any],
+    config: Optional[CoalesceConfig] = None,
+) -> AsyncGenerator[Any, None]:
+    """
+    Merge consecutive Text/Markdown chunks of a component stream.
+
+    Raw str chunks are merged with each other and stay str.
+
+    Chunks of the same type (and deltas of the same block) are
+    concatenated until max_bytes is reached or the oldest buffered chunk
+    has waited flush_interval seconds. Any other component flushes the
+    buffer first and is passed through immediately, so ordering is
+    preserved.
+
+    Args:
+        components: Component stream produced by a bot
+        config: Coalescing settings (defaults to CoalesceConfig())
+
+    Yields:
+        Components, with runs of text chunks merged
+    """
+    config = config or CoalesceConfig()
+    loop = asyncio.get_running_loop()
+    iterator = components.__aiter__()
+    buffer: List[str] = []
+    buffered_type = None
+    buffered_block = None
+    size = 0
+    deadline = 0.0
+    pending: Optional[asyncio.Future] = None
+
+    def flush():
+        nonlocal size
+        if buffered_type is str:
+            merged = "".join(buffer)
+        elif buffered_block is None:
+            merged = buffered_type("".join(buffer))
+        else:
+            merged = buffered_type("".join(buffer), buffered_block)
+        buffer.clear()
+        size = 0
+        return merged
+
+    try:
+        while True:
+            if buffer:
+                # Wait for the next chunk, but not past the flush deadline
+                if pending is None:
+                    pending = asyncio.ensure_future(iterator.__anext__())
+                done, _ = await asyncio.wait(
+                    (pending,), timeout=max(deadline - loop.time(), 0)
+                )
+                if not done:
+                    yield flush()
+                    continue
+
+            try:
+                if pending is not None:
+                    item = await pending
+                else:
+                    item = await iterator.__anext__()
+            except StopAsyncIteration:
+                break
+            finally:
+                pending = None
+
+            item_type = type(item)
+            if item_type in _MERGEABLE or item_type in _DELTAS:
+                block = item.block_id if item_type in _DELTAS else None
+                if buffer and (
+                    item_type is not buffered_type or block != buffered_block
+                ):
+                    yield flush()
+                if not buffer:
+                    buffered_type = item_type
+                    buffered_block = block
+                    deadline = loop.time() + config.flush_interval
+                text = item if item_type is str else item.content
+                buffer.append(text)
+                # ASCII is one byte per character, only encode the rest
+                size += len(text) if text.isascii() else len(text.encode())
+                if size >= config.max_bytes:
+                    yield flush()
+            else:
+                if buffer:
+                    yield flush()
+                yield item
+
+        if buffer:
+            yield flush()
+    finally:
+        if pending is not None:
+            pending.cancel()
+            try:
+                await pending
+            except (asyncio.CancelledError, Exception):
+                pass
+        aclose = getattr(components, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+async def stream_deltas(
+    chunks: Union[AsyncIterable[str], Iterable[str]],
+    markdown: bool = True,
+    block_id: Optional[str] = None,
+    snapshot: bool = True,
+) -> AsyncGenerator[Any, None]:
+    """
+    Turn a stream of text chunks, e.g. LLM.stream(), into delta components.
+
+    Each chunk is sent as a delta appended to one block, so the client
+    renders a single growing message instead of a fragment per chunk.
+    A BlockSnapshot with the whole content ends the block for clients
+    that joined late or missed a delta.
+
+    Args:
+        chunks: Text chunks, sync or async
+        markdown: Render the block as markdown (True) or plain text
+        block_id: Identifier of the block (a random one by default)
+        snapshot: Send the final BlockSnapshot
+
+    Yields:
+        MarkdownDelta or TextDelta components, then the BlockSnapshot
+
+    Example:
+        @chatbot
+        async def answer(message: str):
+            async for delta in stream_deltas(llm.stream(message)):
+                yield delta
+    """
+    block_id = block_id or uuid.uuid4().hex
+    delta_type = MarkdownDelta if markdown else TextDelta
+    received: List[str] = []
+    try:
+        if hasattr(chunks, "__aiter__"):
+            async for chunk in chunks:
+                if chunk:
+                    received.append(chunk)
+                    yield delta_type(chunk, block_id)
+        else:
+            for chunk in chunks:
+                if chunk:
+                    received.append(chunk)
+                    yield delta_type(chunk, block_id)
+        if snapshot:
+            yield BlockSnapshot(
+                "".join(received), block_id, "markdown" if markdown else "text"
+            )
+    finally:
+        # Stop the upstream stream (e.g. the LLM call) when cut short
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
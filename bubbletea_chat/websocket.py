@@ -0,0 +1,335 @@
+"""
+WebSocket transport for BubbleTea chatbots
+
+Each bot can also be served at "<url_path>/ws", where a client keeps one
+connection open for a whole conversation instead of POSTing every turn.
+Messages are JSON text frames:
+
+Client to server:
+    {"event": "request", "id": "t1", "data": {<chat request>}}
+    {"event": "cancel", "id": "t1"}
+    {"event": "ping"}
+
+Server to client:
+    {"event": "component", "id": "t1", "data": {<component>}}
+    {"event": "done", "id": "t1"}
+    {"event": "error", "id": "t1", "data": {<Error component>}}
+    {"event": "push", "data": {<component>}}
+    {"event": "ping"} / {"event": "pong"}
+
+Turns run concurrently and are told apart by their id, a string or an
+integer; at most max_turns run at once per connection, further ones get
+an "overloaded" error. The server sends a ping every heartbeat seconds.
+Once a connection has sent a valid turn of a conversation as a user, it
+also receives components pushed to that user in that conversation with
+push_local(), e.g. from a background job that finished generating a
+video. push_local() is only a shortcut to clients that are connected
+right now: keep sending the platform push (push_message()) so the
+conversation itself gets the component.
+
+Serving WebSockets requires uvicorn's websocket support
+(pip install 'bubbletea-chat[websocket]').
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+from pydantic import BaseModel, ValidationError
+from starlette.websockets import WebSocket
+
+from .blobs import missing_blobs
+from .components import Error
+from .frozen import Frozen
+from .schemas import LazyChatRequest
+from .streaming import coalesce_text
+
+# Default seconds between heartbeat pings
+DEFAULT_HEARTBEAT = 20.0
+
+# Default turns one connection may run at once
+DEFAULT_MAX_TURNS = 8
+
+# Live connections per (conversation_uuid, user_uuid), for push_local()
+_connections: Dict[Tuple[str, str], Set["WebSocketSession"]] = {}
+
+
+def _frame(event: str, turn: Any = None, data: Optional[bytes] = None) -> str:
+    """Encode an envelope around already-encoded component JSON"""
+    parts = [f'{{"event":"{event}"']
+    if turn is not None:
+        parts.append(f',"id":{json.dumps(turn)}')
+    if data is not None:
+        parts.append(',"data":')
+        parts.append(data.decode())
+    parts.append("}")
+    return "".join(parts)
+
+
+class WebSocketSession:
+    """
+    One client connection to a bot.
+
+    Attributes:
+        server: The BubbleTeaServer serving the bot
+        bot: The chatbot function
+        websocket: The accepted connection
+        conversations: (conversation_uuid, user_uuid) pairs the connection
+                       has sent turns for, whose push_local() components
+                       it receives
+        turns: Running turns by id
+        max_turns: Turns allowed to run at once
+    """
+
+    def __init__(
+        self,
+        server: Any,
+        bot: Any,
+        websocket: WebSocket,
+        heartbeat: float = DEFAULT_HEARTBEAT,
+        max_turns: int = DEFAULT_MAX_TURNS,
+    ):
+        self.server = server
+        self.bot = bot
+        self.websocket = websocket
+        self.heartbeat = heartbeat
+        self.max_turns = max_turns
+        self.conversations: Set[Tuple[str, str]] = set()
+        self.turns: Dict[Any, asyncio.Task] = {}
+        self.loop = asyncio.get_running_loop()
+        self._send_lock = asyncio.Lock()
+        self._next_turn = 0
+
+    async def send(self, text: str):
+        """Send one frame; frames of concurrent turns never interleave"""
+        async with self._send_lock:
+            await self.websocket.send_text(text)
+
+    async def push(self, content: Union[BaseModel, Dict[str, Any]]):
+        """Send a component that doesn't belong to a turn"""
+        await self.send(_frame("push", data=self.server.encoder.dumps(content)))
+
+    async def run(self):
+        """Serve the connection until the client closes it"""
+        await self.websocket.accept()
+        pinger = asyncio.ensure_future(self._ping())
+        try:
+            while True:
+                received = await self.websocket.receive()
+                if received["type"] == "websocket.disconnect":
+                    break
+                try:
+                    message = json.loads(received["text"])
+                    event = message.get("event")
+                except (KeyError, TypeError, ValueError, AttributeError):
+                    # Binary frames have no "text"
+                    await self._error(
+                        None, "invalid_message", "Frames must be JSON text objects"
+                    )
+                    continue
+                turn = message.get("id")
+                if turn is not None and (
+                    type(turn) is not str and type(turn) is not int
+                ):
+                    await self._error(
+                        None, "invalid_message", "id must be a string or an integer"
+                    )
+                    continue
+                if event == "request":
+                    self._start_turn(turn, message.get("data"))
+                elif event == "cancel":
+                    task = self.turns.get(turn)
+                    if task is not None:
+                        task.cancel()
+                elif event == "ping":
+                    await self.send(_frame("pong"))
+                elif event != "pong":
+                    description = f"Unknown event {event!r}"
+                    await self._error(turn, "invalid_message", description)
+        finally:
+            pinger.cancel()
+            for subscription in self.conversations:
+                sessions = _connections.get(subscription)
+                if sessions is not None:
+                    sessions.discard(self)
+                    if not sessions:
+                        del _connections[subscription]
+            # Nobody is listening anymore, stop the running turns
+            for task in list(self.turns.values()):
+                task.cancel()
+            if self.turns:
+                await asyncio.gather(*self.turns.values(), return_exceptions=True)
+
+    async def _ping(self):
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            try:
+                await self.send(_frame("ping"))
+            except Exception:
+                return
+
+    async def _error(self, turn: Any, code: str, description: str):
+        error = Error(title="Request failed", description=description, code=code)
+        await self.send(_frame("error", turn, self.server.encoder.dumps(error)))
+
+    def _start_turn(self, turn: Any, data: Any):
+        if turn is None:
+            self._next_turn += 1
+            turn = self._next_turn
+        if turn in self.turns:
+            asyncio.ensure_future(
+                self._error(turn, "duplicate_id", "A turn with this id is running")
+            )
+            return
+        if len(self.turns) >= self.max_turns:
+            description = f"At most {self.max_turns} turns can run at once"
+            asyncio.ensure_future(self._error(turn, "overloaded", description))
+            return
+        self.turns[turn] = asyncio.ensure_future(self._run_turn(turn, data))
+
+    async def _run_turn(self, turn: Any, data: Any):
+        """Run the bot for one request and send its components"""
+        server, bot = self.server, self.bot
+        try:
+            try:
+                request = LazyChatRequest.model_validate(data)
+                for name in ("images", "chat_history"):
+                    if name in bot.plan.params:
+                        getattr(request, name)
+            except ValidationError as e:
+                await self._error(turn, "invalid_request", str(e))
+                return
+            if "images" in bot.plan.params:
+                errors = missing_blobs(request.images)
+                if errors:
+                    await self._error(turn, "invalid_request", errors[0]["msg"])
+                    return
+            if server.drain.draining:
+                await self._error(turn, "draining", "Server is shutting down")
+                return
+            if request.conversation_uuid and request.user_uuid:
+                self._subscribe(request.conversation_uuid, request.user_uuid)
+            await self._respond(turn, request)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"Error in WebSocket turn of {bot.url_path}: {e}")
+            try:
+                await self._error(turn, "bot_error", str(e))
+            except Exception:
+                pass
+        finally:
+            self.turns.pop(turn, None)
+
+    def _subscribe(self, conversation_uuid: str, user_uuid: str):
+        """Receive push_local() components for a user's conversation from now on"""
+        subscription = (conversation_uuid, user_uuid)
+        if subscription not in self.conversations:
+            self.conversations.add(subscription)
+            _connections.setdefault(subscription, set()).add(self)
+
+    async def _respond(self, turn: Any, request: LazyChatRequest):
+        server, bot = self.server, self.bot
+        controller = server._admission.get(bot.url_path)
+        stats = server.metrics.bot(bot.url_path) if server.metrics else None
+        if controller and not await controller.acquire():
+            if stats:
+                stats.rejected += 1
+            await self._error(turn, "overloaded", "Too many concurrent requests")
+            return
+        start = time.perf_counter()
+        if stats:
+            stats.start()
+        server.drain.enter(bot.url_path)
+        error = cancelled = False
+        try:
+            response = await bot.handle_request(request, executor=server.executor)
+            if bot.stream:
+                coalesce = server.coalesce if bot.coalesce is None else bot.coalesce
+                if coalesce:
+                    response = coalesce_text(response, coalesce)
+                components = response
+            else:
+                components = _iterate(response.responses)
+            first = True
+            async for component in components:
+                if type(component) is str:
+                    encoded = (server.encoder.text(component),)
+                elif isinstance(component, Frozen):
+                    encoded = component.json
+                else:
+                    encoded = (server.encoder.dumps(component),)
+                for data in encoded:
+                    await self.send(_frame("component", turn, data))
+                    if stats:
+                        if first:
+                            stats.first_component.observe(time.perf_counter() - start)
+                            first = False
+                        stats.components += 1
+                        stats.bytes += len(data)
+            await self.send(_frame("done", turn))
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        except Exception:
+            error = True
+            raise
+        finally:
+            if stats:
+                if cancelled:
+                    stats.cancelled += 1
+                stats.finish(time.perf_counter() - start, error=error)
+            server.drain.leave(bot.url_path, cancelled)
+            if controller:
+                controller.release()
+
+
+async def _iterate(items: List[Any]):
+    for item in items:
+        yield item
+
+
+async def push_local(
+    conversation_uuid: str,
+    content: Union[BaseModel, Dict[str, Any]],
+    *,
+    user_uuid: Optional[str],
+) -> bool:
+    """
+    Send a component to a user's WebSocket clients of a conversation.
+
+    Reaches open connections that have sent a turn of the conversation
+    with this user_uuid, so knowing a conversation_uuid alone is not
+    enough to receive its components. It doesn't store anything in the
+    conversation, so it doesn't replace push_message(): send that too,
+    this only gets the component to live clients sooner.
+
+    Safe to call from any event loop, e.g. a background job.
+
+    Args:
+        conversation_uuid: Conversation the clients subscribed to
+        content: Component or its dict form
+        user_uuid: User the component is for, from the request that
+                   started the work (nothing is sent without one)
+
+    Returns:
+        True if at least one connected client received it
+    """
+    if not user_uuid:
+        return False
+    delivered = False
+    running = asyncio.get_running_loop()
+    for session in list(_connections.get((conversation_uuid, user_uuid), ())):
+        try:
+            if session.loop is running:
+                await session.push(content)
+            else:
+                future = asyncio.run_coroutine_threadsafe(
+                    session.push(content), session.loop
+                )
+                await asyncio.wrap_future(future)
+            delivered = True
+        except Exception as e:
+            print(f"Error pushing to WebSocket of {conversation_uuid}: {e}")
+    return delivered
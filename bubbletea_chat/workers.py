@@ -0,0 +1,142 @@
+"""
+Multi-process serving for BubbleTea bots
+
+Runs several uvicorn worker processes behind one listening socket. On
+POSIX systems the supervisor imports heavy modules once and then forks,
+so workers share those pages copy-on-write; each worker builds its own
+app through an app factory after the fork. Elsewhere uvicorn's
+spawn-based workers are used.
+"""
+
+import importlib
+import os
+import signal
+import time
+from typing import Dict, Iterable, Optional
+
+import uvicorn
+
+from .drain import DrainingServer
+
+# Import string of the app factory used by worker processes
+APP_FACTORY = "bubbletea_chat.server:create_app"
+
+# Workers dying sooner than this after starting are not replaced
+MIN_WORKER_UPTIME = 1.0
+
+
+def preload_modules(modules: Optional[Iterable[str]]):
+    """
+    Import modules ahead of serving (e.g. "litellm").
+
+    Args:
+        modules: Module names to import
+    """
+    for module in modules or ():
+        importlib.import_module(module)
+
+
+def run_workers(
+    host: str,
+    port: int,
+    workers: int,
+    loop: str = "auto",
+    http: str = "auto",
+    drain_timeout: Optional[float] = None,
+):
+    """
+    Serve the app factory with several worker processes.
+
+    The caller must have stored the server options where create_app()
+    can find them before calling this.
+
+    Args:
+        host: Host address to bind to
+        port: Port to bind to
+        workers: Number of worker processes
+        loop: Event loop implementation ("auto", "asyncio" or "uvloop")
+        http: HTTP protocol implementation ("auto", "h11" or "httptools")
+        drain_timeout: Seconds workers give in-flight requests on shutdown
+    """
+    if not hasattr(os, "fork"):
+        # No fork on this platform, let uvicorn spawn fresh interpreters
+        uvicorn.run(
+            APP_FACTORY,
+            factory=True,
+            host=host,
+            port=port,
+            workers=workers,
+            loop=loop,
+            http=http,
+            timeout_graceful_shutdown=drain_timeout,
+        )
+        return
+
+    config = uvicorn.Config(
+        APP_FACTORY,
+        factory=True,
+        host=host,
+        port=port,
+        loop=loop,
+        http=http,
+        timeout_graceful_shutdown=drain_timeout,
+    )
+    sock = config.bind_socket()
+    children: Dict[int, float] = {}  # pid -> start time
+    stopping = False
+
+    def start_worker():
+        pid = os.fork()
+        if pid == 0:
+            # Worker process: restore default handlers, uvicorn installs its own
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                DrainingServer(config).run(sockets=[sock])
+            finally:
+                os._exit(0)
+        children[pid] = time.monotonic()
+
+    def stop_workers():
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def handle_term(signum, frame):
+        stop_workers()
+
+    def handle_int(signum, frame):
+        # Ctrl-C already reaches every worker in the process group
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, handle_term)
+    signal.signal(signal.SIGINT, handle_int)
+
+    print(f"Starting {workers} workers on http://{host}:{port} (pid {os.getpid()})")
+    for _ in range(workers):
+        start_worker()
+
+    try:
+        while children:
+            try:
+                pid, _ = os.wait()
+            except ChildProcessError:
+                break
+            started = children.pop(pid, None)
+            if stopping or started is None:
+                continue
+            if time.monotonic() - started < MIN_WORKER_UPTIME:
+                # Crashing on startup, replacing it would loop forever
+                print(f"Worker {pid} exited during startup, shutting down")
+                stop_workers()
+            else:
+                # Replace a worker that died unexpectedly
+                print(f"Worker {pid} exited, starting a replacement")
+                start_worker()
+    finally:
+        sock.close()
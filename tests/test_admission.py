@@ -0,0 +1,204 @@
+"""
+Pytest tests for per-bot admission control
+
+These tests verify that:
+- The controller admits up to max_concurrency requests at once
+- Waiting requests are served in FIFO order when a slot frees up
+- Requests are rejected when the queue is full or the wait times out
+- Over-capacity chat requests get a 503 with Retry-After
+- Streaming bots also receive an overloaded Error frame
+- Bot settings override the server default and stats are exposed
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+import bubbletea_chat as bt
+from bubbletea_chat import decorators
+from bubbletea_chat.admission import (
+    AdmissionConfig,
+    AdmissionController,
+    resolve_admission,
+)
+from bubbletea_chat.server import BubbleTeaServer
+
+
+@pytest.fixture(autouse=True)
+def reset_registry():
+    """Give each test a clean chatbot registry"""
+    decorators._chatbot_registry.clear()
+    yield
+    decorators._chatbot_registry.clear()
+
+
+def make_client(server):
+    """Async client calling the app in-process"""
+    transport = httpx.ASGITransport(app=server.app)
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+def test_resolve_admission():
+    """Ints become configs, None disables limiting"""
+    assert resolve_admission(None) is None
+    assert resolve_admission(3).max_concurrency == 3
+    config = AdmissionConfig(2, max_queue=5)
+    assert resolve_admission(config) is config
+    with pytest.raises(ValueError):
+        AdmissionConfig(0)
+
+
+@pytest.mark.asyncio
+async def test_controller_rejects_when_queue_full():
+    """Without a queue the second request is rejected immediately"""
+    controller = AdmissionController(AdmissionConfig(1))
+    assert await controller.acquire()
+    assert not await controller.acquire()
+    assert controller.stats()["rejected"] == 1
+    controller.release()
+    assert controller.active == 0
+    assert await controller.acquire()
+
+
+@pytest.mark.asyncio
+async def test_controller_hands_slots_over_in_order():
+    """Released slots go to the oldest waiter"""
+    controller = AdmissionController(AdmissionConfig(1, max_queue=2))
+    order = []
+
+    async def worker(name):
+        assert await controller.acquire()
+        order.append(name)
+
+    assert await controller.acquire()
+    tasks = [asyncio.create_task(worker(name)) for name in ("a", "b")]
+    await asyncio.sleep(0)
+    assert controller.queued == 2
+
+    controller.release()
+    await asyncio.sleep(0)
+    assert order == ["a"]
+    assert controller.active == 1
+
+    controller.release()
+    await asyncio.gather(*tasks)
+    assert order == ["a", "b"]
+    controller.release()
+    assert controller.active == 0
+
+
+@pytest.mark.asyncio
+async def test_controller_queue_timeout():
+    """Waiters give up after queue_timeout"""
+    controller = AdmissionController(
+        AdmissionConfig(1, max_queue=1, queue_timeout=0.01)
+    )
+    assert await controller.acquire()
+    assert not await controller.acquire()
+    assert controller.timed_out == 1
+    assert controller.queued == 0
+    assert controller.active == 1
+
+
+@pytest.mark.asyncio
+async def test_non_streaming_bot_overloaded():
+    """Requests beyond the limit get a JSON 503 with Retry-After"""
+    entered = asyncio.Event()
+    release = asyncio.Event()
+
+    @bt.chatbot("slow", stream=False, admission=AdmissionConfig(1, retry_after=7))
+    async def slow_bot(message: str):
+        entered.set()
+        await release.wait()
+        return bt.Text(message)
+
+    server = BubbleTeaServer(metrics=True)
+    async with make_client(server) as client:
+        first = asyncio.create_task(
+            client.post("/slow", json={"type": "user", "message": "one"})
+        )
+        await entered.wait()
+
+        rejected = await client.post("/slow", json={"type": "user", "message": "two"})
+        assert rejected.status_code == 503
+        assert rejected.headers["retry-after"] == "7"
+        assert rejected.json() == {"detail": "Too many concurrent requests"}
+
+        release.set()
+        response = await first
+        assert response.status_code == 200
+        assert response.json()["responses"][0]["content"] == "one"
+
+        health = (await client.get("/health")).json()
+        stats = health["registered_bots"][0]["admission"]
+        assert stats["active"] == 0
+        assert stats["rejected"] == 1
+
+        metrics = (await client.get("/metrics")).text
+        assert 'bubbletea_requests_rejected_total{bot="/slow"} 1' in metrics
+        assert 'bubbletea_requests_total{bot="/slow"} 1' in metrics
+        assert 'bubbletea_admission_active{bot="/slow"} 0' in metrics
+
+
+@pytest.mark.asyncio
+async def test_streaming_bot_overloaded():
+    """Streaming bots get an Error frame and hold the slot until the stream ends"""
+    entered = asyncio.Event()
+    release = asyncio.Event()
+
+    @bt.chatbot("stream")
+    async def stream_bot(message: str):
+        entered.set()
+        await release.wait()
+        yield bt.Text(message)
+
+    server = BubbleTeaServer(admission=1)
+    async with make_client(server) as client:
+        first = asyncio.create_task(
+            client.post("/stream", json={"type": "user", "message": "one"})
+        )
+        await entered.wait()
+
+        rejected = await client.post("/stream", json={"type": "user", "message": "two"})
+        assert rejected.status_code == 503
+        assert rejected.headers["retry-after"] == "1"
+        frames = [
+            json.loads(line[len("data: "):])
+            for line in rejected.text.split("\n\n")
+            if line
+        ]
+        assert frames[0]["type"] == "error"
+        assert frames[0]["code"] == "overloaded"
+        assert frames[-1]["type"] == "done"
+
+        release.set()
+        response = await first
+        assert response.status_code == 200
+        assert '"content":"one"' in response.text.replace(" ", "")
+
+        again = await client.post("/stream", json={"type": "user", "message": "three"})
+        assert again.status_code == 200
+
+
+def test_bot_setting_overrides_server():
+    """@chatbot(admission=...) takes precedence over the server default"""
+
+    @bt.chatbot("own", admission=5)
+    def own_bot(message: str):
+        return bt.Text(message)
+
+    @bt.chatbot("shared")
+    def shared_bot(message: str):
+        return bt.Text(message)
+
+    @bt.chatbot("free")
+    def free_bot(message: str):
+        return bt.Text(message)
+
+    server = BubbleTeaServer(admission=2)
+    assert server._admission["/own"].config.max_concurrency == 5
+    assert server._admission["/shared"].config.max_concurrency == 2
+
+    unlimited = BubbleTeaServer()
+    assert list(unlimited._admission) == ["/own"]
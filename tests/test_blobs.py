@@ -0,0 +1,233 @@
+"""
+Pytest tests for the content-addressed blob store
+
+These tests verify that:
+- Uploads are stored under their SHA-256 and re-uploads are deduplicated
+- HEAD tells clients whether a blob is stored
+- Oversized uploads are refused and leave nothing behind
+- Uploads beyond the store's total size are refused with a 507
+- Blobs expire after the TTL and are purged
+- Chat requests reference uploaded images by hash
+- References to unknown blobs are a 422, over HTTP and WebSocket
+"""
+
+import hashlib
+import os
+import time
+
+import httpx
+import pytest
+from starlette.testclient import TestClient
+
+import bubbletea_chat as bt
+from bubbletea_chat import blobs, decorators
+from bubbletea_chat.blobs import (
+    BlobConfig,
+    BlobNotFound,
+    BlobStore,
+    BlobStoreFull,
+    BlobTooLarge,
+)
+from bubbletea_chat.server import BubbleTeaServer
+
+IMAGE = b"\x89PNG\r\n\x1a\n" + b"pixels" * 1000
+SHA = hashlib.sha256(IMAGE).hexdigest()
+
+
+@pytest.fixture(autouse=True)
+def reset_registry():
+    """Give each test a clean chatbot registry and no blob store"""
+    decorators._chatbot_registry.clear()
+    yield
+    decorators._chatbot_registry.clear()
+    blobs.set_blob_store(None)
+
+
+def make_client(server):
+    transport = httpx.ASGITransport(app=server.app)
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_upload_and_deduplicate(tmp_path):
+    """The same bytes are stored once under their hash"""
+    server = BubbleTeaServer(blobs=BlobConfig(directory=str(tmp_path)))
+    headers = {"content-type": "image/png"}
+    async with make_client(server) as client:
+        first = await client.post("/blobs", content=IMAGE, headers=headers)
+        second = await client.post("/blobs", content=IMAGE, headers=headers)
+
+    assert first.json() == {
+        "sha256": SHA,
+        "size": len(IMAGE),
+        "mime_type": "image/png",
+        "deduplicated": False,
+    }
+    assert second.json()["deduplicated"] is True
+    assert (tmp_path / SHA).read_bytes() == IMAGE
+    assert sorted(os.listdir(tmp_path)) == [SHA, SHA + ".type"]
+
+
+@pytest.mark.asyncio
+async def test_head_reports_stored_blobs(tmp_path):
+    """HEAD answers 200 with the size for stored blobs, 404 otherwise"""
+    server = BubbleTeaServer(blobs=BlobConfig(directory=str(tmp_path)))
+    server.blobs.put_bytes(IMAGE, "image/png")
+    async with make_client(server) as client:
+        stored = await client.head(f"/blobs/{SHA}")
+        missing = await client.head(f"/blobs/{'0' * 64}")
+        invalid = await client.head("/blobs/..")
+
+    assert stored.status_code == 200
+    assert stored.headers["content-length"] == str(len(IMAGE))
+    assert stored.headers["content-type"] == "image/png"
+    assert missing.status_code == 404
+    assert invalid.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_oversized_uploads_are_refused(tmp_path):
+    """Uploads over max_bytes get a 413, whether or not they declare a length"""
+    server = BubbleTeaServer(blobs=BlobConfig(directory=str(tmp_path), max_bytes=100))
+
+    async def chunks():
+        for _ in range(10):
+            yield b"x" * 50
+
+    async with make_client(server) as client:
+        declared = await client.post("/blobs", content=IMAGE)
+        streamed = await client.post("/blobs", content=chunks())
+
+    assert declared.status_code == 413
+    assert streamed.status_code == 413
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.asyncio
+async def test_full_store_refuses_uploads(tmp_path):
+    """Uploads beyond max_total_bytes get a 507; expired blobs free space"""
+    config = BlobConfig(directory=str(tmp_path), max_total_bytes=len(IMAGE) + 10)
+    server = BubbleTeaServer(blobs=config)
+    async with make_client(server) as client:
+        stored = await client.post("/blobs", content=IMAGE)
+        again = await client.post("/blobs", content=IMAGE)
+        full = await client.post("/blobs", content=b"other bytes" * 10)
+
+    assert stored.status_code == 200
+    assert again.json()["deduplicated"] is True
+    assert full.status_code == 507
+    assert server.blobs.usage() == len(IMAGE)
+    assert sorted(os.listdir(tmp_path)) == [SHA, SHA + ".type"]
+
+    old = time.time() - 2 * config.ttl
+    os.utime(tmp_path / SHA, (old, old))
+    assert server.blobs.put_bytes(b"other bytes" * 10).size == 110
+    with pytest.raises(BlobStoreFull):
+        server.blobs.put_bytes(IMAGE)
+
+
+def test_blobs_expire_after_ttl(tmp_path):
+    """Expired blobs are no longer found and are purged from disk"""
+    store = BlobStore(BlobConfig(directory=str(tmp_path), ttl=60))
+    info = store.put_bytes(IMAGE, "image/png")
+    assert store.exists(info.sha256)
+
+    old = time.time() - 120
+    os.utime(tmp_path / SHA, (old, old))
+    assert not store.exists(SHA)
+    with pytest.raises(BlobNotFound):
+        store.read(SHA)
+    assert store.purge() == 1
+    assert os.listdir(tmp_path) == []
+
+    with pytest.raises(BlobTooLarge):
+        BlobStore(BlobConfig(directory=str(tmp_path), max_bytes=10)).put_bytes(IMAGE)
+    with pytest.raises(ValueError):
+        store.path("../etc/passwd")
+
+
+@pytest.mark.asyncio
+async def test_chat_requests_reference_blobs(tmp_path):
+    """Bots receive the hash and load the uploaded bytes"""
+
+    @bt.chatbot("vision", stream=False)
+    def vision_bot(message: str, images: list = None):
+        data = bt.load_blob(images[0].blob)
+        return bt.Text(f"{len(data)} bytes")
+
+    server = BubbleTeaServer(blobs=BlobConfig(directory=str(tmp_path)))
+    async with make_client(server) as client:
+        await client.post("/blobs", content=IMAGE)
+        response = await client.post(
+            "/vision", json={"type": "user", "message": "hi", "images": [{"blob": SHA}]}
+        )
+        invalid = await client.post(
+            "/vision", json={"type": "user", "message": "hi", "images": [{"blob": "x"}]}
+        )
+
+    assert response.json() == {
+        "responses": [{"type": "text", "content": f"{len(IMAGE)} bytes"}]
+    }
+    assert invalid.status_code == 422
+    assert server.blobs.data_uri(SHA, "image/png").startswith("data:image/png;base64,")
+    assert await server.blobs.adata_uri(SHA) == server.blobs.data_uri(SHA)
+
+
+def test_commit_survives_concurrent_purge(tmp_path, monkeypatch):
+    """A blob purged between the dedup check and the refresh is stored anew"""
+    store = BlobStore(BlobConfig(directory=str(tmp_path)))
+    # Seen as stored, but gone by the time its expiry is refreshed
+    monkeypatch.setattr(store, "_expired", lambda path, now: False)
+    info = store.put_bytes(IMAGE, "image/png")
+
+    assert info.deduplicated is False
+    assert (tmp_path / SHA).read_bytes() == IMAGE
+
+
+def test_blobs_disabled_by_default():
+    """Without the option no upload route exists"""
+    app = BubbleTeaServer().app
+    assert not any(route.path.startswith("/blobs") for route in app.routes)
+    with pytest.raises(BlobNotFound):
+        bt.load_blob(SHA)
+
+
+@pytest.mark.asyncio
+async def test_unknown_blobs_are_rejected(tmp_path):
+    """Missing or expired hashes get a 422 naming them, not a bot failure"""
+
+    @bt.chatbot("vision", stream=False)
+    def vision_bot(message: str, images: list = None):
+        return bt.Text(str(len(bt.load_blob(images[0].blob))))
+
+    unknown = {"type": "user", "message": "hi", "images": [{"blob": "0" * 64}]}
+    server = BubbleTeaServer(blobs=BlobConfig(directory=str(tmp_path)))
+    async with make_client(server) as client:
+        missing = await client.post("/vision", json=unknown)
+    blobs.set_blob_store(None)
+    async with make_client(BubbleTeaServer()) as client:
+        no_store = await client.post("/vision", json=unknown)
+
+    for response in (missing, no_store):
+        assert response.status_code == 422
+        error = response.json()["detail"][0]
+        assert error["loc"] == ["body", "images", 0, "blob"]
+        assert "0" * 64 in error["msg"]
+
+
+def test_unknown_blobs_are_rejected_over_websocket(tmp_path):
+    """WebSocket turns referencing missing blobs get an invalid_request error"""
+
+    @bt.chatbot("vision-ws")
+    async def vision_bot(message: str, images: list = None):
+        yield bt.Text(str(len(bt.load_blob(images[0].blob))))
+
+    server = BubbleTeaServer(websocket=True, blobs=BlobConfig(directory=str(tmp_path)))
+    data = {"type": "user", "message": "hi", "images": [{"blob": SHA}]}
+    with TestClient(server.app).websocket_connect("/vision-ws/ws") as ws:
+        ws.send_json({"event": "request", "id": "t", "data": data})
+        frame = ws.receive_json()
+
+    assert frame["event"] == "error"
+    assert frame["data"]["code"] == "invalid_request"
+    assert SHA in frame["data"]["description"]
@@ -0,0 +1,126 @@
+"""
+Pytest tests for the bulk Cards builder
+
+These tests verify that:
+- Columns and rows encode to the same bytes as Card models
+- Grids are split into pages of page_size cards
+- Invalid columns are rejected
+- Bots can return the pages, and hooks see rebuilt components
+"""
+
+import httpx
+import pytest
+
+import bubbletea_chat as bt
+from bubbletea_chat import decorators
+from bubbletea_chat.encoders import get_encoder
+from bubbletea_chat.server import BubbleTeaServer
+
+MESSAGE = {"type": "user", "message": "hi"}
+
+
+@pytest.fixture(autouse=True)
+def reset_registry():
+    """Give each test a clean chatbot registry"""
+    decorators._chatbot_registry.clear()
+    yield
+    decorators._chatbot_registry.clear()
+
+
+def make_client(server):
+    """Async client calling the app in-process"""
+    transport = httpx.ASGITransport(app=server.app)
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+def model_grid(orient="wide"):
+    """The grid both builders are compared with"""
+    return bt.Cards(
+        [
+            bt.Card(bt.Image("https://e.com/1.png"), text="One", card_value="1"),
+            bt.Card(
+                bt.Image("https://e.com/ü \"2\".png", alt="Two\n"),
+                markdown=bt.Markdown("**$2**"),
+            ),
+        ],
+        orient=orient,
+    )
+
+
+def test_columns_match_models():
+    """Parallel columns encode exactly like the models"""
+    pages = bt.bulk_cards(
+        ["https://e.com/1.png", "https://e.com/ü \"2\".png"],
+        texts=["One", None],
+        markdowns=[None, "**$2**"],
+        card_values=["1", None],
+        alts=[None, "Two\n"],
+        orient="tall",
+    )
+
+    assert len(pages) == 1
+    assert pages[0].json == (get_encoder("pydantic").dumps(model_grid("tall")),)
+    assert list(pages[0]) == [model_grid("tall")]
+
+
+def test_rows_match_models():
+    """One mapping per card gives the same grid"""
+    pages = bt.bulk_cards_from_rows(
+        row
+        for row in [
+            {"image_url": "https://e.com/1.png", "text": "One", "card_value": "1"},
+            {
+                "image_url": "https://e.com/ü \"2\".png",
+                "alt": "Two\n",
+                "markdown": "**$2**",
+            },
+        ]
+    )
+
+    assert pages[0].json == (get_encoder("pydantic").dumps(model_grid()),)
+
+
+def test_pagination():
+    """Cards are split into grids of page_size, in order"""
+    pages = bt.bulk_cards([f"u{i}" for i in range(5)], page_size=2)
+
+    assert [len(page.components[0].cards) for page in pages] == [2, 2, 1]
+    assert pages[2].components[0].cards[0].image.url == "u4"
+    assert len(bt.bulk_cards([])) == 1
+
+
+@pytest.mark.parametrize(
+    "kwargs, error",
+    [
+        ({"texts": ["only one"]}, ValueError),
+        ({"orient": "square"}, ValueError),
+        ({"page_size": 0}, ValueError),
+        ({"card_values": [1, 2]}, TypeError),
+    ],
+)
+def test_invalid_input(kwargs, error):
+    """Mismatched columns, bad options and non-strings are rejected"""
+    with pytest.raises(error):
+        bt.bulk_cards(["a", "b"], **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_bot_returns_pages():
+    """Every page is sent as its own Cards component"""
+    seen = []
+
+    class Recorder(bt.RequestHooks):
+        def on_component(self, ctx, component):
+            seen.append(len(component.cards))
+
+    @bt.chatbot("shop", stream=False)
+    def shop_bot(message: str):
+        return bt.bulk_cards([f"u{i}" for i in range(3)], page_size=2)
+
+    async with make_client(BubbleTeaServer(hooks=[Recorder()])) as client:
+        response = await client.post("/shop", json=MESSAGE)
+
+    grids = response.json()["responses"]
+    assert [grid["type"] for grid in grids] == ["cards", "cards"]
+    assert [len(grid["cards"]) for grid in grids] == [2, 1]
+    assert seen == [2, 1]
@@ -0,0 +1,137 @@
+"""
+Pytest tests for trusted component construction
+
+These tests verify that:
+- Components built without validation encode to the same JSON bytes
+- They compare equal and keep the same set fields as validated ones
+- Validation errors are only raised while validation is on
+- Non-streaming responses of trusted components serialize unchanged
+- The server only changes the setting when the option is given
+"""
+
+import pytest
+from pydantic import ValidationError
+
+import bubbletea_chat as bt
+from bubbletea_chat import decorators
+from bubbletea_chat.components import component_validation
+from bubbletea_chat.encoders import get_encoder
+from bubbletea_chat.schemas import ComponentChatRequest
+from bubbletea_chat.server import BubbleTeaServer
+
+
+@pytest.fixture(autouse=True)
+def restore_validation():
+    """Each test starts with validation on and leaves it on"""
+    decorators._chatbot_registry.clear()
+    bt.set_component_validation(True)
+    yield
+    bt.set_component_validation(True)
+    decorators._chatbot_registry.clear()
+
+
+def sample_components():
+    """One of every component, with optional fields set and unset"""
+    image = bt.Image("https://example.com/a.png", alt="A")
+    return [
+        bt.Text("Hello 👋 \"quoted\"\nnew line"),
+        bt.Markdown("**bold**"),
+        image,
+        bt.Image("https://example.com/b.png"),
+        bt.Card(image, text="Card", markdown=bt.Markdown("*md*"), card_value="c1"),
+        bt.Card(image),
+        bt.Cards([bt.Card(image, text=str(i)) for i in range(3)], orient="tall"),
+        bt.Pill("Yes", "yes"),
+        bt.Pills([bt.Pill("A"), bt.Pill("B", "b")]),
+        bt.Video("https://example.com/v.mp4"),
+        bt.Block(),
+        bt.Block(timeout=5),
+        bt.Error("Oops", description="Broken", code="E1"),
+        bt.PaymentRequest(5, note="Coffee"),
+        bt.PaymentRequest(2.5),
+        bt.BaseComponent(bt.Text("wrapped"), thread_id="t1"),
+        bt.TextDelta("more", "b1"),
+        bt.MarkdownDelta("**more**", "b2"),
+        bt.BlockSnapshot("all", "b1", format="text"),
+        bt.Done(),
+    ]
+
+
+def test_trusted_components_match_validated():
+    """Same bytes, equality and fields_set in both modes"""
+    dumps = get_encoder("pydantic").dumps
+    validated = sample_components()
+    bt.set_component_validation(False)
+    assert not component_validation()
+    trusted = sample_components()
+
+    for expected, actual in zip(validated, trusted):
+        assert dumps(actual) == dumps(expected)
+        assert actual == expected
+        assert actual.model_fields_set == expected.model_fields_set
+
+
+def test_trusted_lists_are_copied():
+    """Like validation, Cards and Pills don't share the caller's list"""
+    bt.set_component_validation(False)
+    pills = [bt.Pill("A")]
+    group = bt.Pills(pills)
+    pills.append(bt.Pill("B"))
+
+    assert len(group.pills) == 1
+
+
+def test_validation_errors_only_when_enabled():
+    """Wrong types raise while validating and are trusted otherwise"""
+    with pytest.raises(ValidationError):
+        bt.Text(123)
+
+    bt.set_component_validation(False)
+    assert bt.Text(123).content == 123
+
+
+def test_trusted_components_can_be_modified():
+    """Assignment and model_copy work on trusted components"""
+    bt.set_component_validation(False)
+    text = bt.Text("a")
+    text.content = "b"
+    copy = text.model_copy(update={"content": "c"})
+
+    assert text.model_dump() == {"type": "text", "content": "b"}
+    assert copy.content == "c"
+
+
+@pytest.mark.asyncio
+async def test_non_streaming_response_unchanged():
+    """The response wrapper skips re-validation and encodes the same"""
+
+    @bt.chatbot("grid", stream=False)
+    def grid_bot(message: str):
+        image = bt.Image("https://example.com/a.png")
+        return [bt.Text(message), bt.Cards([bt.Card(image, text="x")])]
+
+    request = ComponentChatRequest(type="user", message="hi")
+    dumps = get_encoder("pydantic").dumps
+    expected = dumps(await grid_bot.handle_request(request))
+    bt.set_component_validation(False)
+    actual = dumps(await grid_bot.handle_request(request))
+
+    assert actual == expected
+
+
+def test_server_option():
+    """validate_components=False switches validation off for the process"""
+    server = BubbleTeaServer(validate_components=False)
+
+    assert not component_validation()
+    assert server._options["validate_components"] is False
+
+
+def test_server_keeps_setting_by_default():
+    """set_component_validation() before starting the server is kept"""
+    bt.set_component_validation(False)
+    BubbleTeaServer()
+
+    assert not component_validation()
+    BubbleTeaServer(validate_components=True)
+    assert component_validation()
@@ -0,0 +1,139 @@
+"""
+Pytest tests for cached, ETag-aware config endpoints
+
+These tests verify that:
+- Config functions run once and later requests are served from cache
+- Responses carry an ETag and If-None-Match is answered with 304
+- TTL expiry and explicit invalidation rebuild the config
+"""
+
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+import bubbletea_chat as bt
+from bubbletea_chat import decorators
+from bubbletea_chat.config_cache import ConfigCache, etag_matches
+from bubbletea_chat.server import BubbleTeaServer
+
+
+@pytest.fixture(autouse=True)
+def reset_state():
+    """Give each test a clean chatbot and config registry"""
+    decorators._chatbot_registry.clear()
+    decorators._bot_config_registry.clear()
+    decorators._config_caches.clear()
+    decorators._config_function = None
+    yield
+    decorators._chatbot_registry.clear()
+    decorators._bot_config_registry.clear()
+    decorators._config_caches.clear()
+    decorators._config_function = None
+
+
+def make_bot(ttl=None):
+    """Register a bot whose config counts how often it is built"""
+    calls = []
+
+    @bt.chatbot("cached-bot")
+    def cached_bot(message: str):
+        return bt.Text(message)
+
+    @cached_bot.config(ttl=ttl)
+    def get_config():
+        calls.append(1)
+        return {"name": "cached-bot", "url": "http://localhost", "is_streaming": False}
+
+    return cached_bot, calls
+
+
+def test_config_built_once():
+    """Repeated GETs reuse the serialized config"""
+    bot, calls = make_bot()
+    with TestClient(BubbleTeaServer().app) as client:
+        first = client.get("/cached-bot/config")
+        second = client.get("/cached-bot/config")
+
+    assert first.status_code == second.status_code == 200
+    assert first.json()["name"] == "cached-bot"
+    assert first.content == second.content
+    assert len(calls) == 1
+
+
+def test_if_none_match_returns_304():
+    """A matching ETag is answered with an empty 304"""
+    make_bot()
+    with TestClient(BubbleTeaServer().app) as client:
+        etag = client.get("/cached-bot/config").headers["etag"]
+        response = client.get("/cached-bot/config", headers={"If-None-Match": etag})
+        stale = client.get("/cached-bot/config", headers={"If-None-Match": '"old"'})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert stale.status_code == 200
+
+
+def test_invalidate_rebuilds_config():
+    """invalidate_config() forces the next request to call the function"""
+    bot, calls = make_bot()
+    with TestClient(BubbleTeaServer().app) as client:
+        client.get("/cached-bot/config")
+        bot.invalidate_config()
+        client.get("/cached-bot/config")
+        bt.invalidate_config()
+        client.get("/cached-bot/config")
+
+    assert len(calls) == 3
+
+
+def test_ttl_expiry_rebuilds_config():
+    """Configs older than ttl are rebuilt"""
+    bot, calls = make_bot(ttl=0.05)
+    with TestClient(BubbleTeaServer().app) as client:
+        client.get("/cached-bot/config")
+        client.get("/cached-bot/config")
+        time.sleep(0.06)
+        client.get("/cached-bot/config")
+
+    assert len(calls) == 2
+
+
+def test_global_config_is_cached():
+    """The legacy global @config endpoint is cached too"""
+    calls = []
+
+    @bt.config
+    def get_config():
+        calls.append(1)
+        return bt.BotConfig(name="global-bot", url="http://localhost", is_streaming=True)
+
+    with TestClient(BubbleTeaServer().app) as client:
+        first = client.get("/config")
+        second = client.get("/config", headers={"If-None-Match": first.headers["etag"]})
+
+    assert first.json()["is_streaming"] is True
+    assert second.status_code == 304
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_async_config_function():
+    """Async config functions are awaited and cached"""
+
+    async def get_config():
+        return bt.BotConfig(name="async-bot", url="http://localhost", is_streaming=False)
+
+    cache = ConfigCache(get_config)
+    body, etag = await cache.get()
+    assert b'"name":"async-bot"' in body
+    assert await cache.get() == (body, etag)
+
+
+def test_etag_matching():
+    """If-None-Match handles lists, weak tags and wildcards"""
+    assert etag_matches('"a", "b"', '"b"')
+    assert etag_matches('W/"b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches(None, '"b"')
+    assert not etag_matches('"a"', '"b"')
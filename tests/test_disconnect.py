@@ -0,0 +1,172 @@
+"""
+Pytest tests for client disconnect handling
+
+These tests verify that:
+- A streaming bot is cancelled when the client disconnects mid-stream
+- A non-streaming bot is cancelled while it is still working
+- Cancelled requests are counted in /metrics and release admission slots
+- The watcher only cancels the awaits it guards
+"""
+
+import asyncio
+import json
+
+import pytest
+import bubbletea_chat as bt
+from bubbletea_chat import decorators
+from bubbletea_chat.disconnect import ClientDisconnected, DisconnectWatcher
+from bubbletea_chat.server import BubbleTeaServer
+
+
+@pytest.fixture(autouse=True)
+def reset_registry():
+    """Give each test a clean chatbot registry"""
+    decorators._chatbot_registry.clear()
+    yield
+    decorators._chatbot_registry.clear()
+
+
+async def call(app, path, disconnect, spec_version="2.3"):
+    """
+    Post a chat message to the app and disconnect when told to.
+
+    Returns the ASGI messages the app sent.
+    """
+    body = json.dumps({"type": "user", "message": "hi"}).encode()
+    sent = []
+    delivered = False
+
+    async def receive():
+        nonlocal delivered
+        if not delivered:
+            delivered = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": spec_version},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json")],
+        "client": ("test", 1),
+        "server": ("test", 80),
+    }
+    await asyncio.wait_for(app(scope, receive, send), 5)
+    return sent
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("spec_version", ["2.3", "2.4"])
+async def test_streaming_bot_cancelled_on_disconnect(spec_version):
+    """The bot generator is closed while waiting for its next chunk"""
+    waiting = asyncio.Event()
+    disconnect = asyncio.Event()
+    closed = []
+
+    @bt.chatbot("stream")
+    async def stream_bot(message: str):
+        try:
+            yield bt.Text("first")
+            waiting.set()
+            await asyncio.sleep(60)
+            yield bt.Text("never")
+        finally:
+            closed.append(True)
+
+    server = BubbleTeaServer(metrics=True, admission=1)
+    task = asyncio.create_task(
+        call(server.app, "/stream", disconnect, spec_version)
+    )
+    await waiting.wait()
+    disconnect.set()
+    sent = await task
+
+    assert closed == [True]
+    body = b"".join(m.get("body", b"") for m in sent)
+    assert b"first" in body
+    assert b"never" not in body
+    assert server._admission["/stream"].active == 0
+    stats = server.metrics.bot("/stream")
+    assert stats.cancelled == 1
+    assert stats.errors == 0
+    assert stats.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_non_streaming_bot_cancelled_on_disconnect():
+    """An async bot awaiting a slow call is cancelled"""
+    waiting = asyncio.Event()
+    disconnect = asyncio.Event()
+    cancelled = []
+
+    @bt.chatbot("slow", stream=False)
+    async def slow_bot(message: str):
+        waiting.set()
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return bt.Text("late")
+
+    server = BubbleTeaServer(metrics=True)
+    task = asyncio.create_task(call(server.app, "/slow", disconnect))
+    await waiting.wait()
+    disconnect.set()
+    sent = await task
+
+    assert cancelled == [True]
+    assert sent[0]["status"] == 499
+    stats = server.metrics.bot("/slow")
+    assert stats.cancelled == 1
+    assert stats.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_completed_stream_not_counted_as_cancelled():
+    """Streams that finish normally are not cancelled"""
+    disconnect = asyncio.Event()
+
+    @bt.chatbot("quick")
+    async def quick_bot(message: str):
+        yield bt.Text("a")
+        yield bt.Text("b")
+
+    server = BubbleTeaServer(metrics=True)
+    sent = await call(server.app, "/quick", disconnect)
+
+    body = b"".join(m.get("body", b"") for m in sent)
+    assert body.endswith(server.encoder.done_frame)
+    assert server.metrics.bot("/quick").cancelled == 0
+    assert "bubbletea_requests_cancelled_total" in server.metrics.render()
+
+
+@pytest.mark.asyncio
+async def test_watcher_ignores_unguarded_awaits():
+    """A disconnect outside guard() only sets the flag"""
+    disconnect = asyncio.Event()
+
+    async def receive():
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    watcher = DisconnectWatcher(receive)
+    watcher.start()
+    try:
+        disconnect.set()
+        await asyncio.sleep(0.01)
+        assert watcher.disconnected
+        with pytest.raises(ClientDisconnected):
+            await watcher.guard(asyncio.sleep(0))
+    finally:
+        watcher.stop()
@@ -0,0 +1,163 @@
+"""
+Pytest tests for graceful draining
+
+These tests verify that:
+- While draining, new chat requests and /health get 503 with Retry-After
+- In-flight streams finish during the drain
+- Requests cancelled at the deadline are reported as abandoned
+- Background jobs get the drain timeout to finish, unfinished ones are reported
+"""
+
+import asyncio
+
+import httpx
+import pytest
+import bubbletea_chat as bt
+from bubbletea_chat import decorators, jobs
+from bubbletea_chat.drain import begin_drain
+from bubbletea_chat.server import BubbleTeaServer
+
+MESSAGE = {"type": "user", "message": "hi"}
+
+
+@pytest.fixture(autouse=True)
+def reset_registry():
+    """Give each test a clean chatbot registry"""
+    decorators._chatbot_registry.clear()
+    yield
+    decorators._chatbot_registry.clear()
+
+
+def make_client(server):
+    """Async client calling the app in-process"""
+    transport = httpx.ASGITransport(app=server.app)
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_draining_rejects_new_requests():
+    """New work is turned away so load balancers retry elsewhere"""
+
+    @bt.chatbot("stream")
+    async def stream_bot(message: str):
+        yield bt.Text(message)
+
+    @bt.chatbot("list", stream=False)
+    def list_bot(message: str):
+        return bt.Text(message)
+
+    server = BubbleTeaServer()
+    server.drain.start()
+    async with make_client(server) as client:
+        streamed = await client.post("/stream", json=MESSAGE)
+        listed = await client.post("/list", json=MESSAGE)
+        health = await client.get("/health")
+
+    assert streamed.status_code == listed.status_code == health.status_code == 503
+    assert streamed.headers["retry-after"] == "1"
+    assert b'"code":"draining"' in streamed.content
+    assert listed.json() == {"detail": "Server is shutting down"}
+    assert health.json() == {"status": "draining", "in_flight": 0}
+
+
+@pytest.mark.asyncio
+async def test_in_flight_stream_finishes(capsys):
+    """A stream started before the drain runs to completion"""
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    @bt.chatbot("slow")
+    async def slow_bot(message: str):
+        yield bt.Text("one")
+        started.set()
+        await release.wait()
+        yield bt.Text("two")
+
+    server = BubbleTeaServer(drain_timeout=5)
+    app = server.app
+    async with app.router.lifespan_context(app):
+        async with make_client(server) as client:
+            pending = asyncio.create_task(client.post("/slow", json=MESSAGE))
+            await started.wait()
+            begin_drain()
+            assert server.drain.in_flight == 1
+            rejected = await client.post("/slow", json=MESSAGE)
+            release.set()
+            response = await pending
+
+    assert rejected.status_code == 503
+    assert b"two" in response.content
+    assert server.drain.report() == {
+        "finished": 1,
+        "abandoned": {},
+        "still_running": 0,
+        "jobs_abandoned": 0,
+    }
+    assert "Drained 1 request(s)" in capsys.readouterr().out
+
+
+@pytest.mark.asyncio
+async def test_cancelled_requests_are_reported(capsys):
+    """Work cut off at the deadline shows up in the drain report"""
+    started = asyncio.Event()
+
+    @bt.chatbot("stuck", stream=False)
+    async def stuck_bot(message: str):
+        started.set()
+        await asyncio.sleep(60)
+
+    server = BubbleTeaServer(drain_timeout=0.05)
+    app = server.app
+    async with app.router.lifespan_context(app):
+        async with make_client(server) as client:
+            pending = asyncio.create_task(client.post("/stuck", json=MESSAGE))
+            await started.wait()
+            begin_drain()
+            # What the ASGI server does once the deadline passed
+            pending.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await pending
+
+    assert server.drain.abandoned == {"/stuck": 1}
+    assert "abandoned" in capsys.readouterr().out
+
+
+@pytest.mark.asyncio
+async def test_background_jobs_are_drained(monkeypatch):
+    """Queued jobs finish during the drain instead of being dropped"""
+    monkeypatch.setattr(jobs, "_runner", None)
+    runner = bt.configure_background(workers=1)
+    done = []
+
+    async def deliver(n):
+        await asyncio.sleep(0.02)
+        done.append(n)
+
+    server = BubbleTeaServer(drain_timeout=5)
+    app = server.app
+    async with app.router.lifespan_context(app):
+        for n in range(3):
+            bt.background(deliver, n)
+
+    assert done == [0, 1, 2]
+    assert runner.stats()["completed"] == 3
+
+
+@pytest.mark.asyncio
+async def test_unfinished_jobs_are_reported(monkeypatch, capsys):
+    """Jobs cut off by the drain timeout are counted as abandoned"""
+    monkeypatch.setattr(jobs, "_runner", None)
+    runner = bt.configure_background(workers=1)
+
+    async def slow(n):
+        await asyncio.sleep(5)
+
+    server = BubbleTeaServer(drain_timeout=0.1)
+    app = server.app
+    async with app.router.lifespan_context(app):
+        for n in range(3):
+            bt.background(slow, n)
+        await asyncio.sleep(0.02)
+
+    assert runner.abandoned == 3
+    assert "'jobs_abandoned': 3" in capsys.readouterr().out
@@ -0,0 +1,183 @@
+"""
+Pytest tests for the pluggable SSE encoders
+
+These tests verify that:
+- Every backend produces the same JSON as pydantic's model_dump_json
+- Frames are complete SSE byte frames with a constant Done frame
+- The server streams byte frames with the configured encoder
+- Raw str chunks are sent exactly like Text components
+"""
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+import bubbletea_chat as bt
+from bubbletea_chat import decorators
+from bubbletea_chat.encoders import (
+    DONE_FRAME,
+    PydanticEncoder,
+    SSEEncoder,
+    get_encoder,
+)
+from bubbletea_chat.server import BubbleTeaServer
+
+
+def available_backends():
+    """Encoder names whose packages are installed"""
+    names = []
+    for name in ("pydantic", "orjson", "msgspec"):
+        try:
+            get_encoder(name)
+            names.append(name)
+        except ImportError:
+            pass
+    return names
+
+
+def sample_components():
+    """A mix of simple and nested components"""
+    return [
+        bt.Text("Hello 👋 \"quoted\"\nnew line"),
+        bt.Markdown("**bold**"),
+        bt.Cards(
+            [
+                bt.Card(
+                    image=bt.Image("https://example.com/a.png", alt="A"),
+                    text="Card A",
+                    markdown=bt.Markdown("*a*"),
+                    card_value="a",
+                )
+            ],
+            orient="tall",
+        ),
+        bt.Pills([bt.Pill("Yes", "yes"), bt.Pill("No")]),
+        bt.PaymentRequest(amount=4.5, note="tip"),
+    ]
+
+
+@pytest.fixture(autouse=True)
+def reset_registry():
+    """Give each test a clean chatbot registry"""
+    decorators._chatbot_registry.clear()
+    yield
+    decorators._chatbot_registry.clear()
+
+
+@pytest.mark.parametrize("name", available_backends())
+def test_backends_match_pydantic_json(name):
+    """All backends serialize components exactly like model_dump_json"""
+    encoder = get_encoder(name)
+    for component in sample_components():
+        assert encoder.dumps(component) == component.model_dump_json().encode()
+        assert encoder.frame(component) == (
+            f"data: {component.model_dump_json()}\n\n".encode()
+        )
+
+
+def test_done_frame_is_pre_encoded():
+    """The Done frame is built once and shared"""
+    assert DONE_FRAME == b'data: {"type":"done"}\n\n'
+    assert PydanticEncoder().done_frame == DONE_FRAME
+
+
+def test_get_encoder_resolution():
+    """Encoders resolve by name and instances pass through"""
+    encoder = PydanticEncoder()
+    assert get_encoder(encoder) is encoder
+    assert isinstance(get_encoder(), SSEEncoder)
+    with pytest.raises(ValueError):
+        get_encoder("pickle")
+
+
+@pytest.mark.parametrize("name", available_backends())
+def test_server_streams_byte_frames(name):
+    """Streaming responses carry one encoded frame per component"""
+
+    @bt.chatbot("encoded-stream")
+    async def stream_bot(message: str):
+        for component in sample_components():
+            yield component
+
+    server = BubbleTeaServer(stream_bot, encoder=name, register_all=False)
+    with TestClient(server.app) as client:
+        response = client.post("/encoded-stream", json={"type": "user", "message": "hi"})
+
+    frames = [f for f in response.content.split(b"\n\n") if f]
+    expected = [c.model_dump(mode="json") for c in sample_components()]
+    assert [json.loads(f[len(b"data: "):]) for f in frames[:-1]] == expected
+    assert frames[-1] + b"\n\n" == DONE_FRAME
+
+
+def test_server_non_streaming_response_bytes():
+    """Non-streaming responses are serialized by the encoder"""
+
+    @bt.chatbot("encoded-list", stream=False)
+    def list_bot(message: str):
+        return sample_components()
+
+    server = BubbleTeaServer(list_bot, register_all=False)
+    with TestClient(server.app) as client:
+        response = client.post("/encoded-list", json={"type": "user", "message": "hi"})
+
+    assert response.headers["content-type"] == "application/json"
+    expected = [c.model_dump(mode="json") for c in sample_components()]
+    assert response.json() == {"responses": expected}
+
+
+@pytest.mark.parametrize("name", available_backends())
+def test_text_template_matches_text_component(name):
+    """Raw strings encode to the same bytes as a Text component"""
+    encoder = get_encoder(name)
+    for content in ("", "plain", 'Hello 👋 "quoted"\nnew line\t\\ </script>'):
+        assert encoder.text(content) == encoder.dumps(bt.Text(content))
+        assert encoder.text_frame(content) == encoder.frame(bt.Text(content))
+
+
+def test_server_streams_raw_strings():
+    """Yielded strings produce the same stream as yielded Text components"""
+
+    @bt.chatbot("str-stream")
+    async def str_bot(message: str):
+        for word in ["Hello", ", ", "wörld", "\n"]:
+            yield word
+
+    @bt.chatbot("text-stream")
+    async def text_bot(message: str):
+        for word in ["Hello", ", ", "wörld", "\n"]:
+            yield bt.Text(word)
+
+    server = BubbleTeaServer()
+    with TestClient(server.app) as client:
+        raw = client.post("/str-stream", json={"type": "user", "message": "hi"})
+        text = client.post("/text-stream", json={"type": "user", "message": "hi"})
+
+    assert raw.content == text.content
+
+
+def test_returned_async_iterators_are_streamed():
+    """A function may return a chunk stream instead of being a generator"""
+
+    async def chunks():
+        yield "a"
+        yield "b"
+
+    @bt.chatbot("returned", stream=True)
+    async def returned_bot(message: str):
+        return chunks()
+
+    @bt.chatbot("collected", stream=False)
+    def collected_bot(message: str):
+        return "single"
+
+    server = BubbleTeaServer()
+    with TestClient(server.app) as client:
+        streamed = client.post("/returned", json={"type": "user", "message": "hi"})
+        collected = client.post("/collected", json={"type": "user", "message": "hi"})
+
+    frames = [f for f in streamed.content.split(b"\n\n") if f]
+    assert frames[:-1] == [
+        b'data: {"type":"text","content":"a"}',
+        b'data: {"type":"text","content":"b"}',
+    ]
+    assert collected.json() == {"responses": [{"type": "text", "content": "single"}]}
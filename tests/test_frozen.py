@@ -0,0 +1,140 @@
+"""
+Pytest tests for frozen components
+
+These tests verify that:
+- Frozen components encode to the same bytes as the originals
+- Streaming and non-streaming bots send them unchanged, alone or mixed
+- Hooks and metrics see the components inside
+- Only components can be frozen
+"""
+
+import httpx
+import pytest
+from pydantic import ValidationError
+
+import bubbletea_chat as bt
+from bubbletea_chat import decorators
+from bubbletea_chat.encoders import get_encoder
+from bubbletea_chat.server import BubbleTeaServer
+
+MESSAGE = {"type": "user", "message": "hi"}
+
+
+@pytest.fixture(autouse=True)
+def reset_registry():
+    """Give each test a clean chatbot registry"""
+    decorators._chatbot_registry.clear()
+    yield
+    decorators._chatbot_registry.clear()
+
+
+def make_client(server):
+    """Async client calling the app in-process"""
+    transport = httpx.ASGITransport(app=server.app)
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+def menu():
+    """A small static menu"""
+    return [
+        bt.Markdown("**Pick one**"),
+        bt.Pills([bt.Pill("Drama", "genre:drama"), bt.Pill("Comedy")]),
+    ]
+
+
+def test_frozen_bytes_match_encoder():
+    """Cached JSON and frames equal what the encoder writes"""
+    encoder = get_encoder("pydantic")
+    frozen = bt.frozen(menu())
+
+    assert frozen.json == tuple(encoder.dumps(c) for c in menu())
+    assert frozen.frames == b"".join(encoder.frame(c) for c in menu())
+    assert list(frozen) == menu()
+    assert len(bt.frozen(bt.Text("one"))) == 1
+
+
+def test_nested_frozen_is_flattened():
+    """Freezing a list that holds frozen components flattens it"""
+    inner = bt.frozen(bt.Text("a"))
+    outer = bt.frozen([inner, bt.Text("b")])
+
+    assert [c.content for c in outer] == ["a", "b"]
+
+
+def test_only_components_can_be_frozen():
+    """Anything else is rejected at declaration"""
+    with pytest.raises(ValidationError):
+        bt.frozen(["not a component"])
+
+
+@pytest.mark.asyncio
+async def test_non_streaming_bodies_unchanged():
+    """Alone, mixed and absent, the JSON body is the same as unfrozen"""
+    frozen = bt.frozen(menu())
+
+    @bt.chatbot("alone", stream=False)
+    def alone_bot(message: str):
+        return frozen
+
+    @bt.chatbot("mixed", stream=False)
+    def mixed_bot(message: str):
+        return [bt.Text(message), frozen, bt.Text("end")]
+
+    @bt.chatbot("plain", stream=False)
+    def plain_bot(message: str):
+        return [bt.Text(message)] + menu() + [bt.Text("end")]
+
+    async with make_client(BubbleTeaServer()) as client:
+        alone = await client.post("/alone", json=MESSAGE)
+        mixed = await client.post("/mixed", json=MESSAGE)
+        plain = await client.post("/plain", json=MESSAGE)
+
+    assert alone.content == frozen.body
+    assert alone.json() == {"responses": [c.model_dump() for c in menu()]}
+    assert mixed.content == plain.content
+
+
+@pytest.mark.asyncio
+async def test_streaming_frames_unchanged():
+    """A yielded frozen list streams as one frame per component"""
+    frozen = bt.frozen(menu())
+
+    @bt.chatbot("frozen")
+    async def frozen_bot(message: str):
+        yield bt.Text(message)
+        yield frozen
+
+    @bt.chatbot("plain")
+    async def plain_bot(message: str):
+        yield bt.Text(message)
+        for component in menu():
+            yield component
+
+    async with make_client(BubbleTeaServer()) as client:
+        streamed = await client.post("/frozen", json=MESSAGE)
+        plain = await client.post("/plain", json=MESSAGE)
+
+    assert streamed.content == plain.content
+
+
+@pytest.mark.asyncio
+async def test_hooks_and_metrics_count_contents():
+    """Hooks get each component and metrics count them all"""
+    seen = []
+
+    class Recorder(bt.RequestHooks):
+        def on_component(self, ctx, component):
+            seen.append(component.type)
+
+    frozen = bt.frozen(menu())
+
+    @bt.chatbot("menu")
+    async def menu_bot(message: str):
+        yield frozen
+
+    server = BubbleTeaServer(hooks=[Recorder()], metrics=True)
+    async with make_client(server) as client:
+        await client.post("/menu", json=MESSAGE)
+
+    assert seen == ["markdown", "pills"]
+    assert server.metrics.bot("/menu").components == 2
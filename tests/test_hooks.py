@@ -0,0 +1,173 @@
+"""
+Pytest tests for request lifecycle hooks and Server-Timing
+
+These tests verify that:
+- Hooks fire in order for list and streaming bots
+- on_error receives exceptions raised by the bot
+- Exceptions raised by hooks don't fail the request
+- server_timing adds a Server-Timing header, and a trailing event to streams
+- Without hooks or server_timing no context is built
+"""
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+import bubbletea_chat as bt
+from bubbletea_chat import decorators
+from bubbletea_chat.hooks import TIMING_EVENT
+from bubbletea_chat.server import BubbleTeaServer
+
+
+@pytest.fixture(autouse=True)
+def reset_registry():
+    """Give each test a clean chatbot registry"""
+    decorators._chatbot_registry.clear()
+    yield
+    decorators._chatbot_registry.clear()
+
+
+class Recorder(bt.RequestHooks):
+    """Hook remembering every event it saw"""
+
+    def __init__(self):
+        self.events = []
+        self.contexts = []
+
+    def on_request_start(self, ctx):
+        self.events.append("start")
+        self.contexts.append(ctx)
+
+    def on_first_component(self, ctx, component):
+        self.events.append("first")
+
+    def on_component(self, ctx, component):
+        self.events.append(f"component:{component.content}")
+
+    def on_complete(self, ctx):
+        self.events.append("complete")
+
+    def on_error(self, ctx, error):
+        self.events.append(f"error:{error}")
+
+
+def post(client, path, message="hi"):
+    """Send a chat message"""
+    return client.post(path, json={"type": "user", "message": message})
+
+
+def test_hooks_for_list_responses():
+    """Every component is reported between start and complete"""
+
+    @bt.chatbot("list", stream=False)
+    def list_bot(message: str):
+        return [bt.Text("a"), bt.Text("b")]
+
+    recorder = Recorder()
+    with TestClient(BubbleTeaServer(hooks=[recorder]).app) as client:
+        response = post(client, "/list")
+
+    assert response.status_code == 200
+    assert "server-timing" not in response.headers
+    assert recorder.events == ["start", "first", "component:a", "component:b", "complete"]
+    ctx = recorder.contexts[0]
+    assert ctx.bot == "/list"
+    assert ctx.request.message == "hi"
+    assert ctx.components == 2
+    assert {"parse", "bot", "serialize", "total"} <= set(ctx.timings)
+
+
+def test_hooks_for_streams():
+    """Streamed components are reported as they are encoded"""
+
+    @bt.chatbot("stream")
+    async def stream_bot(message: str):
+        yield bt.Text("a")
+        yield bt.Text("b")
+
+    recorder = Recorder()
+    with TestClient(BubbleTeaServer(hooks=[recorder]).app) as client:
+        response = post(client, "/stream")
+
+    assert TIMING_EVENT.encode() not in response.content
+    assert recorder.events == ["start", "first", "component:a", "component:b", "complete"]
+    timings = recorder.contexts[0].timings
+    assert {"parse", "first_component", "bot", "encode", "total"} <= set(timings)
+
+
+def test_on_error():
+    """Exceptions from the bot reach on_error"""
+
+    @bt.chatbot("broken")
+    async def broken_bot(message: str):
+        yield bt.Text("a")
+        raise RuntimeError("boom")
+
+    recorder = Recorder()
+    server = BubbleTeaServer(hooks=[recorder])
+    with TestClient(server.app, raise_server_exceptions=False) as client:
+        post(client, "/broken")
+
+    assert recorder.events == ["start", "first", "component:a", "error:boom"]
+
+
+def test_failing_hook_does_not_break_request(capsys):
+    """A hook raising is printed and later hooks still run"""
+
+    class Failing(bt.RequestHooks):
+        def on_request_start(self, ctx):
+            raise ValueError("bad hook")
+
+    @bt.chatbot("echo", stream=False)
+    def echo_bot(message: str):
+        return bt.Text(message)
+
+    recorder = Recorder()
+    with TestClient(BubbleTeaServer(hooks=[Failing(), recorder]).app) as client:
+        response = post(client, "/echo")
+
+    assert response.json()["responses"][0]["content"] == "hi"
+    assert recorder.events[0] == "start"
+    assert "Error in Failing.on_request_start: bad hook" in capsys.readouterr().out
+
+
+def test_server_timing_header():
+    """List responses report their phases in milliseconds"""
+
+    @bt.chatbot("timed", stream=False)
+    def timed_bot(message: str):
+        return bt.Text(message)
+
+    with TestClient(BubbleTeaServer(server_timing=True).app) as client:
+        response = post(client, "/timed")
+
+    entries = response.headers["server-timing"].split(", ")
+    phases = [entry.split(";")[0] for entry in entries]
+    assert phases == ["parse", "bot", "serialize", "total"]
+    assert all(";dur=" in entry for entry in entries)
+
+
+def test_server_timing_event_for_streams():
+    """Streams end with a timing event just before done"""
+
+    @bt.chatbot("timed")
+    async def timed_bot(message: str):
+        yield bt.Text(message)
+
+    with TestClient(BubbleTeaServer(server_timing=True).app) as client:
+        response = post(client, "/timed")
+
+    assert response.headers["server-timing"].startswith("parse;dur=")
+    frames = response.content.decode().strip().split("\n\n")
+    assert frames[-1] == 'data: {"type":"done"}'
+    event, data = frames[-2].split("\n")
+    assert event == f"event: {TIMING_EVENT}"
+    assert {"parse", "bot", "encode", "total"} <= set(json.loads(data[len("data: "):]))
+
+
+def test_disabled_by_default():
+    """Without hooks or server_timing requests carry no context"""
+    server = BubbleTeaServer()
+    assert not server._trace
+    assert BubbleTeaServer(server_timing=True)._trace
+    assert BubbleTeaServer(hooks=[Recorder()])._trace
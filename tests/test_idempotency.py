@@ -0,0 +1,332 @@
+"""
+Pytest tests for idempotent request deduplication
+
+These tests verify that:
+- Duplicates with the same Idempotency-Key share one bot run
+- Header keys are scoped to the user and conversation, and a changed
+  body under the same key is a 422
+- In-flight duplicates follow a stream live, late ones get it replayed
+- Without the header, requests are only deduplicated when key_by_message
+  is enabled, and then conversation_uuid plus message identify duplicates
+- Responses over max_bytes reach live followers but aren't replayed
+- Failed runs are not replayed, so retries run the bot again
+- The shared run is cancelled once every requester has disconnected
+- The cache honours its TTL and size bound
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi.responses import Response
+import bubbletea_chat as bt
+from bubbletea_chat import decorators
+from bubbletea_chat.idempotency import IdempotencyCache, IdempotencyConfig
+from bubbletea_chat.schemas import LazyChatRequest
+from bubbletea_chat.server import BubbleTeaServer
+
+MESSAGE = {"type": "user", "message": "hi", "conversation_uuid": "conv-1"}
+BY_MESSAGE = IdempotencyConfig(key_by_message=True)
+
+
+@pytest.fixture(autouse=True)
+def reset_registry():
+    """Give each test a clean chatbot registry"""
+    decorators._chatbot_registry.clear()
+    yield
+    decorators._chatbot_registry.clear()
+
+
+def make_client(server):
+    """Async client calling the app in-process"""
+    transport = httpx.ASGITransport(app=server.app, raise_app_exceptions=False)
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_duplicates_share_one_run():
+    """Concurrent and late duplicates get the first run's response"""
+    calls = []
+    release = asyncio.Event()
+
+    @bt.chatbot("once", stream=False)
+    async def once_bot(message: str):
+        calls.append(message)
+        await release.wait()
+        return bt.Text(f"answer {len(calls)}")
+
+    server = BubbleTeaServer(idempotency=True, metrics=True)
+    headers = {"Idempotency-Key": "abc"}
+    async with make_client(server) as client:
+        first = asyncio.create_task(client.post("/once", json=MESSAGE, headers=headers))
+        second = asyncio.create_task(client.post("/once", json=MESSAGE, headers=headers))
+        await asyncio.sleep(0.05)
+        release.set()
+        first, second = await first, await second
+        late = await client.post("/once", json=MESSAGE, headers=headers)
+        other = await client.post("/once", json=MESSAGE, headers={"Idempotency-Key": "xyz"})
+
+    assert calls == ["hi", "hi"]
+    assert first.json() == second.json() == late.json()
+    assert first.json()["responses"][0]["content"] == "answer 1"
+    assert other.json()["responses"][0]["content"] == "answer 2"
+    replayed = [r.headers.get("idempotent-replayed") for r in (first, second, late)]
+    assert sorted(replayed, key=str) == [None, "true", "true"]
+    assert server.metrics.bot("/once").deduplicated == 2
+
+
+@pytest.mark.asyncio
+async def test_header_keys_are_scoped_and_checked():
+    """Other users don't share a key, and a changed body is refused"""
+    calls = []
+
+    @bt.chatbot("scoped", stream=False)
+    async def scoped_bot(message: str, user_uuid: str = None):
+        calls.append(user_uuid)
+        return bt.Text(f"for {user_uuid}")
+
+    server = BubbleTeaServer(idempotency=True)
+    headers = {"Idempotency-Key": "abc"}
+    alice = {**MESSAGE, "user_uuid": "alice"}
+    async with make_client(server) as client:
+        first = await client.post("/scoped", json=alice, headers=headers)
+        retried = await client.post("/scoped", json=alice, headers=headers)
+        mallory = await client.post(
+            "/scoped", json={**MESSAGE, "user_uuid": "mallory"}, headers=headers
+        )
+        changed = await client.post(
+            "/scoped", json={**alice, "message": "bye"}, headers=headers
+        )
+
+    assert calls == ["alice", "mallory"]
+    assert retried.json() == first.json()
+    assert mallory.json()["responses"][0]["content"] == "for mallory"
+    assert changed.status_code == 422
+    assert "Idempotency-Key" in changed.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_streaming_duplicate_follows_live():
+    """A duplicate joining mid-stream receives the whole stream"""
+    calls = []
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    @bt.chatbot("stream")
+    async def stream_bot(message: str):
+        calls.append(message)
+        yield bt.Text("one")
+        started.set()
+        await release.wait()
+        yield bt.Text("two")
+
+    server = BubbleTeaServer(idempotency=BY_MESSAGE)
+    async with make_client(server) as client:
+        first = asyncio.create_task(client.post("/stream", json=MESSAGE))
+        await started.wait()
+        second = asyncio.create_task(client.post("/stream", json=MESSAGE))
+        await asyncio.sleep(0.05)
+        release.set()
+        first, second = await first, await second
+        late = await client.post("/stream", json=MESSAGE)
+
+    assert len(calls) == 1
+    assert first.status_code == second.status_code == 200
+    assert first.content == second.content == late.content
+    assert b"one" in first.content and b"two" in first.content
+    assert first.headers["content-type"].startswith("text/event-stream")
+
+
+@pytest.mark.asyncio
+async def test_message_key_distinguishes_requests():
+    """Conversation, message and history length form the key"""
+    calls = []
+
+    @bt.chatbot("keyed", stream=False)
+    def keyed_bot(message: str):
+        calls.append(message)
+        return bt.Text(message)
+
+    server = BubbleTeaServer(idempotency=BY_MESSAGE)
+    async with make_client(server) as client:
+        await client.post("/keyed", json=MESSAGE)
+        await client.post("/keyed", json=MESSAGE)
+        await client.post("/keyed", json={**MESSAGE, "message": "other"})
+        await client.post(
+            "/keyed", json={**MESSAGE, "chat_history": [{"role": "user"}]}
+        )
+        await client.post("/keyed", json={"type": "user", "message": "hi"})
+        await client.post("/keyed", json={"type": "user", "message": "hi"})
+
+    assert calls == ["hi", "other", "hi", "hi", "hi"]
+
+
+@pytest.mark.asyncio
+async def test_repeated_turns_run_by_default():
+    """Without a header, the same message sent again is a new turn"""
+    calls = []
+
+    @bt.chatbot("rounds", stream=False)
+    def rounds_bot(message: str):
+        calls.append(message)
+        return bt.Text(f"round {len(calls)}")
+
+    server = BubbleTeaServer(idempotency=True)
+    async with make_client(server) as client:
+        responses = [await client.post("/rounds", json=MESSAGE) for _ in range(3)]
+
+    assert [r.json()["responses"][0]["content"] for r in responses] == [
+        "round 1",
+        "round 2",
+        "round 3",
+    ]
+    assert not any("idempotent-replayed" in r.headers for r in responses)
+
+
+@pytest.mark.asyncio
+async def test_long_streams_are_not_recorded():
+    """Followers get a long stream live, later duplicates run the bot again"""
+    calls = []
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    @bt.chatbot("long")
+    async def long_bot(message: str):
+        calls.append(message)
+        yield bt.Text("x" * 200)
+        started.set()
+        await release.wait()
+        for _ in range(5):
+            yield bt.Text("y" * 200)
+
+    server = BubbleTeaServer(idempotency=IdempotencyConfig(max_bytes=500))
+    headers = {"Idempotency-Key": "long"}
+    async with make_client(server) as client:
+        first = asyncio.create_task(client.post("/long", json=MESSAGE, headers=headers))
+        await started.wait()
+        second = asyncio.create_task(
+            client.post("/long", json=MESSAGE, headers=headers)
+        )
+        await asyncio.sleep(0.05)
+        release.set()
+        first, second = await first, await second
+        late = await client.post("/long", json=MESSAGE, headers=headers)
+
+    assert first.content == second.content == late.content
+    assert first.content.count(b"y" * 200) == 5
+    assert second.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in late.headers
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_runs_are_not_replayed():
+    """A retry after an error runs the bot again"""
+    calls = []
+
+    @bt.chatbot("flaky", stream=False)
+    def flaky_bot(message: str):
+        calls.append(message)
+        if len(calls) == 1:
+            raise RuntimeError("upstream timeout")
+        return bt.Text("ok")
+
+    server = BubbleTeaServer(idempotency=BY_MESSAGE)
+    async with make_client(server) as client:
+        failed = await client.post("/flaky", json=MESSAGE)
+        retried = await client.post("/flaky", json=MESSAGE)
+
+    assert failed.status_code == 500
+    assert retried.status_code == 200
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_shared_run_cancelled_when_everyone_leaves():
+    """The bot stops once the last requester disconnects"""
+    waiting = asyncio.Event()
+    disconnect = asyncio.Event()
+    cancelled = []
+
+    @bt.chatbot("slow", stream=False)
+    async def slow_bot(message: str):
+        waiting.set()
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return bt.Text("late")
+
+    server = BubbleTeaServer(idempotency=BY_MESSAGE, metrics=True)
+    body = json.dumps(MESSAGE).encode()
+    sent = []
+
+    async def receive():
+        if not sent:
+            sent.append("body")
+            return {"type": "http.request", "body": body, "more_body": False}
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/slow",
+        "raw_path": b"/slow",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json")],
+        "client": ("test", 1),
+        "server": ("test", 80),
+    }
+    task = asyncio.create_task(server.app(scope, receive, send))
+    await waiting.wait()
+    disconnect.set()
+    await asyncio.wait_for(task, 5)
+    await asyncio.sleep(0.01)
+
+    assert cancelled == [True]
+    assert sent[1]["status"] == 499
+    assert server.metrics.bot("/slow").cancelled == 1
+    assert len(server.idempotency) == 0
+
+
+@pytest.mark.asyncio
+async def test_cache_ttl_and_size_bound():
+    """Finished recordings expire and the oldest are evicted"""
+    cache = IdempotencyCache(
+        IdempotencyConfig(ttl=0.05, max_entries=2, key_by_message=True)
+    )
+    request = LazyChatRequest.model_validate(MESSAGE)
+    assert cache.key("/bot", {}, request) is not None
+    assert cache.key("/bot", {}, LazyChatRequest(type="user", message="hi")) is None
+
+    async def produce():
+        return Response(b"{}", media_type="application/json")
+
+    for key in ("a", "b"):
+        recording, created = cache.claim(key)
+        assert created
+        recording.start(produce())
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    recording, created = cache.claim("a")
+    assert not created and recording.done
+
+    # Full: the oldest finished recording makes room
+    recording, created = cache.claim("c")
+    assert created
+    assert len(cache) == 2
+
+    await asyncio.sleep(0.1)
+    recording, created = cache.claim("b")
+    assert created
@@ -0,0 +1,112 @@
+"""
+Pytest tests for the precomputed parameter-injection plan
+
+These tests verify that @chatbot inspects the wrapped function once and
+that ChatbotFunction.__call__ only executes the recorded plan:
+- Only declared request fields are injected
+- chat_history is coerced to a string when annotated as str
+- Sync, async, generator and async generator results are detected
+"""
+
+from typing import Optional
+
+import pytest
+import bubbletea_chat as bt
+from bubbletea_chat import decorators
+from bubbletea_chat.decorators import InjectionPlan
+
+
+@pytest.fixture(autouse=True)
+def reset_registry():
+    """Give each test a clean chatbot registry"""
+    decorators._chatbot_registry.clear()
+    yield
+    decorators._chatbot_registry.clear()
+
+
+def test_plan_records_declared_params():
+    """Only parameters the function declares are part of the plan"""
+
+    def bot(message: str, thread_id: str = None, user_uuid: str = None):
+        return bt.Text(message)
+
+    plan = InjectionPlan(bot)
+    assert plan.params == ("user_uuid", "thread_id")
+    assert plan.history_as_str is False
+    assert plan.result_kind == InjectionPlan.SYNC
+
+
+def test_plan_detects_string_history():
+    """chat_history annotated as str or Optional[str] is coerced"""
+
+    def str_bot(message: str, chat_history: str = None):
+        return bt.Text(message)
+
+    def optional_bot(message: str, chat_history: Optional[str] = None):
+        return bt.Text(message)
+
+    def list_bot(message: str, chat_history: list = None):
+        return bt.Text(message)
+
+    assert InjectionPlan(str_bot).history_as_str is True
+    assert InjectionPlan(optional_bot).history_as_str is True
+    assert InjectionPlan(list_bot).history_as_str is False
+
+
+def test_plan_detects_result_kinds():
+    """The plan records how the function produces its result"""
+
+    def sync_bot(message: str):
+        return bt.Text(message)
+
+    async def async_bot(message: str):
+        return bt.Text(message)
+
+    def gen_bot(message: str):
+        yield bt.Text(message)
+
+    async def agen_bot(message: str):
+        yield bt.Text(message)
+
+    assert InjectionPlan(sync_bot).result_kind == InjectionPlan.SYNC
+    assert InjectionPlan(async_bot).result_kind == InjectionPlan.ASYNC
+    assert InjectionPlan(gen_bot).result_kind == InjectionPlan.GENERATOR
+    assert InjectionPlan(agen_bot).result_kind == InjectionPlan.ASYNC_GENERATOR
+
+
+@pytest.mark.asyncio
+async def test_call_injects_only_declared_params():
+    """ChatbotFunction passes only the planned request fields"""
+    received = {}
+
+    @bt.chatbot("plan-bot")
+    def plan_bot(message: str, user_uuid: str = None, chat_history: str = None):
+        received["user_uuid"] = user_uuid
+        received["chat_history"] = chat_history
+        return bt.Text(message)
+
+    result = await plan_bot(
+        "hi",
+        user_uuid="user-1",
+        user_email="someone@example.com",
+        chat_history=[{"role": "user", "content": "earlier"}],
+    )
+
+    assert result[0].content == "hi"
+    assert received["user_uuid"] == "user-1"
+    assert received["chat_history"] == str([{"role": "user", "content": "earlier"}])
+
+
+@pytest.mark.asyncio
+async def test_call_wraps_sync_generator():
+    """Sync generator bots are exposed as async generators"""
+
+    @bt.chatbot("plan-stream")
+    def stream_bot(message: str):
+        for word in message.split():
+            yield bt.Text(word)
+
+    assert stream_bot.stream is True
+    result = await stream_bot("a b c")
+    words = [component.content async for component in result]
+    assert words == ["a", "b", "c"]
@@ -0,0 +1,199 @@
+"""
+Pytest tests for background jobs
+
+These tests verify that:
+- Sync and async jobs run off the caller and resolve their future
+- Keyword arguments reach the job even when named like runner options
+- Jobs with the same key run one at a time in submission order
+- No more than `workers` jobs run at once and the queue is bounded
+- Failed jobs are retried, then reported through the future
+- Persistent jobs left in the store resume when a runner starts
+- Runner stats are exposed in /health
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+import bubbletea_chat as bt
+from bubbletea_chat import jobs
+from bubbletea_chat import decorators
+from bubbletea_chat.jobs import JobQueueFull, JobRunner, SQLiteJobStore
+from bubbletea_chat.server import BubbleTeaServer
+
+# Filled by persisted_job, which must be importable by name
+persisted_calls = []
+
+
+def persisted_job(value):
+    persisted_calls.append(value)
+    return value
+
+
+@pytest.fixture(autouse=True)
+def reset_registry():
+    """Give each test a clean chatbot registry"""
+    decorators._chatbot_registry.clear()
+    yield
+    decorators._chatbot_registry.clear()
+
+
+@pytest.fixture
+def runner():
+    """Runner with quick retries, shut down after the test"""
+    runner = JobRunner(workers=2, retry_delay=0.01)
+    yield runner
+    runner.shutdown(wait=False)
+
+
+def test_sync_and_async_jobs(runner):
+    """Both kinds of function run and return their result"""
+
+    async def add(a, b):
+        await asyncio.sleep(0)
+        return a + b
+
+    def name():
+        return threading.current_thread().name
+
+    assert runner.submit(add, 1, b=2).result(5) == 3
+    assert runner.submit(name).result(5).startswith("bubbletea-jobs-sync")
+    assert runner.stats()["completed"] == 2
+
+
+def test_job_kwargs_are_not_taken_by_the_runner(runner):
+    """A job's own key, retries or persist arguments are passed through"""
+
+    def store(func=None, key=None, retries=None, persist=None):
+        return func, key, retries, persist
+
+    job = runner.submit(store, func="f", key="k", retries=3, persist=True)
+    assert job.result(5) == ("f", "k", 3, True)
+    assert job.key is None and job.retries == 0 and not job.persist
+
+
+def test_jobs_with_a_key_run_in_order(runner):
+    """A conversation's jobs never overlap and keep their order"""
+    events = []
+
+    async def step(n, delay):
+        events.append(f"start {n}")
+        await asyncio.sleep(delay)
+        events.append(f"end {n}")
+
+    jobs = [
+        runner.submit(step, 1, 0.05, _key="conv"),
+        runner.submit(step, 2, 0, _key="conv"),
+        runner.submit(step, 3, 0, _key="conv"),
+    ]
+    for job in jobs:
+        job.result(5)
+
+    assert events == ["start 1", "end 1", "start 2", "end 2", "start 3", "end 3"]
+
+
+def test_concurrency_and_queue_bound():
+    """At most `workers` jobs run and max_queue jobs wait"""
+    runner = JobRunner(workers=2, max_queue=3)
+    release = threading.Event()
+    running = []
+    peak = []
+
+    def block():
+        running.append(1)
+        peak.append(len(running))
+        release.wait(5)
+        running.pop()
+
+    jobs = [runner.submit(block) for _ in range(3)]
+    deadline = time.monotonic() + 5
+    while runner.active < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert runner.queued == 1
+    jobs += [runner.submit(block) for _ in range(2)]
+    with pytest.raises(JobQueueFull):
+        runner.submit(block)
+
+    release.set()
+    for job in jobs:
+        job.result(5)
+    assert max(peak) == 2
+    assert runner.shutdown(wait=True, timeout=5)
+    with pytest.raises(RuntimeError):
+        runner.submit(block)
+
+
+def test_retries_then_failure(runner, capsys):
+    """A failing job is retried and its final error reaches the future"""
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RuntimeError("try again")
+        return "ok"
+
+    def broken():
+        raise RuntimeError("always")
+
+    assert runner.submit(flaky, _retries=2).result(5) == "ok"
+    with pytest.raises(RuntimeError, match="always"):
+        runner.submit(broken, _retries=1).result(5)
+
+    assert runner.stats()["retried"] == 3
+    assert runner.stats()["failed"] == 1
+    assert "Error in background job" in capsys.readouterr().out
+
+
+def test_persistent_jobs_resume(tmp_path):
+    """Stored jobs that didn't finish run when the next runner starts"""
+    path = str(tmp_path / "jobs.db")
+    with pytest.raises(ValueError):
+        JobRunner().submit(persisted_job, 1, _persist=True)
+
+    runner = JobRunner(store=SQLiteJobStore(path))
+    with pytest.raises(TypeError):
+        runner.submit(persisted_job, object(), _persist=True)
+    with pytest.raises(ValueError):
+        runner.submit(lambda: None, _persist=True)
+    assert runner.submit(persisted_job, "done", _persist=True).result(5) == "done"
+    runner.shutdown()
+
+    # A job stored by a process that stopped before running it
+    store = SQLiteJobStore(path)
+    store.add(f"{__name__}:persisted_job", '{"args": ["resumed"], "kwargs": {}}', None, 0)
+    store.close()
+
+    restarted = JobRunner(store=SQLiteJobStore(path))
+    restarted.start()
+    assert restarted.shutdown(wait=True, timeout=5)
+    assert persisted_calls == ["done", "resumed"]
+
+    store = SQLiteJobStore(path)
+    assert store.claim() == []
+    store.close()
+
+
+def test_background_stats_in_health(monkeypatch):
+    """bt.background uses the configured runner, reported by /health"""
+    monkeypatch.setattr(jobs, "_runner", None)
+    runner = bt.configure_background(workers=3)
+
+    @bt.chatbot("deferred", stream=False)
+    def deferred_bot(message: str, conversation_uuid: str = None):
+        bt.background(lambda: None, _key=conversation_uuid).result(5)
+        return bt.Text("later")
+
+    try:
+        with TestClient(BubbleTeaServer().app) as client:
+            client.post("/deferred", json={"type": "user", "message": "hi"})
+            health = client.get("/health").json()
+        with pytest.raises(RuntimeError):
+            bt.configure_background()
+    finally:
+        runner.shutdown(wait=False)
+
+    assert health["background"]["workers"] == 3
+    assert health["background"]["completed"] == 1
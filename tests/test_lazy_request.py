@@ -0,0 +1,121 @@
+"""
+Pytest tests for lazily validated chat requests
+
+These tests verify that:
+- LazyChatRequest validates images and chat_history only when read
+- The validated values match ComponentChatRequest
+- handle_request only reads the fields the bot declares
+- The chat route still answers invalid input with 422
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+import bubbletea_chat as bt
+from bubbletea_chat import decorators
+from bubbletea_chat.schemas import ComponentChatRequest, ImageInput, LazyChatRequest
+from bubbletea_chat.server import BubbleTeaServer
+
+PAYLOAD = {
+    "type": "user",
+    "message": "hello",
+    "images": [{"url": "https://example.com/cat.png"}],
+    "user_uuid": "user-1",
+    "chat_history": [{"role": "user", "content": "earlier"}],
+}
+
+
+@pytest.fixture(autouse=True)
+def reset_registry():
+    """Give each test a clean chatbot registry"""
+    decorators._chatbot_registry.clear()
+    yield
+    decorators._chatbot_registry.clear()
+
+
+def test_lazy_request_matches_eager():
+    """Reading the lazy fields gives the same values as the eager model"""
+    eager = ComponentChatRequest(**PAYLOAD)
+    lazy = LazyChatRequest.model_validate(PAYLOAD)
+
+    assert lazy.message == eager.message
+    assert lazy.user_uuid == eager.user_uuid
+    assert lazy.images == eager.images
+    assert isinstance(lazy.images[0], ImageInput)
+    assert lazy.chat_history == eager.chat_history
+
+
+def test_lazy_request_defers_validation():
+    """Invalid images only fail once they are read"""
+    lazy = LazyChatRequest.model_validate({**PAYLOAD, "images": [{"url": 5}]})
+
+    assert lazy.message == "hello"
+    with pytest.raises(ValidationError):
+        lazy.images
+
+
+@pytest.mark.asyncio
+async def test_handle_request_reads_declared_fields_only():
+    """Bots without images/chat_history never validate them"""
+
+    @bt.chatbot("plain", stream=False)
+    def plain_bot(message: str, user_uuid: str = None):
+        return bt.Text(f"{message} from {user_uuid}")
+
+    lazy = LazyChatRequest.model_validate(
+        {**PAYLOAD, "images": [{"url": 5}], "chat_history": 7}
+    )
+    response = await plain_bot.handle_request(lazy)
+
+    assert response.responses[0].content == "hello from user-1"
+
+
+@pytest.mark.asyncio
+async def test_handle_request_skips_unused_history():
+    """chat_history is left unvalidated when the bot doesn't declare it"""
+
+    @bt.chatbot("history", stream=False)
+    def history_bot(message: str, images: list = None):
+        return bt.Text(str(len(images)))
+
+    lazy = LazyChatRequest.model_validate({**PAYLOAD, "chat_history": [1, 2]})
+    response = await history_bot.handle_request(lazy)
+
+    assert response.responses[0].content == "1"
+    with pytest.raises(ValidationError):
+        lazy.chat_history
+
+
+def test_route_ignores_invalid_unused_fields():
+    """Bad images don't matter to a bot that never reads them"""
+
+    @bt.chatbot("echo", stream=False)
+    def echo_bot(message: str):
+        return bt.Text(message)
+
+    with TestClient(BubbleTeaServer().app) as client:
+        response = client.post("/echo", json={**PAYLOAD, "images": "not a list"})
+
+    assert response.status_code == 200
+    assert response.json()["responses"][0]["content"] == "hello"
+
+
+def test_route_rejects_invalid_declared_fields():
+    """Fields the bot declares are still validated before it runs"""
+
+    @bt.chatbot("vision", stream=False)
+    def vision_bot(message: str, images: list = None):
+        return bt.Text(message)
+
+    with TestClient(BubbleTeaServer().app) as client:
+        bad_images = client.post("/vision", json={**PAYLOAD, "images": [{"url": 5}]})
+        missing_message = client.post("/vision", json={"type": "user"})
+        not_json = client.post(
+            "/vision", content=b"{", headers={"content-type": "application/json"}
+        )
+
+    assert bad_images.status_code == 422
+    assert bad_images.json()["detail"][0]["loc"] == ["body", "images", 0, "url"]
+    assert missing_message.status_code == 422
+    assert missing_message.json()["detail"][0]["loc"] == ["body", "message"]
+    assert not_json.status_code == 422
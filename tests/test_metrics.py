@@ -0,0 +1,107 @@
+"""
+Pytest tests for the /metrics endpoint
+
+These tests verify that:
+- /metrics is only exposed when enabled
+- Request, component, byte and error counts are recorded per bot
+- Latency and time-to-first-component histograms are populated
+- Thread pool gauges are included
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+import bubbletea_chat as bt
+from bubbletea_chat import decorators
+from bubbletea_chat.metrics import Histogram, MetricsRegistry
+from bubbletea_chat.server import BubbleTeaServer
+
+
+@pytest.fixture(autouse=True)
+def reset_registry():
+    """Give each test a clean chatbot registry"""
+    decorators._chatbot_registry.clear()
+    yield
+    decorators._chatbot_registry.clear()
+
+
+def parse(text):
+    """Map 'name{labels}' to its value for every sample line"""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            key, value = line.rsplit(" ", 1)
+            samples[key] = float(value)
+    return samples
+
+
+def test_metrics_disabled_by_default():
+    """No /metrics route unless metrics=True"""
+
+    @bt.chatbot("quiet")
+    def quiet_bot(message: str):
+        return bt.Text(message)
+
+    with TestClient(BubbleTeaServer().app) as client:
+        assert client.get("/metrics").status_code == 404
+
+
+def test_metrics_record_requests():
+    """Streaming and non-streaming bots are counted separately"""
+
+    @bt.chatbot("listed", stream=False)
+    def listed_bot(message: str):
+        return [bt.Text(message), bt.Text(message)]
+
+    @bt.chatbot("streamed")
+    async def streamed_bot(message: str):
+        yield bt.Text("a")
+        yield bt.Text("b")
+        yield bt.Text("c")
+
+    @bt.chatbot("broken", stream=False)
+    def broken_bot(message: str):
+        raise RuntimeError("boom")
+
+    server = BubbleTeaServer(metrics=True)
+    with TestClient(server.app, raise_server_exceptions=False) as client:
+        listed = client.post("/listed", json={"type": "user", "message": "hi"})
+        client.post("/listed", json={"type": "user", "message": "hi"})
+        streamed = client.post("/streamed", json={"type": "user", "message": "hi"})
+        assert client.post("/broken", json={"type": "user", "message": "hi"}).status_code == 500
+        response = client.get("/metrics")
+
+    assert response.headers["content-type"].startswith("text/plain")
+    samples = parse(response.text)
+
+    assert samples['bubbletea_requests_total{bot="/listed"}'] == 2
+    assert samples['bubbletea_components_total{bot="/listed"}'] == 4
+    assert samples['bubbletea_response_bytes_total{bot="/listed"}'] == 2 * len(listed.content)
+    assert samples['bubbletea_requests_in_flight{bot="/listed"}'] == 0
+
+    assert samples['bubbletea_components_total{bot="/streamed"}'] == 3
+    assert samples['bubbletea_response_bytes_total{bot="/streamed"}'] == len(streamed.content)
+    assert samples['bubbletea_time_to_first_component_seconds_count{bot="/streamed"}'] == 1
+    assert samples['bubbletea_request_duration_seconds_count{bot="/streamed"}'] == 1
+
+    assert samples['bubbletea_request_errors_total{bot="/broken"}'] == 1
+    assert samples['bubbletea_requests_in_flight{bot="/broken"}'] == 0
+
+    assert samples['bubbletea_sync_pool_max_workers{pool="server"}'] == 40
+
+
+def test_histogram_buckets_are_cumulative():
+    """Bucket samples are cumulative and end with +Inf"""
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.observe(value)
+
+    assert list(histogram.samples()) == [("0.1", 2), ("1", 3), ("+Inf", 4)]
+    assert histogram.count == 4
+    assert histogram.sum == pytest.approx(5.65)
+
+
+def test_render_escapes_labels():
+    """Label values are escaped in the exposition text"""
+    registry = MetricsRegistry()
+    registry.bot('/odd"path').start()
+    assert 'bubbletea_requests_total{bot="/odd\\"path"} 1' in registry.render()
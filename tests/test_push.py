@@ -0,0 +1,167 @@
+"""
+Pytest tests for the conversation push client
+
+These tests verify that:
+- Messages are posted to the conversation API with the key and payload
+- Failures that left the message undelivered are retried, others are not
+- Non-JSON answers are returned as text
+- send_many bounds concurrent sends and reports failures per message
+- push_message reuses one client per event loop
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+import bubbletea_chat as bt
+from bubbletea_chat.push import PushClient, PushError, get_push_client
+
+
+def stub_api(failures=None, delay=0.0):
+    """Stub of the developer conversation API
+
+    failures maps a conversation to the statuses its first attempts get.
+    """
+    app = FastAPI()
+    app.state.received = []
+    app.state.in_flight = 0
+    app.state.peak = 0
+
+    @app.post("/v1/developer/conversation/{uuid}/message")
+    async def message(uuid: str, request: Request):
+        app.state.in_flight += 1
+        app.state.peak = max(app.state.peak, app.state.in_flight)
+        try:
+            await asyncio.sleep(delay)
+            key = request.headers.get("x-api-key")
+            app.state.received.append((uuid, key, await request.json()))
+            pending = (failures or {}).get(uuid)
+            if pending:
+                return JSONResponse({"error": "nope"}, status_code=pending.pop(0))
+            return {"id": len(app.state.received)}
+        finally:
+            app.state.in_flight -= 1
+
+    return app
+
+
+def make_client(app, **options):
+    """Client talking to the stub in-process"""
+    return PushClient(
+        api_key="key",
+        base_url="http://api.test",
+        backoff=0,
+        transport=httpx.ASGITransport(app=app),
+        **options,
+    )
+
+
+@pytest.mark.asyncio
+async def test_send_posts_component():
+    """Components are posted as the message content"""
+    app = stub_api()
+    async with make_client(app) as client:
+        answer = await client.send("conv-1", bt.Text("hello"), sender_account_id="u1")
+
+    assert answer == {"id": 1}
+    uuid, key, payload = app.state.received[0]
+    assert (uuid, key) == ("conv-1", "key")
+    assert payload["sender"] == "agent"
+    assert payload["sender_account_id"] == "u1"
+    assert payload["content"]["type"] == "text"
+    assert payload["content"]["content"] == "hello"
+
+
+@pytest.mark.asyncio
+async def test_transient_failures_are_retried():
+    """503 and 429 are retried; 4xx and other 5xx may have landed and fail at once"""
+    app = stub_api(
+        failures={"busy": [503, 429], "bad": [400], "gw": [502], "down": [503] * 5}
+    )
+    async with make_client(app, retries=2) as client:
+        assert await client.send("busy", {"type": "text", "content": "x"}) == {"id": 3}
+        with pytest.raises(PushError) as bad:
+            await client.send("bad", {"type": "text", "content": "x"})
+        with pytest.raises(PushError) as gateway:
+            await client.send("gw", {"type": "text", "content": "x"})
+        with pytest.raises(PushError) as down:
+            await client.send("down", {"type": "text", "content": "x"})
+
+    assert bad.value.status_code == 400
+    assert gateway.value.status_code == 502
+    assert down.value.status_code == 503
+    attempts = [uuid for uuid, _, _ in app.state.received]
+    assert attempts.count("bad") == 1
+    assert attempts.count("gw") == 1
+    assert attempts.count("down") == 3
+
+
+@pytest.mark.asyncio
+async def test_network_errors_are_retried():
+    """Connection errors count as transient"""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, json={"ok": True})
+
+    client = PushClient(
+        api_key="key",
+        base_url="http://api.test",
+        backoff=0,
+        transport=httpx.MockTransport(handler),
+    )
+    async with client:
+        assert await client.send("conv", bt.Text("hi")) == {"ok": True}
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_errors_after_sending_are_not_retried():
+    """A read timeout may follow a delivered message, so it isn't re-sent"""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise httpx.ReadTimeout("no answer", request=request)
+        return httpx.Response(200, text="accepted")
+
+    client = PushClient(
+        api_key="key",
+        base_url="http://api.test",
+        backoff=0,
+        transport=httpx.MockTransport(handler),
+    )
+    async with client:
+        with pytest.raises(PushError):
+            await client.send("conv", bt.Text("hi"))
+        assert await client.send("conv", bt.Text("hi")) == "accepted"
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_send_many_is_bounded():
+    """Bulk sends keep max_concurrency in flight and report failures in order"""
+    app = stub_api(failures={"c3": [400]}, delay=0.02)
+    async with make_client(app, max_concurrency=2) as client:
+        results = await client.send_many(
+            (f"c{i}", bt.Markdown(f"brief {i}")) for i in range(6)
+        )
+
+    assert app.state.peak == 2
+    assert isinstance(results[3], PushError)
+    assert all(isinstance(r, dict) for i, r in enumerate(results) if i != 3)
+
+
+@pytest.mark.asyncio
+async def test_shared_client_per_loop(monkeypatch):
+    """push_message uses one client for the running loop"""
+    monkeypatch.setenv("BUBBLETEA_API_KEY", "env-key")
+    client = get_push_client()
+    assert get_push_client() is client
+    assert client.api_key == "env-key"
@@ -0,0 +1,148 @@
+"""
+Pytest tests for shared resources
+
+These tests verify that:
+- Resources are opened once at startup and injected by parameter name
+- Generator resources are closed in reverse order at shutdown
+- Resources can depend on earlier resources
+- /health reports "starting" until resources are open
+- Reserved and duplicate names are rejected
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+import bubbletea_chat as bt
+from bubbletea_chat import decorators, resources
+from bubbletea_chat.server import BubbleTeaServer
+
+
+@pytest.fixture(autouse=True)
+def reset_registry():
+    """Give each test clean chatbot and resource registries"""
+    decorators._chatbot_registry.clear()
+    resources._resource_registry.clear()
+    yield
+    decorators._chatbot_registry.clear()
+    resources._resource_registry.clear()
+
+
+def post(client, path, message="hi"):
+    """Send a chat message"""
+    return client.post(path, json={"type": "user", "message": message})
+
+
+def test_resources_are_shared_and_closed():
+    """Each resource is built once and torn down after the last request"""
+    events = []
+
+    @bt.resource
+    def greeting():
+        events.append("open greeting")
+        yield "hello"
+        events.append("close greeting")
+
+    @bt.resource("punctuation")
+    async def make_punctuation(greeting):
+        events.append(f"open punctuation after {greeting}")
+        yield "!"
+        events.append("close punctuation")
+
+    @bt.chatbot("greet", stream=False)
+    def greet_bot(message: str, greeting, punctuation, user_uuid: str = None):
+        return bt.Text(f"{greeting} {message}{punctuation}")
+
+    @bt.chatbot("plain", stream=False)
+    async def plain_bot(message: str):
+        return bt.Text(message)
+
+    with TestClient(BubbleTeaServer().app) as client:
+        first = post(client, "/greet", "ann")
+        second = post(client, "/greet", "bob")
+        plain = post(client, "/plain")
+        assert client.get("/health").json()["status"] == "healthy"
+        events.append("served")
+
+    assert first.json()["responses"][0]["content"] == "hello ann!"
+    assert second.json()["responses"][0]["content"] == "hello bob!"
+    assert plain.status_code == 200
+    assert events == [
+        "open greeting",
+        "open punctuation after hello",
+        "served",
+        "close punctuation",
+        "close greeting",
+    ]
+
+
+def test_streaming_bots_receive_resources():
+    """Async generator bots get resources too"""
+
+    @bt.resource
+    async def prefix():
+        return ">"
+
+    @bt.chatbot("stream")
+    async def stream_bot(message: str, prefix):
+        yield bt.Text(f"{prefix} {message}")
+
+    with TestClient(BubbleTeaServer().app) as client:
+        response = post(client, "/stream")
+
+    assert b"> hi" in response.content
+
+
+def test_health_waits_for_resources():
+    """/health reports starting until the resources are open"""
+
+    @bt.resource
+    def client():
+        return object()
+
+    server = BubbleTeaServer()
+    # Without the context manager the lifespan never runs
+    starting = TestClient(server.app).get("/health")
+    with TestClient(server.app) as client:
+        ready = client.get("/health")
+
+    assert starting.status_code == 503
+    assert starting.json() == {"status": "starting"}
+    assert ready.status_code == 200
+    assert not server.resources.ready
+
+
+def test_failed_startup_closes_opened_resources():
+    """A failing factory aborts startup after closing earlier resources"""
+    closed = []
+
+    @bt.resource
+    def first():
+        yield 1
+        closed.append("first")
+
+    @bt.resource
+    def broken(first):
+        raise RuntimeError("no credentials")
+
+    with pytest.raises(RuntimeError, match="no credentials"):
+        with TestClient(BubbleTeaServer().app):
+            pass
+    assert closed == ["first"]
+
+
+def test_invalid_names():
+    """Request fields and duplicates can't be resource names"""
+    with pytest.raises(ValueError):
+
+        @bt.resource
+        def user_uuid():
+            return None
+
+    @bt.resource
+    def client():
+        return None
+
+    with pytest.raises(ValueError):
+
+        @bt.resource("client")
+        def other_client():
+            return None
@@ -0,0 +1,225 @@
+"""
+Pytest tests for @chatbot(cache=...)
+
+These tests verify that:
+- Repeated messages are answered from the cache without running the bot
+- Streaming bots replay complete recorded streams
+- key_params make injected fields part of the key
+- By default every field the bot takes is part of the key
+- Failed or abandoned runs, and responses with an Error, are not cached
+- MemoryCache and SQLiteCache honour TTL and LRU limits
+- Hit and miss counters are exposed in /health and /metrics
+"""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+import bubbletea_chat as bt
+from bubbletea_chat import decorators
+from bubbletea_chat.cache import CacheConfig, MemoryCache, SQLiteCache
+from bubbletea_chat.server import BubbleTeaServer
+
+
+@pytest.fixture(autouse=True)
+def reset_registry():
+    """Give each test a clean chatbot registry"""
+    decorators._chatbot_registry.clear()
+    yield
+    decorators._chatbot_registry.clear()
+
+
+def post(client, path, message="hi", **fields):
+    """Send a chat message"""
+    return client.post(path, json={"type": "user", "message": message, **fields})
+
+
+def test_list_responses_are_cached():
+    """The second identical message doesn't run the bot"""
+    calls = []
+
+    @bt.chatbot("faq", stream=False, cache=True)
+    def faq_bot(message: str):
+        calls.append(message)
+        return bt.Text(f"answer to {message}")
+
+    with TestClient(BubbleTeaServer(metrics=True).app) as client:
+        first = post(client, "/faq")
+        second = post(client, "/faq")
+        other = post(client, "/faq", "other")
+        health = client.get("/health").json()
+        metrics = client.get("/metrics").text
+
+    assert calls == ["hi", "other"]
+    assert first.content == second.content
+    assert second.headers["content-type"] == "application/json"
+    assert other.json()["responses"][0]["content"] == "answer to other"
+    assert health["registered_bots"][0]["cache"]["hits"] == 1
+    assert health["registered_bots"][0]["cache"]["misses"] == 2
+    assert 'bubbletea_cache_hits_total{bot="/faq"} 1' in metrics
+    assert 'bubbletea_cache_misses_total{bot="/faq"} 2' in metrics
+
+
+def test_streams_are_recorded_and_replayed():
+    """A cached stream is byte-identical to the original"""
+    calls = []
+
+    @bt.chatbot("story", cache=True)
+    async def story_bot(message: str):
+        calls.append(message)
+        yield bt.Text("once")
+        yield bt.Text("upon a time")
+
+    with TestClient(BubbleTeaServer().app) as client:
+        first = post(client, "/story")
+        second = post(client, "/story")
+
+    assert len(calls) == 1
+    assert first.content == second.content
+    assert second.headers["content-type"].startswith("text/event-stream")
+    assert second.content.endswith(b'data: {"type":"done"}\n\n')
+
+
+def test_key_params_separate_users():
+    """Fields listed in key_params are part of the key"""
+    calls = []
+
+    @bt.chatbot("personal", stream=False, cache=CacheConfig(key_params=("user_uuid",)))
+    def personal_bot(message: str, user_uuid: str = None):
+        calls.append(user_uuid)
+        return bt.Text(f"hi {user_uuid}")
+
+    with TestClient(BubbleTeaServer().app) as client:
+        post(client, "/personal", user_uuid="a")
+        post(client, "/personal", user_uuid="b")
+        repeat = post(client, "/personal", user_uuid="a")
+
+    assert calls == ["a", "b"]
+    assert repeat.json()["responses"][0]["content"] == "hi a"
+
+
+def test_fields_the_bot_takes_are_keyed_by_default():
+    """Two users sending the same message don't share an answer"""
+    calls = []
+
+    @bt.chatbot("account", stream=False, cache=True)
+    def account_bot(message: str, user_uuid: str = None, images: list = None):
+        calls.append(user_uuid)
+        return bt.Text(f"balance of {user_uuid}")
+
+    image = {"url": "https://example.com/a.png"}
+    with TestClient(BubbleTeaServer().app) as client:
+        first = post(client, "/account", user_uuid="a")
+        second = post(client, "/account", user_uuid="b")
+        repeat = post(client, "/account", user_uuid="a")
+        with_image = post(client, "/account", user_uuid="a", images=[image])
+        post(client, "/account", user_uuid="a", images=[image])
+        post(client, "/account", user_uuid="a", conversation_uuid="c")
+
+    assert calls == ["a", "b", "a"]
+    assert first.json()["responses"][0]["content"] == "balance of a"
+    assert second.json()["responses"][0]["content"] == "balance of b"
+    assert repeat.content == first.content
+    assert with_image.status_code == 200
+
+
+def test_unknown_key_params_rejected():
+    """key_params must name injectable request fields"""
+    with pytest.raises(ValueError):
+
+        @bt.chatbot("broken", cache=CacheConfig(key_params=("nope",)))
+        def broken_bot(message: str):
+            return bt.Text(message)
+
+
+def test_failures_are_not_cached():
+    """Errors mid-stream leave nothing in the cache"""
+    calls = []
+
+    @bt.chatbot("flaky", cache=True)
+    async def flaky_bot(message: str):
+        calls.append(message)
+        yield bt.Text("partial")
+        if len(calls) == 1:
+            raise RuntimeError("upstream failed")
+        yield bt.Text("complete")
+
+    with TestClient(BubbleTeaServer().app, raise_server_exceptions=False) as client:
+        post(client, "/flaky")
+        retried = post(client, "/flaky")
+        cached = post(client, "/flaky")
+
+    assert len(calls) == 2
+    assert b"complete" in retried.content
+    assert cached.content == retried.content
+
+
+def test_error_responses_are_not_cached():
+    """A reported failure is not replayed to the next request"""
+    calls = []
+    failure = bt.frozen(bt.Error("Try again", code="upstream"))
+
+    def reply():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            return [bt.Text("Sorry"), bt.Error("LLM timed out")]
+        if len(calls) == 2:
+            return [failure]
+        return [bt.Text("answer")]
+
+    @bt.chatbot("errors-list", stream=False, cache=True)
+    def list_bot(message: str):
+        return reply()
+
+    @bt.chatbot("errors-stream", cache=True)
+    async def stream_bot(message: str):
+        for component in reply():
+            yield component
+
+    with TestClient(BubbleTeaServer().app) as client:
+        for path in ("/errors-list", "/errors-stream"):
+            calls.clear()
+            responses = [post(client, path).content for _ in range(4)]
+
+            assert len(calls) == 3
+            assert b"answer" in responses[2]
+            assert responses[3] == responses[2]
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_ttl_and_lru():
+    """Entries expire and the least recently used is evicted"""
+    cache = MemoryCache(max_entries=2)
+    await cache.set("a", b"1", None)
+    await cache.set("b", b"2", None)
+    assert await cache.get("a") == b"1"
+    await cache.set("c", b"3", None)
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == b"1"
+    assert len(cache) == 2
+
+    await cache.set("short", b"4", 0.01)
+    await asyncio.sleep(0.02)
+    assert await cache.get("short") is None
+
+
+@pytest.mark.asyncio
+async def test_sqlite_cache_persists(tmp_path):
+    """Entries survive a new backend instance and honour the size limit"""
+    path = str(tmp_path / "cache.db")
+    cache = SQLiteCache(path, max_entries=2)
+    await cache.set("expired", b"x", -1)
+    assert await cache.get("expired") is None
+    await cache.set("a", b"1", None)
+    await cache.set("b", b"2", None)
+    await cache.get("a")
+    await cache.set("c", b"3", None)
+
+    reopened = SQLiteCache(path)
+    assert await reopened.get("a") == b"1"
+    assert await reopened.get("b") is None
+    assert await reopened.get("c") == b"3"
+
+    await reopened.clear()
+    assert await reopened.get("a") is None
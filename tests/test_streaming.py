@@ -0,0 +1,221 @@
+"""
+Pytest tests for stream processing stages
+
+These tests verify the text chunk coalescing stage:
+- Consecutive Text/Markdown chunks are merged up to a size threshold
+- Buffered text is flushed after the flush interval
+- Non-text components flush the buffer and keep their position
+- Raw str chunks are merged and stay str
+- The server applies coalescing only when enabled
+
+and the delta stage:
+- Text chunks become deltas of one block, ended by a snapshot
+- Deltas are merged only within their block
+"""
+
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+import bubbletea_chat as bt
+from bubbletea_chat import decorators
+from bubbletea_chat.server import BubbleTeaServer
+from bubbletea_chat.streaming import CoalesceConfig, coalesce_text, stream_deltas
+
+
+@pytest.fixture(autouse=True)
+def reset_registry():
+    """Give each test a clean chatbot registry"""
+    decorators._chatbot_registry.clear()
+    yield
+    decorators._chatbot_registry.clear()
+
+
+async def collect(stream):
+    return [component async for component in stream]
+
+
+async def from_list(components, delay=0.0):
+    for component in components:
+        if delay:
+            await asyncio.sleep(delay)
+        yield component
+
+
+@pytest.mark.asyncio
+async def test_merges_consecutive_text_chunks():
+    """Fast token streams collapse into a single component"""
+    chunks = [bt.Text(c) for c in "Hello, world"]
+    result = await collect(coalesce_text(from_list(chunks), CoalesceConfig(1000, 1.0)))
+
+    assert len(result) == 1
+    assert isinstance(result[0], bt.Text)
+    assert result[0].content == "Hello, world"
+
+
+@pytest.mark.asyncio
+async def test_merges_raw_string_chunks():
+    """Raw str chunks merge into one str, separately from Text chunks"""
+    chunks = ["Hel", "lo", bt.Text("!"), "x"]
+    result = await collect(coalesce_text(from_list(chunks), CoalesceConfig(1000, 1.0)))
+
+    assert result[0] == "Hello"
+    assert isinstance(result[1], bt.Text) and result[1].content == "!"
+    assert result[2] == "x"
+
+
+@pytest.mark.asyncio
+async def test_flushes_at_size_threshold():
+    """Buffered text is emitted once max_bytes is reached"""
+    chunks = [bt.Text("ab")] * 5
+    result = await collect(coalesce_text(from_list(chunks), CoalesceConfig(4, 1.0)))
+
+    assert [c.content for c in result] == ["abab", "abab", "ab"]
+
+
+@pytest.mark.asyncio
+async def test_size_threshold_counts_utf8_bytes():
+    """Multi-byte text reaches the threshold by its encoded length"""
+    chunks = [bt.Text("你好")] * 3
+    result = await collect(coalesce_text(from_list(chunks), CoalesceConfig(12, 1.0)))
+
+    assert [c.content for c in result] == ["你好你好", "你好"]
+
+
+@pytest.mark.asyncio
+async def test_flushes_after_interval():
+    """A slow producer doesn't hold text back longer than the interval"""
+    chunks = [bt.Text("a"), bt.Text("b")]
+    config = CoalesceConfig(1000, 0.01)
+    result = await collect(coalesce_text(from_list(chunks, delay=0.05), config))
+
+    assert [c.content for c in result] == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_non_text_components_flush_and_pass_through():
+    """Other components keep their position in the stream"""
+    chunks = [
+        bt.Text("a"),
+        bt.Text("b"),
+        bt.Image("https://example.com/x.png"),
+        bt.Markdown("*c*"),
+        bt.Text("d"),
+    ]
+    result = await collect(coalesce_text(from_list(chunks), CoalesceConfig(1000, 1.0)))
+
+    assert [type(c) for c in result] == [bt.Text, bt.Image, bt.Markdown, bt.Text]
+    assert result[0].content == "ab"
+    assert result[2].content == "*c*"
+
+
+@pytest.mark.asyncio
+async def test_closing_stage_closes_source():
+    """Closing the coalesced stream closes the bot generator"""
+    closed = asyncio.Event()
+
+    async def endless():
+        try:
+            while True:
+                await asyncio.sleep(0.001)
+                yield bt.Text("x")
+        finally:
+            closed.set()
+
+    stream = coalesce_text(endless(), CoalesceConfig(3, 1.0))
+    assert (await stream.__anext__()).content == "xxx"
+    await stream.aclose()
+    assert closed.is_set()
+
+
+def test_server_coalesces_when_enabled():
+    """Only bots with coalescing enabled get merged frames"""
+
+    @bt.chatbot("merged", coalesce=True)
+    async def merged_bot(message: str):
+        for char in message:
+            yield bt.Text(char)
+
+    @bt.chatbot("unmerged")
+    async def unmerged_bot(message: str):
+        for char in message:
+            yield bt.Text(char)
+
+    server = BubbleTeaServer()
+    with TestClient(server.app) as client:
+        merged = client.post("/merged", json={"type": "user", "message": "hello"})
+        unmerged = client.post("/unmerged", json={"type": "user", "message": "hello"})
+
+    def frames(response):
+        return [json.loads(f[6:]) for f in response.text.split("\n\n") if f]
+
+    assert frames(merged) == [{"type": "text", "content": "hello"}, {"type": "done"}]
+    assert len(frames(unmerged)) == 6
+
+
+@pytest.mark.asyncio
+async def test_stream_deltas_builds_one_block():
+    """Every chunk appends to the same block, the snapshot holds it all"""
+    result = await collect(stream_deltas(from_list(["Hel", "", "lo"]), block_id="b1"))
+
+    assert [c.model_dump() for c in result] == [
+        {"type": "markdown_delta", "block_id": "b1", "content": "Hel"},
+        {"type": "markdown_delta", "block_id": "b1", "content": "lo"},
+        {
+            "type": "block_snapshot",
+            "block_id": "b1",
+            "format": "markdown",
+            "content": "Hello",
+        },
+    ]
+
+
+@pytest.mark.asyncio
+async def test_stream_deltas_text_without_snapshot():
+    """Sync chunks work too, as text deltas with a generated block id"""
+    stream = stream_deltas(iter(["a", "b"]), markdown=False, snapshot=False)
+    result = await collect(stream)
+
+    assert [type(c) for c in result] == [bt.TextDelta, bt.TextDelta]
+    assert result[0].block_id == result[1].block_id
+    assert len(result[0].block_id) == 32
+
+
+@pytest.mark.asyncio
+async def test_stream_deltas_closes_source():
+    """Stopping early closes the upstream stream"""
+    closed = []
+
+    async def chunks():
+        try:
+            while True:
+                yield "token"
+        finally:
+            closed.append(True)
+
+    stream = stream_deltas(chunks())
+    await stream.__anext__()
+    await stream.aclose()
+
+    assert closed == [True]
+
+
+@pytest.mark.asyncio
+async def test_coalesce_merges_deltas_per_block():
+    """Deltas of one block merge, a new block or type flushes first"""
+    chunks = [
+        bt.MarkdownDelta("a", "b1"),
+        bt.MarkdownDelta("b", "b1"),
+        bt.MarkdownDelta("c", "b2"),
+        bt.TextDelta("d", "b2"),
+        bt.BlockSnapshot("abc", "b1"),
+    ]
+    result = await collect(coalesce_text(from_list(chunks), CoalesceConfig(1000, 1.0)))
+
+    assert [(c.type, c.block_id, c.content) for c in result] == [
+        ("markdown_delta", "b1", "ab"),
+        ("markdown_delta", "b2", "c"),
+        ("text_delta", "b2", "d"),
+        ("block_snapshot", "b1", "abc"),
+    ]
@@ -0,0 +1,239 @@
+"""
+Pytest tests for running synchronous chatbot functions on a thread pool
+
+These tests verify that:
+- Sync bots run on a worker thread instead of the event loop thread
+- contextvars set by the caller are visible inside the bot function
+- Bots can get a dedicated pool or opt out with workers=0
+- Pool utilisation is reported on the /health endpoint
+- Sync generators are drained by a worker thread with backpressure
+- Errors from a generator, or from closing it, reach the consumer
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+import bubbletea_chat as bt
+from bubbletea_chat import decorators
+from bubbletea_chat.executor import BoundedExecutor, iterate_in_thread
+from bubbletea_chat.server import BubbleTeaServer
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+@pytest.fixture(autouse=True)
+def reset_registry():
+    """Give each test a clean chatbot registry"""
+    decorators._chatbot_registry.clear()
+    yield
+    decorators._chatbot_registry.clear()
+
+
+@pytest.mark.asyncio
+async def test_sync_bot_runs_off_event_loop():
+    """Sync functions execute on a worker thread with the caller's context"""
+    seen = {}
+
+    @bt.chatbot("threaded")
+    def threaded_bot(message: str):
+        seen["thread"] = threading.current_thread()
+        seen["request_id"] = request_id.get()
+        return bt.Text(message)
+
+    request_id.set("req-42")
+    result = await threaded_bot("hello")
+
+    assert result[0].content == "hello"
+    assert seen["thread"] is not threading.current_thread()
+    assert seen["request_id"] == "req-42"
+
+
+@pytest.mark.asyncio
+async def test_workers_zero_runs_on_event_loop():
+    """workers=0 keeps the function on the event loop thread"""
+    seen = {}
+
+    @bt.chatbot("inline", workers=0)
+    def inline_bot(message: str):
+        seen["thread"] = threading.current_thread()
+        return bt.Text(message)
+
+    await inline_bot("hello")
+    assert seen["thread"] is threading.current_thread()
+    assert inline_bot.executor is None
+
+
+@pytest.mark.asyncio
+async def test_dedicated_pool_per_bot():
+    """workers=N gives the bot its own pool of N threads"""
+
+    @bt.chatbot("dedicated", workers=2)
+    def dedicated_bot(message: str):
+        return bt.Text(threading.current_thread().name)
+
+    result = await dedicated_bot("hello")
+    assert dedicated_bot.executor.max_workers == 2
+    assert result[0].content.startswith("bubbletea-dedicated")
+
+
+@pytest.mark.asyncio
+async def test_blocking_bots_do_not_block_each_other():
+    """Concurrent blocking calls overlap instead of running serially"""
+    executor = BoundedExecutor(4)
+
+    @bt.chatbot("sleepy")
+    def sleepy_bot(message: str):
+        time.sleep(0.2)
+        return bt.Text(message)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(sleepy_bot("x", executor=executor) for _ in range(4)))
+    assert time.perf_counter() - start < 0.6
+    assert executor.stats()["completed"] == 4
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_queue_depth_counts_waiting_calls():
+    """Calls beyond max_workers are reported as queued"""
+    executor = BoundedExecutor(1)
+    release = threading.Event()
+
+    first = executor.submit(release.wait)
+    second = executor.submit(lambda: None)
+    await asyncio.sleep(0.05)
+
+    assert executor.active == 1
+    assert executor.queue_depth == 1
+
+    release.set()
+    first.result(timeout=1)
+    second.result(timeout=1)
+    assert executor.queue_depth == 0
+    executor.shutdown()
+
+
+def test_health_reports_sync_pool():
+    """The /health endpoint exposes pool utilisation"""
+
+    @bt.chatbot("health-pool", stream=False)
+    def pool_bot(message: str):
+        return [bt.Text(message)]
+
+    server = BubbleTeaServer(pool_bot, sync_workers=3, register_all=False)
+    with TestClient(server.app) as client:
+        response = client.post("/health-pool", json={"type": "user", "message": "hi"})
+        assert response.json()["responses"][0]["content"] == "hi"
+
+        health = client.get("/health").json()
+        assert health["sync_pool"]["max_workers"] == 3
+        assert health["sync_pool"]["completed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_sync_generator_runs_in_worker_thread():
+    """Sync generator bodies run on a worker thread, not the event loop"""
+    threads = set()
+
+    @bt.chatbot("sync-stream")
+    def stream_bot(message: str):
+        for word in message.split():
+            threads.add(threading.current_thread())
+            yield bt.Text(word)
+
+    result = await stream_bot("one two three")
+    words = [component.content async for component in result]
+
+    assert words == ["one", "two", "three"]
+    assert threading.current_thread() not in threads
+
+
+@pytest.mark.asyncio
+async def test_sync_generator_backpressure():
+    """The producer never runs more than max_buffer items ahead"""
+    produced = []
+
+    def numbers():
+        for i in range(100):
+            produced.append(i)
+            yield i
+
+    executor = BoundedExecutor(1)
+    stream = iterate_in_thread(numbers(), executor, max_buffer=4)
+
+    assert await stream.__anext__() == 0
+    await asyncio.sleep(0.1)
+    # One consumed, four buffered, one waiting for a free slot
+    assert len(produced) <= 6
+
+    await stream.aclose()
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_sync_generator_closed_on_cancel():
+    """Stopping the consumer closes the generator in its worker thread"""
+    closed = threading.Event()
+
+    def endless():
+        try:
+            while True:
+                yield "tick"
+        finally:
+            closed.set()
+
+    executor = BoundedExecutor(1)
+    stream = iterate_in_thread(endless(), executor, max_buffer=2)
+    assert await stream.__anext__() == "tick"
+    await stream.aclose()
+
+    assert closed.wait(timeout=1)
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_sync_generator_errors_propagate():
+    """Exceptions raised by the generator reach the async consumer"""
+
+    def failing():
+        yield "first"
+        raise RuntimeError("upstream failed")
+
+    executor = BoundedExecutor(1)
+    stream = iterate_in_thread(failing(), executor)
+
+    assert await stream.__anext__() == "first"
+    with pytest.raises(RuntimeError, match="upstream failed"):
+        await stream.__anext__()
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_sync_generator_cleanup_errors_propagate():
+    """An exception from close() reaches the consumer instead of hanging it"""
+
+    class Source:
+        def __init__(self):
+            self.items = iter(["first", "second"])
+
+        def __iter__(self):
+            return self
+
+        def __next__(self):
+            return next(self.items)
+
+        def close(self):
+            raise RuntimeError("cleanup failed")
+
+    executor = BoundedExecutor(1)
+    stream = iterate_in_thread(Source(), executor)
+
+    assert await stream.__anext__() == "first"
+    assert await stream.__anext__() == "second"
+    with pytest.raises(RuntimeError, match="cleanup failed"):
+        await asyncio.wait_for(stream.__anext__(), timeout=1)
+    executor.shutdown()
@@ -0,0 +1,267 @@
+"""
+Pytest tests for the WebSocket transport
+
+These tests verify that:
+- A turn streams its components followed by done
+- Concurrent turns on one connection are told apart by their id
+- Cancelling a turn stops the bot
+- push_local() reaches clients that sent a turn of the conversation as
+  the same user
+- A connection runs a bounded number of turns at once
+- Invalid requests, ids, binary frames, pings and draining are answered
+"""
+
+import asyncio
+import json
+
+import pytest
+from starlette.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+import bubbletea_chat as bt
+from bubbletea_chat import decorators
+from bubbletea_chat.server import BubbleTeaServer
+
+MESSAGE = {"type": "user", "message": "hi"}
+
+
+@pytest.fixture(autouse=True)
+def reset_registry():
+    """Give each test a clean chatbot registry"""
+    decorators._chatbot_registry.clear()
+    yield
+    decorators._chatbot_registry.clear()
+
+
+def request(turn, message="hi"):
+    """A request frame"""
+    return {"event": "request", "id": turn, "data": {**MESSAGE, "message": message}}
+
+
+def test_turn_streams_components():
+    """Components of a streaming bot arrive in order, then done"""
+
+    @bt.chatbot("echo")
+    async def echo_bot(message: str):
+        yield bt.Text(message)
+        yield bt.Markdown(f"**{message}**")
+
+    client = TestClient(BubbleTeaServer(websocket=True).app)
+    with client.websocket_connect("/echo/ws") as ws:
+        ws.send_json(request("t1", "hello"))
+        frames = [ws.receive_json() for _ in range(3)]
+
+    assert frames[0] == {
+        "event": "component",
+        "id": "t1",
+        "data": {"type": "text", "content": "hello"},
+    }
+    assert frames[1]["data"]["content"] == "**hello**"
+    assert frames[2] == {"event": "done", "id": "t1"}
+
+
+def test_non_streaming_bot():
+    """Every component of a list response is sent as its own frame"""
+
+    @bt.chatbot("list", stream=False)
+    def list_bot(message: str):
+        return [bt.Text("a"), bt.Text("b")]
+
+    client = TestClient(BubbleTeaServer(websocket=True).app)
+    with client.websocket_connect("/list/ws") as ws:
+        ws.send_json(request(1))
+        frames = [ws.receive_json() for _ in range(3)]
+
+    assert [f["event"] for f in frames] == ["component", "component", "done"]
+    assert [f["id"] for f in frames] == [1, 1, 1]
+
+
+def test_concurrent_turns_are_multiplexed():
+    """A slow turn doesn't hold back a later one"""
+
+    @bt.chatbot("mux")
+    async def mux_bot(message: str):
+        if message == "slow":
+            await asyncio.sleep(0.3)
+        yield bt.Text(message)
+
+    client = TestClient(BubbleTeaServer(websocket=True).app)
+    with client.websocket_connect("/mux/ws") as ws:
+        ws.send_json(request("a", "slow"))
+        ws.send_json(request("b", "fast"))
+        frames = [ws.receive_json() for _ in range(4)]
+
+    assert [(f["event"], f["id"]) for f in frames] == [
+        ("component", "b"),
+        ("done", "b"),
+        ("component", "a"),
+        ("done", "a"),
+    ]
+
+
+def test_cancel_stops_turn():
+    """A cancelled turn ends without done and closes the bot generator"""
+    closed = []
+
+    @bt.chatbot("forever")
+    async def forever_bot(message: str):
+        try:
+            while True:
+                yield bt.Text("tick")
+                await asyncio.sleep(0.01)
+        finally:
+            closed.append(True)
+
+    server = BubbleTeaServer(websocket=True)
+    client = TestClient(server.app)
+    with client.websocket_connect("/forever/ws") as ws:
+        ws.send_json(request("t"))
+        assert ws.receive_json()["event"] == "component"
+        ws.send_json({"event": "cancel", "id": "t"})
+        # Frames already sent may still arrive before the pong
+        ws.send_json({"event": "ping"})
+        while ws.receive_json()["event"] != "pong":
+            pass
+
+    assert closed == [True]
+    assert server.drain.in_flight == 0
+
+
+def test_push_local_reaches_subscribers():
+    """Pushed components reach the user's connections to the conversation"""
+
+    @bt.chatbot("push")
+    async def push_bot(message: str):
+        yield bt.Text(message)
+
+    client = TestClient(BubbleTeaServer(websocket=True).app)
+    with client.websocket_connect("/push/ws?conversation_uuid=c1") as ws:
+        # Naming the conversation in the URL doesn't subscribe
+        ws.send_json({"event": "ping"})
+        assert ws.receive_json() == {"event": "pong"}
+        assert not asyncio.run(bt.push_local("c1", bt.Text("no"), user_uuid="u1"))
+
+        turn = request("t1")
+        turn["data"].update(conversation_uuid="c1", user_uuid="u1")
+        ws.send_json(turn)
+        assert [ws.receive_json()["event"] for _ in range(2)] == ["component", "done"]
+
+        # Called from another thread and loop, like a background job
+        video = bt.Video(url="https://v/1.mp4")
+        assert asyncio.run(bt.push_local("c1", video, user_uuid="u1"))
+        assert not asyncio.run(bt.push_local("c2", bt.Text("no"), user_uuid="u1"))
+        assert not asyncio.run(bt.push_local("c1", bt.Text("no"), user_uuid="u2"))
+        assert not asyncio.run(bt.push_local("c1", bt.Text("no"), user_uuid=None))
+        frame = ws.receive_json()
+
+    assert frame == {
+        "event": "push",
+        "data": {"type": "video", "url": "https://v/1.mp4"},
+    }
+    assert not asyncio.run(bt.push_local("c1", bt.Text("gone"), user_uuid="u1"))
+
+
+def test_turns_per_connection_are_bounded():
+    """A turn beyond max_turns gets an overloaded error"""
+    release = asyncio.Event()
+
+    @bt.chatbot("busy")
+    async def busy_bot(message: str):
+        await release.wait()
+        yield bt.Text(message)
+
+    client = TestClient(BubbleTeaServer(websocket=True).app)
+    with client.websocket_connect("/busy/ws") as ws:
+        for turn in range(9):
+            ws.send_json(request(turn))
+        refused = ws.receive_json()
+
+    assert refused["id"] == 8
+    assert refused["data"]["code"] == "overloaded"
+
+
+def test_invalid_request_and_message():
+    """Bad frames get an error event and the connection stays open"""
+
+    @bt.chatbot("strict")
+    async def strict_bot(message: str):
+        yield bt.Text(message)
+
+    client = TestClient(BubbleTeaServer(websocket=True).app)
+    with client.websocket_connect("/strict/ws") as ws:
+        ws.send_json({"event": "request", "id": "x", "data": {"type": "user"}})
+        invalid = ws.receive_json()
+        ws.send_text("not json")
+        malformed = ws.receive_json()
+        ws.send_json(request("y"))
+        recovered = ws.receive_json()
+
+    assert invalid["event"] == "error" and invalid["id"] == "x"
+    assert invalid["data"]["code"] == "invalid_request"
+    assert malformed["data"]["code"] == "invalid_message"
+    assert recovered["id"] == "y"
+
+
+def test_invalid_ids_and_binary_frames():
+    """Unhashable ids and binary frames get an error, the connection stays open"""
+
+    @bt.chatbot("ids")
+    async def ids_bot(message: str):
+        yield bt.Text(message)
+
+    client = TestClient(BubbleTeaServer(websocket=True).app)
+    with client.websocket_connect("/ids/ws") as ws:
+        ws.send_json({"event": "request", "id": ["a"], "data": MESSAGE})
+        listed = ws.receive_json()
+        ws.send_json({"event": "cancel", "id": {"a": 1}})
+        mapped = ws.receive_json()
+        ws.send_bytes(b"\x00\x01")
+        binary = ws.receive_json()
+        ws.send_json(request(7))
+        recovered = ws.receive_json()
+
+    for frame in (listed, mapped, binary):
+        assert frame["event"] == "error"
+        assert frame["data"]["code"] == "invalid_message"
+    assert recovered["id"] == 7
+
+
+def test_heartbeat_pings():
+    """A number for websocket sets the heartbeat interval"""
+
+    @bt.chatbot("quiet")
+    async def quiet_bot(message: str):
+        yield bt.Text(message)
+
+    client = TestClient(BubbleTeaServer(websocket=0.05).app)
+    with client.websocket_connect("/quiet/ws") as ws:
+        assert ws.receive_json() == {"event": "ping"}
+
+
+def test_draining_refuses_connections():
+    """New connections are closed with 1013 while the server drains"""
+
+    @bt.chatbot("drain")
+    async def drain_bot(message: str):
+        yield bt.Text(message)
+
+    server = BubbleTeaServer(websocket=True)
+    server.drain.start()
+    client = TestClient(server.app)
+    with pytest.raises(WebSocketDisconnect) as exc_info:
+        with client.websocket_connect("/drain/ws") as ws:
+            ws.receive_json()
+
+    assert exc_info.value.code == 1013
+
+
+def test_websocket_disabled_by_default():
+    """Without the option no WebSocket route exists"""
+
+    @bt.chatbot("plain")
+    async def plain_bot(message: str):
+        yield bt.Text(message)
+
+    app = BubbleTeaServer().app
+    assert not any(route.path.endswith("/ws") for route in app.routes)
+    assert json.loads(json.dumps(BubbleTeaServer(websocket=5)._options))["websocket"] == 5
@@ -0,0 +1,120 @@
+"""
+Pytest tests for multi-process worker mode
+
+These tests verify that:
+- Server options survive the round trip to worker processes
+- create_app() rebuilds a working app from the stored options
+- run_server(workers=N) serves requests from several processes
+"""
+
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import textwrap
+import time
+import urllib.request
+
+import pytest
+from fastapi.testclient import TestClient
+import bubbletea_chat as bt
+from bubbletea_chat import decorators
+from bubbletea_chat.encoders import PydanticEncoder
+from bubbletea_chat.server import SERVER_OPTIONS_ENV, BubbleTeaServer, create_app
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(autouse=True)
+def reset_registry(monkeypatch):
+    """Give each test a clean chatbot registry and options environment"""
+    decorators._chatbot_registry.clear()
+    monkeypatch.delenv(SERVER_OPTIONS_ENV, raising=False)
+    yield
+    decorators._chatbot_registry.clear()
+
+
+def test_create_app_uses_stored_options(monkeypatch):
+    """Workers rebuild the server with the supervisor's options"""
+
+    @bt.chatbot("worker-bot")
+    async def worker_bot(message: str):
+        for char in message:
+            yield bt.Text(char)
+
+    server = BubbleTeaServer(
+        worker_bot, register_all=False, coalesce=bt.CoalesceConfig(100, 1.0), metrics=True
+    )
+    monkeypatch.setenv(SERVER_OPTIONS_ENV, json.dumps(server._options))
+
+    with TestClient(create_app()) as client:
+        response = client.post("/worker-bot", json={"type": "user", "message": "abc"})
+        assert client.get("/metrics").status_code == 200
+
+    frames = [f for f in response.text.split("\n\n") if f]
+    assert frames[0] == 'data: {"type":"text","content":"abc"}'
+
+
+def test_workers_require_named_encoder():
+    """Custom encoder instances cannot be rebuilt in workers"""
+
+    class CustomEncoder(PydanticEncoder):
+        pass
+
+    server = BubbleTeaServer(encoder=CustomEncoder())
+    with pytest.raises(ValueError):
+        server.run(workers=2)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.mark.slow
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="Forked workers need os.fork")
+def test_run_server_with_multiple_workers(tmp_path):
+    """Requests are answered by more than one worker process"""
+    port = free_port()
+    script = tmp_path / "pid_bot.py"
+    script.write_text(
+        textwrap.dedent(
+            f"""
+            import os, sys
+            sys.path.insert(0, {ROOT!r})
+            import bubbletea_chat as bt
+
+            @bt.chatbot("pid", stream=False)
+            def pid_bot(message: str):
+                return bt.Text(str(os.getpid()))
+
+            if __name__ == "__main__":
+                bt.run_server(host="127.0.0.1", port={port}, workers=2, preload=["json"])
+            """
+        )
+    )
+    process = subprocess.Popen(
+        [sys.executable, str(script)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        pids = set()
+        deadline = time.time() + 15
+        while len(pids) < 2 and time.time() < deadline:
+            request = urllib.request.Request(
+                f"http://127.0.0.1:{port}/pid",
+                data=json.dumps({"type": "user", "message": "x"}).encode(),
+                headers={"Content-Type": "application/json"},
+            )
+            try:
+                # A fresh connection per request lets the kernel pick a worker
+                with urllib.request.urlopen(request, timeout=2) as response:
+                    pids.add(json.load(response)["responses"][0]["content"])
+            except OSError:
+                time.sleep(0.1)
+        assert len(pids) == 2
+    finally:
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=10) == 0